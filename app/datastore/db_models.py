@@ -1,11 +1,11 @@
 """db_models: SQLAlchemy models for the database."""
 
 from datetime import datetime
-from typing import Annotated, ClassVar
+from typing import Annotated, Any, ClassVar
 
 import sqlalchemy as sa
 from sqlalchemy import Column, Computed, ForeignKey, Index, String, Table, asc
-from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -36,6 +36,7 @@ BoolDefaultTrue = Annotated[bool, mapped_column(default=True)]
 
 # Datetime types
 DateTimeIndexed = Annotated[datetime, mapped_column(index=True)]
+DateTimeNullableIndexed = Annotated[datetime | None, mapped_column(nullable=True, index=True)]
 
 # ForeignKey types
 UsersFk = Annotated[int, mapped_column(ForeignKey("users.id"), index=True)]
@@ -101,8 +102,31 @@ class User(Base, mixins.AuthUserMixin):
 blog_tags_associations = Table(
     "blog_tags_associations",
     Base.metadata,
-    Column("blog_post_id", ForeignKey("blog_posts.id")),
-    Column("blog_post_tag_id", ForeignKey("blog_post_tags.tag")),
+    Column("blog_post_id", ForeignKey("blog_posts.id"), primary_key=True),
+    Column("blog_post_tag_id", ForeignKey("blog_post_tags.tag"), primary_key=True),
+    # The primary key finds a post's tags, this finds a tag's posts
+    Index("ix_blog_tags_associations_tag", "blog_post_tag_id", "blog_post_id"),
+)
+
+
+# Full-text search vector of a blog post, weighted by where the words are found (for
+# ranking). The tags go through `tsvector::text`, as casting arrays to text isn't immutable.
+BLOG_POST_TS_VECTOR = """\
+setweight(to_tsvector('english', title), 'A')
+|| setweight(to_tsvector('english', markdown_description), 'B')
+|| setweight(to_tsvector('english', array_to_tsvector(tag_names)::text), 'B')
+|| setweight(to_tsvector('english', markdown_content), 'C')"""
+
+
+# Fields the published blog posts are listed by, each with a partial `(field, id)` index
+# (matching the list's ORDER BY, read backwards when descending)
+PUBLISHED_LIST_ORDER_BY_FIELDS = (
+    "created_timestamp",
+    "title",
+    "read_mins",
+    "views",
+    "likes",
+    "comment_count",
 )
 
 
@@ -130,6 +154,12 @@ class BlogPost(Base):
     html_description: Mapped[str]
     html_content: Mapped[str]
     html_toc: Mapped[str]
+    # Computed from the markdown when saved (see `blog_utils`), rather than on every page view
+    excerpt: Mapped[str]  # Plain-text excerpt of the description
+    meta_description: Mapped[str]
+    word_count: Mapped[int]
+    # `markdown_parser.RENDERER_VERSION` the HTML was rendered with (see `scripts.rerender_db`)
+    renderer_version: Mapped[StrNullable]
 
     media: Mapped[list[BlogPostMedia]] = relationship(
         back_populates="blog_post",
@@ -142,15 +172,29 @@ class BlogPost(Base):
     comments: Mapped[list[BlogPostComment]] = relationship(
         back_populates="blog_post", order_by="asc(BlogPostComment.created_timestamp)"
     )
+    # Denormalized from `comments` and `tags`, so listing posts needn't load them.
+    comment_count: Mapped[IntIndexedDefaultZero]
+    tag_names: Mapped[list[str]] = mapped_column(ARRAY(String), default=list)
+    last_activity: Mapped[DateTimeNullableIndexed]  # Timestamp of the latest comment
     series_id: Mapped[BPSeriesFK | None]
     series_position: Mapped[IntNullable]
     series: Mapped[BlogPostSeries] = relationship(back_populates="posts")
 
     ts_vector: Mapped[TSVector] = mapped_column(
-        TSVector(),
-        Computed("to_tsvector('english', title || ' ' || markdown_content)", persisted=True),
+        TSVector(), Computed(BLOG_POST_TS_VECTOR, persisted=True)
+    )
+    __table_args__ = (
+        Index("ix_blog_post_ts_vector", ts_vector, postgresql_using="gin"),
+        *(
+            Index(
+                f"ix_blog_posts_published_{field}",
+                field,
+                "id",
+                postgresql_where=sa.text("is_published"),
+            )
+            for field in PUBLISHED_LIST_ORDER_BY_FIELDS
+        ),
     )
-    __table_args__ = (Index("ix_blog_post_ts_vector", ts_vector, postgresql_using="gin"),)
 
 
 class OldBlogPostSlug(Base):
@@ -215,6 +259,7 @@ class BlogPostComment(Base):
     user: Mapped[User] = relationship()
     md_content: Mapped[str]
     html_content: Mapped[str]
+    renderer_version: Mapped[StrNullable]  # See `BlogPost.renderer_version`
     created_timestamp: Mapped[DateTimeIndexed]
     updated_timestamp: Mapped[DateTimeIndexed]
     likes: Mapped[IntIndexedDefaultZero]
@@ -240,6 +285,20 @@ class BlogPostSeries(Base):
     __table_args__ = (Index("ix_bp_series_ts_vector", ts_vector, postgresql_using="gin"),)
 
 
+class OEmbedCacheEntry(Base):
+    """oEmbed response for a media URL, cached for all workers.
+
+    A null response caches a failed lookup (rendered as a plain link).
+    """
+
+    __tablename__ = "oembed_cache"
+
+    url: Mapped[StrPK]
+    response: Mapped[dict[str, Any] | None] = mapped_column(JSONB(none_as_null=True), nullable=True)
+    fetched_timestamp: Mapped[datetime]
+    expires_timestamp: Mapped[DateTimeIndexed]
+
+
 class PasswordResetToken(Base):
     """Password reset token model.
 
@@ -55,6 +55,34 @@ class BlogPostSeriesNotFoundError(AppError):
     status_code = status.HTTP_404_NOT_FOUND
 
 
+class InvalidCursorError(AppError):
+    """Invalid pagination cursor."""
+
+    detail = "Invalid pagination cursor"
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class InvalidSortFieldError(AppError):
+    """Invalid field to sort a list by."""
+
+    detail = "Invalid field to sort by"
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class RenderQueueFullError(AppError):
+    """Too many markdown renders are already pending."""
+
+    detail = "The server is busy, please try again in a moment"
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class RenderTimeoutError(AppError):
+    """A markdown render took too long."""
+
+    detail = "Rendering the markdown took too long"
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+
+
 class PasswordResetTokenNotFoundError(AppError):
     """Password reset token not found."""
 
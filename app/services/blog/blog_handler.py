@@ -1,7 +1,11 @@
 """blog_handler: service for manipulating blog posts."""
 
+import asyncio
+import base64
+import time
 from collections import defaultdict
 from collections.abc import Iterable
+from dataclasses import dataclass, fields, replace
 from datetime import UTC, datetime
 from http import HTTPStatus
 from logging import getLogger
@@ -10,21 +14,60 @@ from typing import Self
 import sqlalchemy
 import sqlalchemy.exc
 from fastapi import UploadFile
+from markupsafe import escape
 from pydantic import BaseModel, Field, model_validator
-from sqlalchemy import Select, delete, func, select
+from sqlalchemy import (
+    ColumnElement,
+    Double,
+    Row,
+    Select,
+    cast,
+    delete,
+    func,
+    literal,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app import errors
-from app.datastore import db_models
-from app.services.blog import blog_utils, markdown_parser
-from app.services.general import transforms
+from app.datastore import database, db_models
+from app.services.blog import (
+    blog_utils,
+    markdown_parser,
+    post_catalog,
+    render_executor,
+    search_completions,
+    search_suggestions,
+)
+from app.services.general import (
+    coalesced_task,
+    invalidation_bus,
+    page_cache,
+    single_flight,
+    transforms,
+)
+from app.services.general.invalidation_bus import InvalidationEvent, Namespace
 from app.services.media import media_handler
+from app.settings import settings
 from app.web import web_models
 from app.web.web_models import UnauthenticatedUser
 
 logger = getLogger(__name__)
 ERROR_SAVING_BP = "Error saving blog post"
+COMMENTS_PER_PAGE = 20
+
+# Full-text search
+SEARCH_CONFIG = "english"
+RELEVANCE = "relevance"  # <-- `order_by_field` sorting search results by `ts_rank_cd`
+RANK_NORMALIZATION = 1  # <-- Divide the rank by 1 + log(document length)
+SNIPPET_START, SNIPPET_STOP = "\u27e6", "\u27e7"  # <-- Unlikely in posts, escaped like the rest
+SNIPPET_OPTIONS = (
+    f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, "
+    'MaxFragments=2, MinWords=8, MaxWords=20, FragmentDelimiter=" ... "'
+)
 
 
 class SaveBlogInput(BaseModel, arbitrary_types_allowed=True):
@@ -101,7 +144,6 @@ def _get_bp_statement() -> Select:
     return select(db_models.BlogPost).options(
         selectinload(db_models.BlogPost.tags),
         selectinload(db_models.BlogPost.media),
-        selectinload(db_models.BlogPost.comments).selectinload(db_models.BlogPostComment.user),
         selectinload(db_models.BlogPost.old_slugs),
         selectinload(db_models.BlogPost.series)
         .selectinload(db_models.BlogPostSeries.posts)
@@ -114,25 +156,98 @@ def _get_bp_statement() -> Select:
     )
 
 
-def _get_bp_list_statement() -> Select:
-    """Return a lightweight blog post statement for list/paginated views.
+@dataclass(slots=True, frozen=True, kw_only=True)
+class ListedBlogPost:
+    """The fields of a blog post shown when listing blog posts."""
+
+    id: int
+    title: str
+    slug: str
+    thumbnail_location: str | None
+    read_mins: int | None
+    html_description: str
+    created_timestamp: datetime
+    updated_timestamp: datetime
+    views: int
+    likes: int
+    tag_names: list[str]
+    comment_count: int
+    # Only when searching
+    relevance: float | None = None
+    snippet: str | None = None  # <-- HTML, search terms in `<mark>`s
+
+    @classmethod
+    def from_row(cls, row: Row | post_catalog.CatalogPost) -> Self:
+        """Return the listed blog post from a `_get_bp_list_statement` row (or the catalog)."""
+        return cls(**{
+            field.name: getattr(row, field.name)
+            for field in fields(cls)
+            if hasattr(row, field.name)
+        })
+
+
+def _get_bp_list_statement(search: str | None = None) -> Select:
+    """Return a blog post statement for list/paginated views.
+
+    Selects only the columns in `ListedBlogPost`, never the markdown/html
+    bodies. Tag names and the comment count come from the denormalized
+    `tag_names` and `comment_count` columns, so no related rows are loaded.
+    With a `search`, each post's relevance to it is selected too.
+    """
+    stmt = select(*post_catalog.LIST_COLUMNS)
+    if search:
+        stmt = stmt.add_columns(_get_relevance(search).label(RELEVANCE))
+    return stmt
+
+
+def _get_search_query(search: str) -> ColumnElement:
+    """Return the tsquery for a search, in web search syntax (never a syntax error)."""
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search)
+
+
+def _get_relevance(search: str | None) -> ColumnElement[float]:
+    """Return blog posts' relevance to a search, as a double (so it round-trips exactly)."""
+    if not search:
+        return literal(0.0, Double)
+    rank = func.ts_rank_cd(
+        db_models.BlogPost.ts_vector, _get_search_query(search), RANK_NORMALIZATION
+    )
+    return cast(rank, Double)
+
+
+async def _add_search_snippets(
+    *, db: AsyncSession, blog_posts: list[ListedBlogPost], search: str | None
+) -> list[ListedBlogPost]:
+    """Add highlighted snippets of the posts' content matching a search.
 
-    Loads `tags` (needed for display and tag filtering) and `comments`
-    (needed for the comment count) but omits the heavy `media`,
-    `old_slugs`, and `series` collections that are not rendered on the
-    list page.  `comments` is loaded without its nested `user` relationship
-    since only the count is displayed.
+    `ts_headline` is slow (it re-parses the whole document), so snippets are
+    only made for the page of posts being shown, in the database.
     """
-    return select(db_models.BlogPost).options(
-        selectinload(db_models.BlogPost.tags),
-        selectinload(db_models.BlogPost.comments),
+    if not search or not blog_posts:
+        return blog_posts
+    headline = func.ts_headline(
+        SEARCH_CONFIG,
+        db_models.BlogPost.markdown_content,
+        _get_search_query(search),
+        SNIPPET_OPTIONS,
     )
+    stmt = select(db_models.BlogPost.id, headline).where(
+        db_models.BlogPost.id.in_([bp.id for bp in blog_posts])
+    )
+    headlines: dict[int, str] = dict((await db.execute(stmt)).tuples().all())
+    return [replace(bp, snippet=_format_snippet(headlines.get(bp.id, ""))) for bp in blog_posts]
+
+
+def _format_snippet(headline: str) -> str:
+    """Format a `ts_headline` of markdown as HTML, highlighting the search terms."""
+    text = str(escape(blog_utils.strip_markdown(headline)))
+    return text.replace(SNIPPET_START, "<mark>").replace(SNIPPET_STOP, "</mark>")
 
 
 class Paginator(BaseModel, arbitrary_types_allowed=True):
     """Response for getting blog posts."""
 
-    blog_posts: list[db_models.BlogPost] = Field(repr=False)
+    blog_posts: list[ListedBlogPost] = Field(repr=False)
     min_result: int
     max_result: int
     total_results: int
@@ -141,6 +256,7 @@ class Paginator(BaseModel, arbitrary_types_allowed=True):
     is_first_page: bool = False
     is_last_page: bool = False
     is_only_page: bool = False
+    suggestions: list[str] = Field(default_factory=list)  # <-- "Did you mean", if no results
 
 
 async def get_blog_posts(  # noqa: PLR0913,PLR0914 (too-many-arguments, too-many-locals)
@@ -156,31 +272,43 @@ async def get_blog_posts(  # noqa: PLR0913,PLR0914 (too-many-arguments, too-many
 ) -> Paginator:
     """Get blog posts.
 
-    Uses a window-function `COUNT(*) OVER()` to retrieve the total number of
-    matching rows in the same round-trip as the paginated data.  The fallback
-    path (separate COUNT query + re-fetch) is only taken when the requested
-    page is beyond the last page — an uncommon edge case.
+    Published posts listed without a search are served from the in-process
+    `post_catalog`, without a query. Otherwise, uses a window-function
+    `COUNT(*) OVER()` to retrieve the total number of matching rows in the
+    same round-trip as the paginated data.  The fallback path (separate COUNT
+    query + re-fetch) is only taken when the requested page is beyond the last
+    page — an uncommon edge case.
     """
-    stmt = _get_bp_list_statement()
+    if _can_use_catalog(
+        can_see_unpublished=can_see_unpublished, search=search, order_by_field=order_by_field
+    ):
+        return _get_catalog_blog_posts(
+            tags=tags,
+            order_by_field=order_by_field,
+            asc=asc,
+            results_per_page=results_per_page,
+            page=page,
+        )
+    filters = _get_bp_list_filters(
+        can_see_unpublished=can_see_unpublished, search=search, tags=tags
+    )
+    stmt = _get_bp_list_statement(search).where(*filters)
     # Build a parallel count statement for the out-of-range-page fallback.
-    count_stmt = select(sqlalchemy.func.count()).select_from(db_models.BlogPost)
-    if not can_see_unpublished:
-        filter_expr = db_models.BlogPost.is_published.is_(True)
-        stmt = stmt.filter(filter_expr)
-        count_stmt = count_stmt.where(filter_expr)
-    if tags:
-        tags_list = transforms.to_list(tags, lowercase=True)
-        filter_expr = db_models.BlogPost.tags.any(db_models.BlogPostTag.tag.in_(tags_list))
-        stmt = stmt.filter(filter_expr)
-        count_stmt = count_stmt.where(filter_expr)
-    if search:
-        filter_expr = db_models.BlogPost.ts_vector.match(search)
-        stmt = stmt.filter(filter_expr)
-        count_stmt = count_stmt.where(filter_expr)
+    count_stmt = select(sqlalchemy.func.count()).select_from(db_models.BlogPost).where(*filters)
 
-    order_by = getattr(db_models.BlogPost, order_by_field)
-    if not asc:
-        order_by = order_by.desc()
+    if order_by_field == RELEVANCE:
+        sort_key = _get_relevance(search)
+    elif order_by_field in db_models.PUBLISHED_LIST_ORDER_BY_FIELDS:
+        sort_key = getattr(db_models.BlogPost, order_by_field)
+    else:
+        msg = f"Can't list blog posts by {order_by_field}"
+        raise errors.InvalidSortFieldError(msg)
+    # Ties (e.g. equally relevant posts) are broken by id, so pages don't overlap
+    order_by = (
+        (sort_key, db_models.BlogPost.id)
+        if asc
+        else (sort_key.desc(), db_models.BlogPost.id.desc())
+    )
 
     page = max(page, 1)
     limit, offset = _calculate_limit_offset(results_per_page=results_per_page, page=page)
@@ -190,7 +318,7 @@ async def get_blog_posts(  # noqa: PLR0913,PLR0914 (too-many-arguments, too-many
     windowed_stmt = (
         stmt
         .add_columns(func.count().over().label("total"))
-        .order_by(order_by)
+        .order_by(*order_by)
         .limit(limit)
         .offset(offset)
     )
@@ -199,8 +327,8 @@ async def get_blog_posts(  # noqa: PLR0913,PLR0914 (too-many-arguments, too-many
 
     if rows:
         # Happy path: window function gives us the total for free.
-        total_results: int = rows[0][1]
-        blog_posts = [row[0] for row in rows]
+        total_results: int = rows[0].total
+        blog_posts = [ListedBlogPost.from_row(row) for row in rows]
         actual_page = page
     elif page == 1:
         # Page 1 returned nothing — there are simply zero matching posts.
@@ -217,25 +345,198 @@ async def get_blog_posts(  # noqa: PLR0913,PLR0914 (too-many-arguments, too-many
         )
         actual_page = min(page, max(total_pages_inner, 1))
         limit, offset = _calculate_limit_offset(results_per_page=results_per_page, page=actual_page)
-        refetch_result = await db.execute(stmt.order_by(order_by).limit(limit).offset(offset))
-        blog_posts = list(refetch_result.scalars().all())
+        refetch_result = await db.execute(stmt.order_by(*order_by).limit(limit).offset(offset))
+        blog_posts = [ListedBlogPost.from_row(row) for row in refetch_result]
+
+    blog_posts = await _add_search_snippets(db=db, blog_posts=blog_posts, search=search)
+    return _make_paginator(
+        blog_posts=blog_posts,
+        total_results=total_results,
+        page=actual_page,
+        results_per_page=results_per_page,
+        search=search,
+    )
+
+
+def _can_use_catalog(*, can_see_unpublished: bool, search: str | None, order_by_field: str) -> bool:
+    """Return whether blog posts can be listed from the published post catalog."""
+    return (
+        not can_see_unpublished
+        and not search
+        and order_by_field in post_catalog.SORT_KEYS
+        and post_catalog.published_posts.is_loaded
+    )
+
+
+def _get_catalog_blog_posts(
+    *, tags: str | None, order_by_field: str, asc: bool, results_per_page: int, page: int
+) -> Paginator:
+    """Get a page of published blog posts from the catalog."""
+    catalog = post_catalog.published_posts
+    tags_list = _get_tags_list(tags)
+    total_results = catalog.count(tags=tags_list)
+    total_pages = _calculate_total_pages(
+        total_results=total_results, results_per_page=results_per_page
+    )
+    page = min(max(page, 1), max(total_pages, 1))
+    limit, offset = _calculate_limit_offset(results_per_page=results_per_page, page=page)
+    posts = catalog.get_page(
+        order_by_field=order_by_field, asc=asc, tags=tags_list, offset=offset, limit=limit
+    )
+    return _make_paginator(
+        blog_posts=[ListedBlogPost.from_row(post) for post in posts],
+        total_results=total_results,
+        page=page,
+        results_per_page=results_per_page,
+        search=None,
+    )
 
+
+def _make_paginator(
+    *,
+    blog_posts: list[ListedBlogPost],
+    total_results: int,
+    page: int,
+    results_per_page: int,
+    search: str | None,
+) -> Paginator:
+    """Return the paginator of a page of blog posts."""
     total_pages = _calculate_total_pages(
         total_results=total_results, results_per_page=results_per_page
     )
-    actual_page = min(max(actual_page, 1), max(total_pages, 1))
-    _, final_offset = _calculate_limit_offset(results_per_page=results_per_page, page=actual_page)
+    page = min(max(page, 1), max(total_pages, 1))
+    _, offset = _calculate_limit_offset(results_per_page=results_per_page, page=page)
     return Paginator(
         blog_posts=blog_posts,
-        min_result=final_offset + 1,
-        max_result=final_offset + len(blog_posts),
+        min_result=offset + 1,
+        max_result=offset + len(blog_posts),
         total_results=total_results,
         total_pages=total_pages,
-        current_page=actual_page,
-        is_first_page=actual_page == 1,
-        is_last_page=actual_page == total_pages,
+        current_page=page,
+        is_first_page=page == 1,
+        is_last_page=page == total_pages,
         is_only_page=total_pages == 1,
+        suggestions=_get_search_suggestions(search) if not total_results else [],
+    )
+
+
+def _get_search_suggestions(search: str | None) -> list[str]:
+    """Return corrected searches to suggest for a search without results."""
+    return search_suggestions.blog_search_suggestions.suggest(search) if search else []
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class TagFacet:
+    """A tag of the listed blog posts, with how many of them have it."""
+
+    tag: str
+    count: int
+
+
+@dataclass(slots=True, kw_only=True)
+class CachedTagFacets:
+    """Cached tag facets, with when they go stale (to be recounted) and expire."""
+
+    tag_facets: list[TagFacet]
+    stale_at: float
+    expires_at: float
+
+    @classmethod
+    def counted(cls, tag_facets: list[TagFacet]) -> Self:
+        """Return just counted tag facets, to cache."""
+        now = time.monotonic()
+        return cls(
+            tag_facets=tag_facets,
+            stale_at=now + settings.page_cache_soft_ttl_secs,
+            expires_at=now + settings.page_cache_hard_ttl_secs,
+        )
+
+
+# Tag facets without a search, by `can_see_unpublished`. Stale when a blog post is saved.
+_unfiltered_tag_facets: dict[bool, CachedTagFacets] = {}
+# Tag facets being counted, by `(can_see_unpublished, search)`
+tag_facet_loads: single_flight.SingleFlight[tuple[bool, str | None], list[TagFacet]] = (
+    single_flight.SingleFlight("tag_facet_loads")
+)
+
+
+async def get_tag_facets(
+    *, db: AsyncSession, can_see_unpublished: bool, search: str | None = None
+) -> list[TagFacet]:
+    """Get the tags of the blog posts matching a search, most used first.
+
+    Counted with one aggregate query over `blog_tags_associations`. The tags
+    filter isn't applied (posts are listed if they have any of the selected
+    tags), so every tag's count is of all the posts matching the search. That
+    makes the counts without a search the same for every request, so they're
+    cached until a blog post is saved (or their soft TTL). Stale counts that
+    can't be recounted (say, the database is unreachable) are served until
+    their hard TTL. Concurrent requests for the same counts share one query
+    (see `tag_facet_loads`).
+    """
+    search = search or None
+    cached = None if search else _unfiltered_tag_facets.get(can_see_unpublished)
+    if cached is not None and time.monotonic() < cached.stale_at:
+        return cached.tag_facets
+    try:
+        tag_facets = await tag_facet_loads.do(
+            (can_see_unpublished, search),
+            lambda: _count_tag_facets(
+                db=db, can_see_unpublished=can_see_unpublished, search=search
+            ),
+        )
+    except sqlalchemy.exc.SQLAlchemyError:
+        if cached is None or time.monotonic() >= cached.expires_at:
+            raise
+        await db.rollback()
+        logger.warning("Serving stale tag facets, as recounting them failed", exc_info=True)
+        cached.stale_at = time.monotonic() + settings.page_cache_retry_secs
+        return cached.tag_facets
+    if not search:
+        _unfiltered_tag_facets[can_see_unpublished] = CachedTagFacets.counted(tag_facets)
+    return tag_facets
+
+
+async def _count_tag_facets(
+    *, db: AsyncSession, can_see_unpublished: bool, search: str | None
+) -> list[TagFacet]:
+    """Count the tags of the blog posts matching a search, most used first."""
+    tag = db_models.blog_tags_associations.c.blog_post_tag_id
+    filters = _get_bp_list_filters(
+        can_see_unpublished=can_see_unpublished, search=search, tags=None
+    )
+    stmt = (
+        select(tag, func.count().label("count"))
+        .select_from(db_models.blog_tags_associations)
+        .join(
+            db_models.BlogPost,
+            db_models.BlogPost.id == db_models.blog_tags_associations.c.blog_post_id,
+        )
+        .where(*filters)
+        .group_by(tag)
+        .order_by(func.count().desc(), tag)
     )
+    result = await db.execute(stmt)
+    return [TagFacet(tag=tag, count=count) for tag, count in result.tuples()]
+
+
+def _get_bp_list_filters(
+    *, can_see_unpublished: bool, search: str | None, tags: str | None
+) -> list[ColumnElement[bool]]:
+    """Return the WHERE clauses for listing blog posts."""
+    filters: list[ColumnElement[bool]] = []
+    if not can_see_unpublished:
+        filters.append(db_models.BlogPost.is_published)  # <-- Matches the partial list indexes
+    if (tags_list := _get_tags_list(tags)) is not None:
+        filters.append(db_models.BlogPost.tags.any(db_models.BlogPostTag.tag.in_(tags_list)))
+    if search:
+        filters.append(db_models.BlogPost.ts_vector.bool_op("@@")(_get_search_query(search)))
+    return filters
+
+
+def _get_tags_list(tags: str | None) -> list[str] | None:
+    """Return the tags to filter blog posts by (`None` to not filter by tags)."""
+    return transforms.to_list(tags, lowercase=True) if tags else None
 
 
 def _calculate_total_pages(*, total_results: int, results_per_page: int) -> int:
@@ -249,6 +550,237 @@ def _calculate_limit_offset(*, results_per_page: int, page: int) -> tuple[int, i
     return limit, (page - 1) * limit
 
 
+# Sort keys supported by keyset pagination, by `order_by_field`. Nullable
+# columns are coalesced so the `(sort key, id)` row comparison is total.
+KEYSET_SORT_KEYS: dict[str, ColumnElement] = {
+    "created_timestamp": db_models.BlogPost.created_timestamp,
+    "title": db_models.BlogPost.title,
+    "read_mins": func.coalesce(db_models.BlogPost.read_mins, 0),
+    "views": db_models.BlogPost.views,
+    "likes": db_models.BlogPost.likes,
+    "comment_count": db_models.BlogPost.comment_count,
+    # RELEVANCE: depends on the search (see `_get_relevance`)
+}
+
+
+class BlogPostCursor(BaseModel):
+    """Position of a blog post in a keyset paginated list.
+
+    Passed to clients as an opaque token (see `encode` and `decode`).
+    """
+
+    order_by_field: str
+    asc: bool
+    is_prev: bool = False
+    sort_value: int | float | str
+    bp_id: int
+
+    @classmethod
+    def from_blog_post(
+        cls, bp: ListedBlogPost, *, order_by_field: str, asc: bool, is_prev: bool = False
+    ) -> Self:
+        """Return the cursor pointing at a blog post."""
+        sort_value = getattr(bp, order_by_field)
+        if isinstance(sort_value, datetime):
+            sort_value = sort_value.isoformat()
+        elif sort_value is None:  # Matches the coalesced sort key
+            sort_value = 0
+        return cls(
+            order_by_field=order_by_field,
+            asc=asc,
+            is_prev=is_prev,
+            sort_value=sort_value,
+            bp_id=bp.id,
+        )
+
+    @classmethod
+    def decode(cls, token: str) -> Self:
+        """Return the cursor from its opaque token."""
+        return _decode_cursor(cls, token)
+
+    def encode(self) -> str:
+        """Return the cursor as an opaque, URL safe token."""
+        return _encode_cursor(self)
+
+    def get_sort_value(self) -> int | float | str | datetime:
+        """Return the sort value, as the type of the sorted column."""
+        if self.order_by_field == "created_timestamp":
+            try:
+                return datetime.fromisoformat(str(self.sort_value))
+            except ValueError as e:
+                raise errors.InvalidCursorError from e
+        return self.sort_value
+
+
+def _encode_cursor(cursor: BaseModel) -> str:
+    """Return a pagination cursor as an opaque, URL safe token."""
+    return base64.urlsafe_b64encode(cursor.model_dump_json().encode()).decode().rstrip("=")
+
+
+def _decode_cursor[CursorT: BaseModel](cursor_type: type[CursorT], token: str) -> CursorT:
+    """Return a pagination cursor from its opaque token."""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        return cursor_type.model_validate_json(base64.urlsafe_b64decode(padded))
+    except ValueError as e:
+        raise errors.InvalidCursorError from e
+
+
+class CursorPaginator(BaseModel, arbitrary_types_allowed=True):
+    """Response for getting blog posts by cursor."""
+
+    blog_posts: list[ListedBlogPost] = Field(repr=False)
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    total_results: int | None = None
+    suggestions: list[str] = Field(default_factory=list)  # <-- "Did you mean", if no results
+
+
+async def get_blog_posts_by_cursor(  # noqa: PLR0913 (too-many-arguments)
+    *,
+    db: AsyncSession,
+    can_see_unpublished: bool,
+    search: str | None = None,
+    tags: str | None = None,
+    order_by_field: str = "created_timestamp",
+    asc: bool = False,
+    results_per_page: int = 20,
+    cursor: str | None = None,
+    include_total: bool = False,
+) -> CursorPaginator:
+    """Get blog posts with keyset pagination.
+
+    Each page continues from the `(order_by_field, id)` of the edge row of the
+    page before it, rather than skipping `OFFSET` rows, so deep pages are as
+    cheap as the first one. The total number of matching rows is only counted
+    if `include_total` is set. Like `get_blog_posts`, published posts listed
+    without a search are served from the `post_catalog`.
+    """
+    position = BlogPostCursor.decode(cursor) if cursor else None
+    if position and (position.order_by_field, position.asc) != (order_by_field, asc):
+        msg = "Pagination cursor doesn't match the blog post ordering"
+        raise errors.InvalidCursorError(msg)
+    is_prev = bool(position and position.is_prev)
+    filters = _get_bp_list_filters(
+        can_see_unpublished=can_see_unpublished, search=search, tags=tags
+    )
+    use_catalog = _can_use_catalog(
+        can_see_unpublished=can_see_unpublished, search=search, order_by_field=order_by_field
+    )
+    # Fetch one extra row to learn whether there's another page.
+    blog_posts = await _get_keyset_blog_posts(
+        db=db,
+        filters=filters,
+        use_catalog=use_catalog,
+        tags=tags,
+        search=search,
+        order_by_field=order_by_field,
+        # Paging backwards is paging forwards through the reversed ordering.
+        asc=asc != is_prev,
+        position=position,
+        limit=results_per_page + 1,
+    )
+    has_more = len(blog_posts) > results_per_page
+    blog_posts = blog_posts[:results_per_page]
+    if is_prev:
+        blog_posts.reverse()
+    blog_posts = await _add_search_snippets(db=db, blog_posts=blog_posts, search=search)
+
+    total_results = (
+        await _count_blog_posts(db=db, filters=filters, use_catalog=use_catalog, tags=tags)
+        if include_total
+        else None
+    )
+
+    paginator = CursorPaginator(blog_posts=blog_posts, total_results=total_results)
+    if not blog_posts:
+        if position is None:
+            paginator.suggestions = _get_search_suggestions(search)
+        return paginator
+    # Coming from a later page means there is a next page, and vice versa.
+    if is_prev or has_more:
+        paginator.next_cursor = BlogPostCursor.from_blog_post(
+            blog_posts[-1], order_by_field=order_by_field, asc=asc
+        ).encode()
+    if has_more if is_prev else position is not None:
+        paginator.prev_cursor = BlogPostCursor.from_blog_post(
+            blog_posts[0], order_by_field=order_by_field, asc=asc, is_prev=True
+        ).encode()
+    return paginator
+
+
+async def _get_keyset_blog_posts(  # noqa: PLR0913 (too-many-arguments)
+    *,
+    db: AsyncSession,
+    filters: list[ColumnElement[bool]],
+    use_catalog: bool,
+    tags: str | None,
+    search: str | None,
+    order_by_field: str,
+    asc: bool,
+    position: BlogPostCursor | None,
+    limit: int,
+) -> list[ListedBlogPost]:
+    """Get the blog posts after a cursor position.
+
+    From the catalog if `use_catalog`, unless it can't place the position (see
+    `PostCatalog.get_after`), otherwise from the database.
+    """
+    if use_catalog:
+        posts = post_catalog.published_posts.get_after(
+            order_by_field=order_by_field,
+            asc=asc,
+            tags=_get_tags_list(tags),
+            position=(position.get_sort_value(), position.bp_id) if position else None,
+            limit=limit,
+        )
+        if posts is not None:
+            return [ListedBlogPost.from_row(post) for post in posts]
+    stmt = _get_keyset_statement(
+        filters=filters,
+        search=search,
+        order_by_field=order_by_field,
+        asc=asc,
+        position=position,
+    ).limit(limit)
+    result = await db.execute(stmt)
+    return [ListedBlogPost.from_row(row) for row in result]
+
+
+async def _count_blog_posts(
+    *, db: AsyncSession, filters: list[ColumnElement[bool]], use_catalog: bool, tags: str | None
+) -> int:
+    """Count the blog posts matching the filters (in the catalog if `use_catalog`)."""
+    if use_catalog:
+        return post_catalog.published_posts.count(tags=_get_tags_list(tags))
+    count_stmt = select(func.count()).select_from(db_models.BlogPost).where(*filters)
+    return (await db.execute(count_stmt)).scalar_one()
+
+
+def _get_keyset_statement(
+    *,
+    filters: list[ColumnElement[bool]],
+    search: str | None,
+    order_by_field: str,
+    asc: bool,
+    position: BlogPostCursor | None,
+) -> Select:
+    """Return the ordered blog post list statement, starting after the cursor position."""
+    if order_by_field == RELEVANCE:
+        sort_key = _get_relevance(search)
+    elif (sort_key := KEYSET_SORT_KEYS.get(order_by_field)) is None:
+        msg = f"Can't paginate blog posts by {order_by_field}"
+        raise errors.InvalidCursorError(msg)
+    stmt = _get_bp_list_statement(search).where(*filters)
+    if position:
+        row_key = tuple_(sort_key, db_models.BlogPost.id)
+        edge = (position.get_sort_value(), position.bp_id)
+        stmt = stmt.where(row_key > edge if asc else row_key < edge)
+    if asc:
+        return stmt.order_by(sort_key, db_models.BlogPost.id)
+    return stmt.order_by(sort_key.desc(), db_models.BlogPost.id.desc())
+
+
 async def get_all_series(
     *,
     db: AsyncSession,
@@ -261,7 +793,9 @@ async def get_all_series(
         .order_by(db_models.BlogPostSeries.id)
     )
     if search:
-        stmt = stmt.filter(db_models.BlogPostSeries.ts_vector.match(search))
+        stmt = stmt.filter(
+            db_models.BlogPostSeries.ts_vector.bool_op("@@")(_get_search_query(search))
+        )
 
     result = await db.execute(stmt)
     return list(result.scalars().all())
@@ -289,7 +823,8 @@ async def create_series(
     """Create a blog post series."""
     series = db_models.BlogPostSeries(name=name, description=description)
     db.add(series)
-    await db.commit()
+    await db.flush()  # <-- Assigns its id, for the event
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_SERIES, keys=[series.id])
     await db.refresh(series, attribute_names=["posts"])
     return series
 
@@ -303,7 +838,7 @@ async def update_series(
     """Update a blog post series."""
     series.name = name
     series.description = description
-    await db.commit()
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_SERIES, keys=[series.id])
     await db.refresh(series, attribute_names=["posts", "name", "description"])
     return series
 
@@ -315,7 +850,7 @@ async def delete_series(
     """Delete a blog post series."""
     stmt = delete(db_models.BlogPostSeries).where(db_models.BlogPostSeries.id == series_id)
     result = await db.execute(stmt)
-    await db.commit()
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_SERIES, keys=[series_id])
     return result.rowcount > 0  # ty: ignore[unresolved-attribute]
 
 
@@ -333,6 +868,16 @@ async def get_bp_from_id(
         raise errors.BlogPostNotFoundError from e
 
 
+async def is_bp_published(db: AsyncSession, bp_id: int) -> bool:
+    """Return whether a blog post is published, without loading it."""
+    stmt = select(db_models.BlogPost.is_published).filter(db_models.BlogPost.id == bp_id)
+    result = await db.execute(stmt)
+    try:
+        return result.scalars().one()
+    except sqlalchemy.exc.NoResultFound as e:
+        raise errors.BlogPostNotFoundError from e
+
+
 async def get_bp_from_slug(db: AsyncSession, slug: str) -> db_models.BlogPost:
     """Get a blog post from its slug."""
     try:
@@ -395,7 +940,8 @@ async def _save_bp_to_db(
     else:
         blog_post = await create_new_bp(db=db, data=data)
 
-    await db.commit()
+    await db.flush()  # <-- Assigns a new post's id, for the event
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_POSTS, keys=[blog_post.id])
     return blog_post
 
 
@@ -423,20 +969,31 @@ async def update_existing_bp_fields(  # noqa: C901 (complexity)
     current_tags = {tag.tag for tag in blog_post.tags}
     if current_tags != set(data.tags):
         blog_post.tags = await _get_bp_tags(db=db, tags=data.tags)
+        blog_post.tag_names = _get_bp_tag_names(blog_post.tags)
     if blog_post.is_published != data.is_published:
         blog_post.is_published = data.is_published
     if blog_post.can_comment != data.can_comment:
         blog_post.can_comment = data.can_comment
-    if blog_post.markdown_description != data.description:
+    # HTML rendered by an older renderer is re-rendered, even if the markdown is unchanged
+    stale_html = blog_post.renderer_version != markdown_parser.RENDERER_VERSION
+    if stale_html or blog_post.markdown_description != data.description:
         blog_post.markdown_description = data.description
-        html_description = markdown_parser.markdown_to_html(data.description)
+        html_description = await render_executor.markdown_to_html(data.description)
         blog_post.html_description = html_description.content
-    if blog_post.markdown_content != data.content:
+    if stale_html or blog_post.markdown_content != data.content:
         blog_post.markdown_content = data.content
-        html_content = markdown_parser.markdown_to_html(data.content)
+        html_content = await render_executor.markdown_to_html(data.content)
         blog_post.html_content = html_content.content
         blog_post.html_toc = html_content.toc
-        blog_post.read_mins = blog_utils.calc_read_mins(data.content)
+        blog_post.word_count = blog_utils.count_words(data.content)
+        blog_post.read_mins = blog_utils.calc_read_mins(
+            data.content, word_count=blog_post.word_count
+        )
+    blog_post.renderer_version = markdown_parser.RENDERER_VERSION
+    blog_post.excerpt = blog_utils.get_excerpt(blog_post.markdown_description)
+    blog_post.meta_description = blog_utils.get_meta_description(
+        blog_post.markdown_description, read_mins=blog_post.read_mins or 0
+    )
     if blog_post.thumbnail_location != data.thumbnail_url:
         blog_post.thumbnail_location = data.thumbnail_url
     if blog_post.series_id != data.series_id:
@@ -459,21 +1016,32 @@ async def create_new_bp(
 
 
 async def set_new_bp_fields(
-    data: SaveBlogInput, db: AsyncSession | None = None
+    data: SaveBlogInput, db: AsyncSession | None = None, *, incremental: bool = False
 ) -> db_models.BlogPost:
     """Set fields for a new blog post.
 
     Can ignore db session if not expecting to add the blog post to the database.
+    With `incremental`, the content is rendered block by block (for previews).
     """
-    html_description = markdown_parser.markdown_to_html(data.description)
-    html_content = markdown_parser.markdown_to_html(data.content)
+    render_content = (
+        render_executor.markdown_to_html_incremental
+        if incremental
+        else render_executor.markdown_to_html
+    )
+    html_description, html_content = await asyncio.gather(
+        render_executor.markdown_to_html(data.description),
+        render_content(data.content),
+    )
     tags = await _get_bp_tags(db=db, tags=data.tags)
+    word_count = blog_utils.count_words(data.content)
+    read_mins = blog_utils.calc_read_mins(data.content, word_count=word_count)
     now = datetime.now(UTC)
     return db_models.BlogPost(
         title=data.title,
         slug=blog_utils.get_slug(data.title),
         tags=tags,
-        read_mins=blog_utils.calc_read_mins(data.content),
+        tag_names=_get_bp_tag_names(tags),
+        read_mins=read_mins,
         is_published=data.is_published,
         can_comment=data.can_comment,
         markdown_description=data.description,
@@ -481,6 +1049,10 @@ async def set_new_bp_fields(
         html_description=html_description.content,
         html_content=html_content.content,
         html_toc=html_content.toc,
+        excerpt=blog_utils.get_excerpt(data.description),
+        meta_description=blog_utils.get_meta_description(data.description, read_mins=read_mins),
+        word_count=word_count,
+        renderer_version=markdown_parser.RENDERER_VERSION,
         created_timestamp=now,
         updated_timestamp=now,
         likes=data.likes,
@@ -503,6 +1075,11 @@ async def _get_bp_tags(
     ]
 
 
+def _get_bp_tag_names(tags: Iterable[db_models.BlogPostTag]) -> list[str]:
+    """Get the sorted tag names to store on a blog post's `tag_names` column."""
+    return sorted(tag.tag for tag in tags)
+
+
 async def _get_existing_bp_tags_from_list(
     tags: Iterable[str], db: AsyncSession | None = None
 ) -> dict[str, db_models.BlogPostTag]:
@@ -578,7 +1155,7 @@ async def reorder_media_for_blog_post(
     except sqlalchemy.exc.NoResultFound as e:
         raise errors.BlogPostMediaNotFoundError from e
     media.position = position
-    await db.commit()
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_PAGES, keys=[bp_id])
     return await get_bp_from_id(db=db, bp_id=bp_id)
 
 
@@ -599,7 +1176,7 @@ async def delete_media_from_blog_post(
     for location in media_locations:
         media_handler.del_media_from_path_str(location)
     await db.delete(media)
-    await db.commit()
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_PAGES, keys=[bp_id])
     await db.refresh(blog_post)
     return blog_post
 
@@ -631,7 +1208,7 @@ async def commit_media_to_db(  # noqa: PLR0913 (too-many-arguments)
         position=position,
     )
     db.add(bp_media_object)
-    await db.commit()
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_PAGES, keys=[blog_post.id])
     await db.refresh(blog_post)
     return blog_post
 
@@ -644,23 +1221,16 @@ async def toggle_blog_post_like(
         bp.likes = db_models.BlogPost.likes + 1
     else:
         bp.likes = db_models.BlogPost.likes - 1
-    await db.commit()
-    return bp
-
-
-async def increment_bp_views(db: AsyncSession, bp: db_models.BlogPost) -> db_models.BlogPost:
-    """Increment blog post views by one."""
-    bp.views = db_models.BlogPost.views + 1
-    await db.commit()
-    await db.refresh(bp)
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_COUNTS, keys=[bp.id])
     return bp
 
 
 async def save_new_comment(db: AsyncSession, data: SaveCommentInput) -> SaveCommentResponse:
     """Save a blog post comment."""
-    comment = generate_comment(data=data)
+    comment = await generate_comment(data=data)
     db.add(comment)
-    await db.commit()
+    await _update_bp_comment_stats(db=db, bp_id=data.bp_id, comment_count_change=1)
+    await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_COUNTS, keys=[data.bp_id])
     await db.refresh(comment)
     return SaveCommentResponse(success=True, comment=comment)
 
@@ -672,20 +1242,105 @@ async def update_existing_comment(
     md_content: str,
 ) -> db_models.BlogPostComment:
     """Update an existing blog post comment."""
-    html_content = generate_comment_html(md_content)
+    html_content = await render_executor.comment_to_html(md_content)
     comment.md_content = md_content
     comment.html_content = html_content
+    comment.renderer_version = markdown_parser.RENDERER_VERSION
     comment.updated_timestamp = datetime.now(UTC)
     if current_user.is_authenticated:
         comment.user_id = current_user.id
-    await db.commit()
+    if comment.blog_post_id is not None:
+        await invalidation_bus.bus.commit(
+            db, Namespace.BLOG_POST_PAGES, keys=[comment.blog_post_id]
+        )
+    else:
+        await db.commit()
     await db.refresh(comment)
     return comment
 
 
-def generate_comment(data: CommentInputPreview) -> db_models.BlogPostComment:
+async def _update_bp_comment_stats(
+    *, db: AsyncSession, bp_id: int, comment_count_change: int
+) -> None:
+    """Update a blog post's denormalized `comment_count` and `last_activity`.
+
+    Runs in the caller's transaction, so the stats are committed (or rolled
+    back) together with the comment change itself.
+    """
+    await db.flush()
+    last_comment_timestamp = (
+        select(func.max(db_models.BlogPostComment.created_timestamp))
+        .where(db_models.BlogPostComment.blog_post_id == bp_id)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(db_models.BlogPost)
+        .where(db_models.BlogPost.id == bp_id)
+        .values(
+            comment_count=db_models.BlogPost.comment_count + comment_count_change,
+            last_activity=last_comment_timestamp,
+        )
+    )
+    await db.execute(stmt)
+
+
+class CommentCursor(BaseModel):
+    """Position of a comment in a blog post's comments."""
+
+    created_timestamp: datetime
+    comment_id: int
+
+
+class CommentsPage(BaseModel, arbitrary_types_allowed=True):
+    """A page of a blog post's comments, oldest first."""
+
+    bp_id: int
+    comments: list[db_models.BlogPostComment] = Field(repr=False)
+    earlier_cursor: str | None = None
+
+
+async def get_bp_comments(
+    *,
+    db: AsyncSession,
+    bp_id: int,
+    before: str | None = None,
+    limit: int = COMMENTS_PER_PAGE,
+) -> CommentsPage:
+    """Get a page of a blog post's comments.
+
+    Pages run backwards from the newest comments, keyed on
+    `(created_timestamp, id)`, so only `limit` comments are ever loaded.
+    `earlier_cursor` is passed as `before` to get the page before this one.
+    """
+    stmt = (
+        select(db_models.BlogPostComment)
+        .options(selectinload(db_models.BlogPostComment.user))
+        .where(db_models.BlogPostComment.blog_post_id == bp_id)
+    )
+    if before:
+        position = _decode_cursor(CommentCursor, before)
+        row_key = tuple_(db_models.BlogPostComment.created_timestamp, db_models.BlogPostComment.id)
+        stmt = stmt.where(row_key < (position.created_timestamp, position.comment_id))
+    stmt = stmt.order_by(
+        db_models.BlogPostComment.created_timestamp.desc(), db_models.BlogPostComment.id.desc()
+    ).limit(limit + 1)  # One extra row to learn whether there are earlier comments
+    result = await db.execute(stmt)
+    comments = list(result.scalars().all())
+    has_earlier = len(comments) > limit
+    comments = comments[:limit][::-1]
+    page = CommentsPage(bp_id=bp_id, comments=comments)
+    if has_earlier:
+        page.earlier_cursor = _encode_cursor(
+            CommentCursor(
+                created_timestamp=comments[0].created_timestamp, comment_id=comments[0].id
+            )
+        )
+    return page
+
+
+async def generate_comment(data: CommentInputPreview) -> db_models.BlogPostComment:
     """Generate a blog post comment."""
-    html_content = generate_comment_html(data.content)
+    html_content = await render_executor.comment_to_html(data.content)
     now = datetime.now(UTC)
     return db_models.BlogPostComment(
         blog_post_id=data.bp_id,
@@ -695,20 +1350,13 @@ def generate_comment(data: CommentInputPreview) -> db_models.BlogPostComment:
         guest_id=data.guest_id,
         md_content=data.content,
         html_content=html_content,
+        renderer_version=markdown_parser.RENDERER_VERSION,
         created_timestamp=now,
         updated_timestamp=now,
         likes=0,
     )
 
 
-def generate_comment_html(content: str) -> str:
-    """Generate HTML for a comment, with proper sanitization."""
-    sanitized_before = markdown_parser.clean_with_exceptions(content)
-    html = markdown_parser.markdown_to_html(sanitized_before, update_headers=False).content
-    html = markdown_parser.convert_h_tags(html)
-    return markdown_parser.bleach_comment_html(html)
-
-
 async def delete_comment(
     db: AsyncSession,
     comment_id: int,
@@ -723,8 +1371,13 @@ async def delete_comment(
             status_code=HTTPStatus.FORBIDDEN,
             comment=comment,
         )
+    bp_id = comment.blog_post_id
     await db.delete(comment)
-    await db.commit()
+    if bp_id is not None:
+        await _update_bp_comment_stats(db=db, bp_id=bp_id, comment_count_change=-1)
+        await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_COUNTS, keys=[bp_id])
+    else:
+        await db.commit()
     return SaveCommentResponse(success=True)
 
 
@@ -763,3 +1416,84 @@ async def get_comment_from_id(db: AsyncSession, comment_id: int) -> db_models.Bl
         return result.scalars().one()
     except sqlalchemy.exc.NoResultFound as e:
         raise errors.BlogPostCommentNotFoundError from e
+
+
+# ---------------- Cache invalidation -----------------
+# Handlers of the `invalidation_bus` events published above, in every worker
+@invalidation_bus.bus.register(Namespace.BLOG_POSTS)
+async def _reload_blog_post_caches(db: AsyncSession, event: InvalidationEvent) -> None:
+    """Reload the caches of blog posts, after they're saved.
+
+    The saved posts' pages and completions are reloaded right away. The
+    catalog and search suggestions are built from every published post, so
+    they're rebuilt in the background (blog posts are listed from the
+    database until then).
+    """
+    for cached in _unfiltered_tag_facets.values():
+        cached.stale_at = 0  # <-- Recounted when next listed (or served stale, if that fails)
+    post_catalog.published_posts.mark_stale()
+    if event.keys:
+        await _invalidate_saved_bp_pages(db=db, bp_ids=event.keys)
+        await search_completions.blog_completions.refresh_posts(db, event.keys)
+    else:
+        page_cache.blog_post_pages.clear()
+        await search_completions.blog_completions.refresh(db)
+    blog_post_index_rebuilds.request()
+
+
+async def _rebuild_blog_post_indexes() -> None:
+    """Rebuild the published post catalog and search suggestions, with a new session."""
+    async with database.get_session_maker()() as db:
+        await post_catalog.published_posts.refresh(db)
+        await search_suggestions.blog_search_suggestions.refresh(db)
+
+
+blog_post_index_rebuilds = coalesced_task.CoalescedTask(
+    "blog_post_index_rebuilds", _rebuild_blog_post_indexes
+)
+
+
+@invalidation_bus.bus.register(Namespace.BLOG_POST_PAGES)
+async def _drop_blog_post_pages(db: AsyncSession, event: InvalidationEvent) -> None:  # noqa: ARG001 (unused-argument)
+    """Drop the cached pages of blog posts, after their media or comments are edited."""
+    _invalidate_bp_pages(event.keys)
+
+
+@invalidation_bus.bus.register(Namespace.BLOG_POST_COUNTS)
+async def _reload_blog_post_counts(db: AsyncSession, event: InvalidationEvent) -> None:
+    """Reload the likes and comment counts of blog posts, after they change."""
+    _invalidate_bp_pages(event.keys)
+    if event.keys:
+        await post_catalog.published_posts.refresh_counts(db, event.keys)
+    else:
+        await post_catalog.published_posts.refresh(db)
+
+
+@invalidation_bus.bus.register(Namespace.BLOG_SERIES)
+async def _reload_blog_series_caches(db: AsyncSession, event: InvalidationEvent) -> None:
+    """Reload the caches of blog post series, after they're saved or deleted."""
+    page_cache.blog_post_pages.clear()  # <-- Series show up on their posts' pages
+    if event.keys:
+        await search_completions.blog_completions.refresh_series(db, event.keys)
+    else:
+        await search_completions.blog_completions.refresh(db)
+
+
+async def _invalidate_saved_bp_pages(*, db: AsyncSession, bp_ids: list[int]) -> None:
+    """Drop the cached pages of saved blog posts, and of the posts in their series.
+
+    Pages of a saved post's old series are indexed under it (they link to it),
+    but its new series' pages aren't yet, so they're looked up.
+    """
+    bp = db_models.BlogPost
+    series_ids = select(bp.series_id).where(bp.id.in_(bp_ids), bp.series_id.is_not(None))
+    result = await db.execute(select(bp.id).where(bp.series_id.in_(series_ids)))
+    _invalidate_bp_pages([*bp_ids, *result.scalars()])
+
+
+def _invalidate_bp_pages(bp_ids: list[int]) -> None:
+    """Drop the cached pages of blog posts (all of them, without ids)."""
+    if not bp_ids:
+        page_cache.blog_post_pages.clear()
+    for bp_id in bp_ids:
+        page_cache.blog_post_pages.invalidate(bp_id)
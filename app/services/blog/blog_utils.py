@@ -2,6 +2,9 @@
 
 import math
 import re
+import textwrap
+
+EXCERPT_WIDTH = 200  # <-- characters, for link previews (`og:description`)
 
 
 def get_slug(title: str) -> str:
@@ -13,8 +16,11 @@ def get_slug(title: str) -> str:
     return re.sub(r"[^\w]+", "-", title.lower()).strip(" -")
 
 
-def calc_read_mins(content: str, image_count: int = 0) -> int:
-    """Calculate an article's read time in minutes (rounded up)."""
+def calc_read_mins(content: str, image_count: int = 0, *, word_count: int | None = None) -> int:
+    """Calculate an article's read time in minutes (rounded up).
+
+    Pass `word_count` if already counted (see `count_words`) to skip counting again.
+    """
     # Define time for an activity
     seconds_per_image = 5
     seconds_added_per_codeblock = 8
@@ -27,8 +33,8 @@ def calc_read_mins(content: str, image_count: int = 0) -> int:
 
     # Get content
     code_blocks_count = content.count("```") // 2
-    # not all are words, but close
-    word_count = len(strip_markdown(content).split())
+    if word_count is None:
+        word_count = count_words(content)
 
     # Add time per content
     total_time = (
@@ -39,6 +45,22 @@ def calc_read_mins(content: str, image_count: int = 0) -> int:
     return math.ceil(total_time)
 
 
+def count_words(content: str) -> int:
+    """Count the words in an article's markdown."""
+    # not all are words, but close
+    return len(strip_markdown(content).split())
+
+
+def get_excerpt(description: str) -> str:
+    """Get a short plain-text excerpt of a blog post's markdown description."""
+    return textwrap.shorten(strip_markdown(description), width=EXCERPT_WIDTH, placeholder="...")
+
+
+def get_meta_description(description: str, *, read_mins: int) -> str:
+    """Get the HTML meta description of a blog post, from its markdown description."""
+    return f"{read_mins} min read | {strip_markdown(description)}"
+
+
 def strip_markdown(md: str) -> str:
     """Strip markdown of weird syntax (for HTML meta description)."""
     # Remove images
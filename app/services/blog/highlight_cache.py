@@ -0,0 +1,159 @@
+"""highlight_cache: memoized Pygments highlighting of code blocks.
+
+Posts are code heavy, and CodeHilite lexes and formats every code block on
+every render, even when only the prose around them changed. `CachedCodeHilite`
+memoizes each block's highlighted HTML in `code_cache`, an LRU keyed by the
+block's language, code (hashed) and formatter options, so re-rendering an
+edited post only highlights the code blocks which changed.
+
+Python-Markdown's CodeHilite and fenced code processors create `CodeHilite`
+instances directly (there's no hook to supply another class), so
+`CachedCodeHiliteExtension` registers copies of them which create
+`CachedCodeHilite` instances instead, leaving the library's own untouched.
+"""
+
+import contextlib
+import hashlib
+import threading
+import types
+from collections import OrderedDict
+from collections.abc import Callable
+
+from markdown import Markdown
+from markdown.extensions import codehilite, fenced_code
+from pygments.lexers import guess_lexer
+from pygments.util import ClassNotFound
+
+from app.settings import settings
+
+
+class HighlightCache:
+    """Thread-safe LRU cache of highlighted code blocks, capped by entries."""
+
+    def __init__(self, *, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        """Get a highlighted code block, marking it as most recently used."""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return html
+
+    def put(self, key: str, html: str) -> None:
+        """Cache a highlighted code block, evicting the least recently used to fit."""
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all highlighted code blocks and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+code_cache = HighlightCache(max_entries=settings.highlight_cache_max_entries)
+
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    """`CodeHilite` which memoizes its highlighted HTML in `code_cache`."""
+
+    def hilite(self, shebang: bool = True) -> str:  # noqa: FBT001, FBT002 (boolean-positional-arg) -- overridden signature
+        """Highlight the code, from `code_cache` where possible."""
+        key = self._get_cache_key(shebang=shebang)
+        html = code_cache.get(key)
+        if html is None:
+            html = super().hilite(shebang=shebang)
+            code_cache.put(key, html)
+        return html
+
+    def _get_cache_key(self, *, shebang: bool) -> str:
+        """Get the cache key for highlighting the code with these options."""
+        formatter = self.pygments_formatter
+        if callable(formatter):
+            formatter = f"{formatter.__module__}.{formatter.__qualname__}"
+        options = sorted((key, repr(value)) for key, value in self.options.items())
+        code_hash = hashlib.blake2b(self.src.encode(), digest_size=16).hexdigest()
+        key_content = repr((
+            self.lang,
+            self.guess_lang,
+            self.use_pygments,
+            self.lang_prefix,
+            formatter,
+            options,
+            shebang,
+            code_hash,
+        ))
+        return hashlib.blake2b(key_content.encode(), digest_size=16).hexdigest()
+
+
+def _use_cached_code_hilite[**P, R](method: Callable[P, R]) -> Callable[P, R]:
+    """Copy a Python-Markdown processor method, making it create `CachedCodeHilite` instances.
+
+    The copy looks up `CodeHilite` in its own copy of the method's module
+    globals, so the method itself (and its module) are left as they are.
+    """
+    assert isinstance(method, types.FunctionType)  # noqa: S101 (assert) -- for type narrowing
+    method_globals = {**method.__globals__, "CodeHilite": CachedCodeHilite}
+    return types.FunctionType(
+        method.__code__, method_globals, method.__name__, method.__defaults__, method.__closure__
+    )
+
+
+class CachedHiliteTreeprocessor(codehilite.HiliteTreeprocessor):
+    """`HiliteTreeprocessor` (for indented code blocks) which uses `CachedCodeHilite`."""
+
+    run = _use_cached_code_hilite(codehilite.HiliteTreeprocessor.run)
+
+
+class CachedFencedBlockPreprocessor(fenced_code.FencedBlockPreprocessor):
+    """`FencedBlockPreprocessor` (for fenced code blocks) which uses `CachedCodeHilite`."""
+
+    run = _use_cached_code_hilite(fenced_code.FencedBlockPreprocessor.run)
+
+
+class CachedCodeHiliteExtension(codehilite.CodeHiliteExtension):
+    """`CodeHiliteExtension` which memoizes highlighted code blocks in `code_cache`.
+
+    Must come after the extension registering fenced code blocks (e.g.
+    `ExtraExtension`), whose preprocessor it replaces.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:  # noqa: N802 (invalid-function-name) -- overridden method
+        """Register the cached code highlighting processors."""
+        hiliter = CachedHiliteTreeprocessor(md)
+        hiliter.config = self.getConfigs()
+        md.treeprocessors.register(hiliter, "hilite", 30)
+        if "fenced_code_block" in md.preprocessors:
+            fenced = md.preprocessors["fenced_code_block"]
+            md.preprocessors.register(
+                CachedFencedBlockPreprocessor(md, fenced.config),  # ty: ignore[unresolved-attribute]
+                "fenced_code_block",
+                25,
+            )
+        md.registerExtension(self)
+
+
+def warm_up_lexers() -> None:
+    """Import all of Pygments' lexers now, rather than during a render.
+
+    Pygments imports lexers lazily, and guessing the language of a code block
+    without one imports all of them (taking around half a second).
+    """
+    with contextlib.suppress(ClassNotFound):
+        guess_lexer("")
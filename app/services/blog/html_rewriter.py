@@ -0,0 +1,267 @@
+"""html_rewriter: single pass, streaming, rewriting of HTML fragments.
+
+Rather than parsing HTML into a tree and walking it once per update, a
+rewriter applies every update from `on_start`/`on_end` hooks as the parser
+streams past each element. A start tag isn't rendered until its element
+closes, so updates can still reach an open element's ancestors (e.g. "center
+the paragraph this image is in").
+
+Output is serialized exactly as `str(BeautifulSoup(html, "html.parser"))`
+serializes it (attributes sorted, entities resolved, whitespace-only text
+collapsed, stray end tags dropped and unclosed tags closed), so rewriters can
+stand in for BeautifulSoup tree walks without changing the rendered HTML.
+"""
+
+import html
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Elements without content or end tags (as BeautifulSoup treats them)
+VOID_ELEMENTS = frozenset({
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "command",
+    "embed",
+    "frame",
+    "hr",
+    "image",
+    "img",
+    "input",
+    "isindex",
+    "keygen",
+    "link",
+    "menuitem",
+    "meta",
+    "nextid",
+    "param",
+    "source",
+    "spacer",
+    "track",
+    "wbr",
+})
+PRESERVE_WHITESPACE_ELEMENTS = frozenset({"pre", "textarea"})
+RAW_TEXT_ELEMENTS = frozenset({"script", "style"})
+# Space separated attributes, normalized to single spaces
+MULTI_VALUED_ATTRIBUTES = frozenset({"class", "accesskey", "dropzone"})
+ELEMENT_MULTI_VALUED_ATTRIBUTES = {
+    "a": frozenset({"rel", "rev"}),
+    "area": frozenset({"rel"}),
+    "form": frozenset({"accept-charset"}),
+    "icon": frozenset({"sizes"}),
+    "iframe": frozenset({"sandbox"}),
+    "link": frozenset({"rel", "rev"}),
+    "object": frozenset({"archive"}),
+    "output": frozenset({"for"}),
+    "td": frozenset({"headers"}),
+    "th": frozenset({"headers"}),
+}
+ASCII_SPACES = " \n\t\x0c\r"
+
+
+class Element:
+    """An element whose start tag can be updated until the element closes."""
+
+    __slots__ = ("attrs", "index", "name", "parent", "tag")
+
+    def __init__(
+        self, *, tag: str, attrs: dict[str, str], parent: Element | None, index: int
+    ) -> None:
+        self.tag = tag  # <-- As parsed (end tags are matched against this)
+        self.name = tag  # <-- As rendered
+        self.attrs = attrs
+        self.parent = parent
+        self.index = index  # <-- Of the start tag in the rewriter's output
+
+    @property
+    def classes(self) -> list[str]:
+        """The element's classes."""
+        return self.attrs.get("class", "").split()
+
+    def add_classes(self, *classes: str) -> None:
+        """Add classes to the element, after any it already has."""
+        self.attrs["class"] = " ".join([*self.classes, *classes])
+
+    def render_start_tag(self) -> str:
+        """Render the element's start tag."""
+        attrs = "".join(
+            f" {key}={_quote_attribute(value)}" for key, value in sorted(self.attrs.items())
+        )
+        if self.tag in VOID_ELEMENTS:
+            return f"<{self.name}{attrs}/>"
+        return f"<{self.name}{attrs}>"
+
+
+class HTMLRewriter(HTMLParser):
+    """Rewrite an HTML fragment in a single pass.
+
+    Subclasses update elements in `on_start` and `on_end`. Each instance
+    rewrites one fragment.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.output: list[str] = []
+        self.open_elements: list[Element] = []
+        self._data: list[str] = []
+        self._preserve_whitespace_depth = 0
+        self._closed_void_tags: list[str] = []
+
+    def rewrite(self, html_content: str) -> str:
+        """Rewrite an HTML fragment."""
+        self.feed(html_content)
+        self.close()
+        self._flush_data()
+        while self.open_elements:
+            self._close_element(self.open_elements.pop())
+        return "".join(self.output)
+
+    def on_start(self, element: Element) -> None:
+        """Update an element as it starts. Its ancestors are all still open."""
+
+    def on_end(self, element: Element) -> None:
+        """Update an element as it ends, once all its content has been seen."""
+
+    def is_open(self, tag: str) -> bool:
+        """Whether an element with the tag is open (i.e. an ancestor of the current element)."""
+        return any(element.tag == tag for element in self.open_elements)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Handle a start tag (e.g. `<div class="a">`)."""
+        self._start_element(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self._closed_void_tags.append(tag)  # <-- So a matching `</br>` is ignored
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Handle a self-closing tag (e.g. `<br/>`)."""
+        self._start_element(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self._end_element(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        """Handle an end tag, closing any elements left open inside it."""
+        if tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+            return
+        self._end_element(tag)
+
+    def handle_data(self, data: str) -> None:
+        """Handle text between tags."""
+        self._data.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        """Handle a named character reference (e.g. `&amp;`), as text."""
+        self._data.append(html5.get(f"{name};", f"&{name}"))
+
+    def handle_charref(self, name: str) -> None:
+        """Handle a numeric character reference (e.g. `&#8617;`), as text."""
+        codepoint = int(name[1:], 16) if name[0] in "xX" else int(name)
+        # Unlike BeautifulSoup, `html.unescape` drops (rather than keeps) control characters
+        self._data.append(html.unescape(f"&#{name};") or chr(codepoint))
+
+    def handle_comment(self, data: str) -> None:
+        """Handle a comment."""
+        self._append_markup("<!--", data, "-->")
+
+    def handle_decl(self, decl: str) -> None:
+        """Handle a doctype declaration."""
+        self._append_markup("<!DOCTYPE ", decl[len("DOCTYPE ") :], ">\n")
+
+    def unknown_decl(self, data: str) -> None:
+        """Handle a CDATA section (or other declaration)."""
+        if data.upper().startswith("CDATA["):
+            self._append_markup("<![CDATA[", data[len("CDATA[") :], "]]>")
+        else:
+            self._append_markup("<?", data, "?>")
+
+    def handle_pi(self, data: str) -> None:
+        """Handle a processing instruction."""
+        self._append_markup("<?", data, ">")
+
+    def _start_element(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Start an element, closing it straight away if it's void."""
+        self._flush_data()
+        element = Element(
+            tag=tag,
+            attrs=_get_attrs(tag, attrs),
+            parent=self.open_elements[-1] if self.open_elements else None,
+            index=len(self.output),
+        )
+        self.output.append("")  # <-- Placeholder for the start tag, rendered on close
+        self.on_start(element)
+        if tag in VOID_ELEMENTS:
+            self._close_element(element)
+            return
+        self.open_elements.append(element)
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_whitespace_depth += 1
+
+    def _end_element(self, tag: str) -> None:
+        """End the most recently opened element with the tag, and any open inside it."""
+        self._flush_data()
+        for i in range(len(self.open_elements) - 1, -1, -1):
+            if self.open_elements[i].tag == tag:
+                break
+        else:
+            return  # Stray end tags are dropped
+        while len(self.open_elements) > i:
+            self._close_element(self.open_elements.pop())
+
+    def _close_element(self, element: Element) -> None:
+        """Close an element (already removed from the open elements), rendering its tags."""
+        self.on_end(element)
+        self.output[element.index] = element.render_start_tag()
+        if element.tag in VOID_ELEMENTS:
+            return
+        self.output.append(f"</{element.name}>")
+        if element.tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_whitespace_depth -= 1
+
+    def _flush_data(self) -> None:
+        """Output the text seen since the last tag."""
+        if not self._data:
+            return
+        data = self._collapse_whitespace("".join(self._data))
+        self._data.clear()
+        if not (self.open_elements and self.open_elements[-1].tag in RAW_TEXT_ELEMENTS):
+            data = _escape(data)
+        self.output.append(data)
+
+    def _append_markup(self, prefix: str, data: str, suffix: str) -> None:
+        """Output a comment, declaration or processing instruction, as is."""
+        self._flush_data()
+        self.output.append(f"{prefix}{self._collapse_whitespace(data)}{suffix}")
+
+    def _collapse_whitespace(self, data: str) -> str:
+        """Collapse whitespace-only text to one character, unless in a <pre>."""
+        if self._preserve_whitespace_depth or data.strip(ASCII_SPACES):
+            return data
+        return "\n" if "\n" in data else " "
+
+
+def _get_attrs(tag: str, attrs: list[tuple[str, str | None]]) -> dict[str, str]:
+    """Get a start tag's attributes, with later duplicates winning."""
+    attributes = {key: value or "" for key, value in attrs}
+    multi_valued = ELEMENT_MULTI_VALUED_ATTRIBUTES.get(tag, frozenset())
+    for key, value in attributes.items():
+        if key in MULTI_VALUED_ATTRIBUTES or key in multi_valued:
+            attributes[key] = " ".join(value.split())
+    return attributes
+
+
+def _escape(text: str) -> str:
+    """Escape the characters BeautifulSoup escapes ("&", "<" and ">")."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _quote_attribute(value: str) -> str:
+    """Escape and quote an attribute value, preferring double quotes."""
+    value = _escape(value)
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"{}"'.format(value.replace('"', "&quot;"))
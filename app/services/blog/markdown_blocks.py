@@ -0,0 +1,199 @@
+"""markdown_blocks: incremental, block by block, markdown rendering.
+
+Long posts are mostly edited a paragraph at a time, so the live editor preview
+splits the markdown into top-level blocks and renders (and caches) each block
+on its own. Only the edited block misses the render cache, so the cost of a
+preview scales with the size of the edit rather than the size of the post.
+
+Splitting is conservative: blocks are only split where rendering them apart
+gives byte-identical HTML and TOC to rendering the whole document. Documents
+using features that reach across blocks (reference links, footnotes,
+abbreviations, duplicate heading IDs, etc.) are rendered whole.
+
+The blocks are rendered by `render_executor.markdown_to_html_incremental`.
+"""
+
+import re
+from html.parser import HTMLParser
+
+from markdown.util import BLOCK_LEVEL_ELEMENTS
+
+from app.services.blog import markdown_parser
+
+# Reference links/footnotes/abbreviations are defined once and used anywhere
+DOCUMENT_WIDE_RE = re.compile(r"^ {0,3}\[[^\]\n]+\]:|^\*\[|\[\^|\[TOC\]", re.MULTILINE)
+FENCE_RE = re.compile(r"^(`{3,}|~{3,})")
+LIST_ITEM_RE = re.compile(r"^(?:[*+-]|\d+[.)])(?:[ \t]|$)")
+DEFINITION_RE = re.compile(r"^ {0,3}:[ \t]", re.MULTILINE)
+TRAILING_BLANK_LINES_RE = re.compile(r"(?:\n[ \t]*)+$")
+HEADING_RE = re.compile(r"<h[1-6][\s>]")
+ID_RE = re.compile(r'\sid="([^"]*)"')
+VOID_TAGS = frozenset({
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+})
+
+
+class _HTMLBalanceChecker(HTMLParser):
+    """Check whether markdown leaves any raw HTML blocks (or comments) open.
+
+    Like the markdown parser, raw HTML only starts with a block level tag at
+    the start of a line. Other tags (e.g. "`<div>` tags", "<span>" or
+    "<https://example.com>") are part of the markdown.
+    """
+
+    def __init__(self, lines: list[str]) -> None:
+        super().__init__(convert_charrefs=True)
+        self.lines = lines
+        self.open_tags: list[str] = []
+        self.unmatched_end_tag = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:  # noqa: ARG002 (unused-argument)
+        if tag in VOID_TAGS:
+            return
+        if self.open_tags or (tag in BLOCK_LEVEL_ELEMENTS and self._at_line_start()):
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in self.open_tags:
+            self.unmatched_end_tag = self.unmatched_end_tag or self._at_line_start()
+            return
+        last_index = len(self.open_tags) - 1 - self.open_tags[::-1].index(tag)
+        del self.open_tags[last_index:]
+
+    @property
+    def is_balanced(self) -> bool:
+        """Whether all tags opened so far were closed, and none were closed unopened."""
+        return not (self.open_tags or self.rawdata or self.unmatched_end_tag)
+
+    def _at_line_start(self) -> bool:
+        """Whether the current tag is at the start of a line (give or take 3 spaces)."""
+        line_number, offset = self.getpos()
+        return offset <= 3 and not self.lines[line_number - 1][:offset].strip()  # noqa: PLR2004 (magic-value-comparison)
+
+
+def _is_unbalanced_html(lines: list[str]) -> bool:
+    """Whether the lines contain raw HTML which could continue past a blank line."""
+    if not any("<" in line for line in lines):
+        return False
+    checker = _HTMLBalanceChecker(lines)
+    checker.feed("\n".join(lines))
+    return not checker.is_balanced
+
+
+def _starts_block(line: str, block_lines: list[str]) -> bool:
+    """Whether `line`, following a blank line, starts a new independent block.
+
+    `block_lines` are the current block's lines, excluding fenced code.
+    """
+    if (
+        line[0].isspace()  # Continues a list item, code block, admonition, etc.
+        or LIST_ITEM_RE.match(line)  # Lists continue over blank lines
+        or DEFINITION_RE.match(line)
+        or line.startswith("</")
+    ):
+        return False
+    if line.startswith(">") and any(block_line.startswith(">") for block_line in block_lines):
+        return False  # Consecutive blockquotes are merged
+    return not _is_unbalanced_html(block_lines)
+
+
+def split_markdown_blocks(markdown_content: str) -> list[str] | None:
+    """Split markdown into blocks that can be rendered independently.
+
+    Returns None if the markdown can't be split safely.
+    """
+    markdown_content = markdown_content.replace("\r\n", "\n").replace("\r", "\n")
+    if DOCUMENT_WIDE_RE.search(markdown_content):
+        return None
+    lines = markdown_content.split("\n")
+    block_starts, fenced = _find_block_starts(lines)
+    if not block_starts:
+        return []
+    if _is_unbalanced_html(_unfenced(lines, fenced, block_starts[-1], len(lines))):
+        return None
+
+    block_ranges: list[tuple[int, int]] = []
+    for start, end in zip(block_starts, [*block_starts[1:], len(lines)], strict=True):
+        if block_ranges and DEFINITION_RE.search("\n".join(lines[start:end])):
+            # Definitions can take their term from the end of the previous block
+            block_ranges[-1] = (block_ranges[-1][0], end)
+        else:
+            block_ranges.append((start, end))
+    return [
+        TRAILING_BLANK_LINES_RE.sub("", "\n".join(lines[start:end])) for start, end in block_ranges
+    ]
+
+
+def _find_block_starts(lines: list[str]) -> tuple[list[int], list[bool]]:
+    """Find the line each block starts at, and which lines are fenced code.
+
+    No blocks are found if all lines are blank.
+    """
+    fenced = [False] * len(lines)
+    block_starts: list[int] = []
+    fence: str | None = None
+    after_blank = False
+    for i, line in enumerate(lines):
+        if fence is not None:
+            fenced[i] = True
+            if line.rstrip() == fence:
+                fence = None
+            continue
+        if not line.strip():
+            after_blank = True
+            continue
+        if not block_starts:
+            block_starts.append(0)  # The first block keeps any leading blank lines
+        elif after_blank and _starts_block(line, _unfenced(lines, fenced, block_starts[-1], i)):
+            block_starts.append(i)
+        after_blank = False
+        if match := FENCE_RE.match(line):
+            fenced[i] = True
+            fence = match.group(1)
+    return block_starts, fenced
+
+
+def _unfenced(lines: list[str], fenced: list[bool], start: int, end: int) -> list[str]:
+    """Get the lines from `start` to `end` which aren't fenced code."""
+    return [lines[i] for i in range(start, end) if not fenced[i]]
+
+
+def get_toc_markdown(blocks: list[str], rendered: list[markdown_parser.HTMLContent]) -> str | None:
+    """Get markdown which renders to the same TOC as the whole document.
+
+    Returns None if element IDs clash across blocks, as rendering the whole
+    document would have de-duplicated them.
+    """
+    seen_ids: set[str] = set()
+    heading_blocks: list[str] = []
+    for block, html_content in zip(blocks, rendered, strict=True):
+        ids = set(ID_RE.findall(html_content.content))
+        if not seen_ids.isdisjoint(ids):
+            return None
+        seen_ids.update(ids)
+        if HEADING_RE.search(html_content.content):
+            heading_blocks.append(block)
+    # A document without headings still gets the TOC's fixed entries
+    return "\n\n".join(heading_blocks or blocks[:1])
+
+
+def join_rendered_blocks(
+    rendered: list[markdown_parser.HTMLContent], *, toc: str
+) -> markdown_parser.HTMLContent:
+    """Join rendered blocks back into one document."""
+    return markdown_parser.HTMLContent(
+        content="\n".join(html_content.content for html_content in rendered), toc=toc
+    )
@@ -1,242 +1,468 @@
 """markdown_parser: service for parsing markdown into HTML."""
 
 # TODO: Consider using markdown-it for parsing markdown to HTML.
+import enum
+import hashlib
+import json
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
 
 import bleach
-from bs4 import BeautifulSoup, Tag
+import markdown
 from markdown import Markdown
 from markdown.extensions import Extension
 from markdown.extensions.admonition import AdmonitionExtension
-from markdown.extensions.codehilite import CodeHiliteExtension
 from markdown.extensions.extra import ExtraExtension
 from markdown.extensions.sane_lists import SaneListExtension
 from markdown.extensions.smarty import SmartyExtension
 from markdown.extensions.toc import TocExtension
-from micawber import bootstrap_basic, parse_html
-from micawber.cache import Cache as OEmbedCache
+from micawber import parse_html
 from pydantic import BaseModel
 
-# Configure micawber with the default OEmbed providers (YouTube, etc).
-oembed_providers = bootstrap_basic(OEmbedCache())
-MAX_MEDIA_WIDTH = 800
-HTML_PARSER = "html.parser"
+from app.services.blog import highlight_cache, html_rewriter, oembed
+from app.settings import settings
 
+HEADER_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
 
-class HTMLContent(BaseModel):
+
+# Bump when the HTML post-processing below changes the rendered output.
+# (Changes to the markdown extensions are picked up by `RENDERER_VERSION`.)
+RENDERER_REVISION = 1
+
+
+class HTMLContent(BaseModel, frozen=True):
     """Markdown content rendered to HTML."""
 
     content: str
     toc: str
 
 
-def markdown_to_html(markdown_content: str, *, update_headers: bool = True) -> HTMLContent:
-    """Generate HTML representation of the markdown-formatted blog entry.
+class MarkdownProfile(enum.StrEnum):
+    """The kinds of markdown rendered, each with its own set of extensions."""
 
-    Also convert any media URLs into rich media objects such as video
-    players or images.
+    POST = "post"
+    COMMENT = "comment"  # <-- No TOC (comment headings lose their IDs anyway)
+
+
+def get_extensions(profile: MarkdownProfile = MarkdownProfile.POST) -> list[str | Extension]:
+    """Get the markdown extensions used to render markdown to HTML.
+
+    Extension instances are bound to the `Markdown` instance they're
+    registered with, so a new list is needed for each `Markdown` instance.
     """
-    extensions: list[str | Extension] = [
-        CodeHiliteExtension(linenums=False, css_class="highlight"),
+    toc_extensions = [TocExtension(toc_depth=3)] if profile == MarkdownProfile.POST else []
+    return [
         ExtraExtension(),
-        TocExtension(toc_depth=3),
+        # After `ExtraExtension`, as it replaces its fenced code preprocessor
+        highlight_cache.CachedCodeHiliteExtension(linenums=False, css_class="highlight"),
+        *toc_extensions,
         AdmonitionExtension(),
         SaneListExtension(),
         SmartyExtension(),
         "pymdownx.tilde",  # ~~Strikethrough~~
         "pymdownx.mark",  # ==Mark== (highlight)
     ]
-    md = Markdown(extensions=extensions)
-    assert hasattr(md, "toc")  # noqa: S101 (assert) -- for type checker
-    html = md.convert(markdown_content)
+
+
+_thread_local = threading.local()
+
+
+def _get_markdown(profile: MarkdownProfile) -> Markdown:
+    """Get this thread's `Markdown` instance for a profile, creating it on first use.
+
+    Setting up a `Markdown` instance and its extensions costs more than
+    converting a typical comment, so instances are reused (and `reset()`
+    after each conversion). Instances aren't thread safe, hence one per thread.
+    """
+    instances: dict[MarkdownProfile, Markdown] = _thread_local.__dict__.setdefault(
+        "markdown_instances", {}
+    )
+    if profile not in instances:
+        instances[profile] = Markdown(extensions=get_extensions(profile))
+    return instances[profile]
+
+
+def warm_up() -> None:
+    """Get this process (and thread) ready to render, ahead of its first render."""
+    highlight_cache.warm_up_lexers()
+    for profile in MarkdownProfile:
+        _get_markdown(profile)
+
+
+def _describe_extension(extension: str | Extension) -> str:
+    """Describe an extension and its configuration, stably across processes."""
+    if isinstance(extension, str):
+        return extension
+    configs = {
+        key: (f"{value.__module__}.{value.__qualname__}" if callable(value) else repr(value))
+        for key, value in sorted(extension.getConfigs().items())
+    }
+    extension_type = type(extension)
+    return f"{extension_type.__module__}.{extension_type.__qualname__}{configs}"
+
+
+def _get_renderer_version() -> str:
+    """Get a version identifying the renderer's output.
+
+    Changes whenever the extensions (or their configuration), the markdown
+    library version or `RENDERER_REVISION` change.
+    """
+    description = "\n".join([
+        str(RENDERER_REVISION),
+        markdown.__version__,
+        *(
+            f"{profile}: {_describe_extension(extension)}"
+            for profile in MarkdownProfile
+            for extension in get_extensions(profile)
+        ),
+    ])
+    return hashlib.sha256(description.encode()).hexdigest()[:12]
+
+
+RENDERER_VERSION = _get_renderer_version()
+
+
+class RenderCache:
+    """Thread-safe LRU cache of rendered markdown, capped by entries and bytes."""
+
+    def __init__(self, *, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, HTMLContent] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        """Approximate size of the cached HTML, in bytes."""
+        return self._total_bytes
+
+    @staticmethod
+    def get_key(
+        markdown_content: str,
+        *,
+        update_headers: bool,
+        profile: MarkdownProfile = MarkdownProfile.POST,
+        oembeds: Mapping[str, oembed.OEmbedResponse] | None = None,
+    ) -> str:
+        """Get the cache key for rendering some markdown (with some oEmbed responses)."""
+        oembeds_json = json.dumps(oembeds, sort_keys=True) if oembeds else ""
+        key_content = (
+            f"{RENDERER_VERSION}:{profile}:{int(update_headers)}:{oembeds_json}:{markdown_content}"
+        )
+        return hashlib.blake2b(key_content.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> HTMLContent | None:
+        """Get a cached render, marking it as most recently used."""
+        with self._lock:
+            html_content = self._entries.get(key)
+            if html_content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return html_content
+
+    def put(self, key: str, html_content: HTMLContent) -> None:
+        """Cache a render, evicting the least recently used renders to fit."""
+        size = len(html_content.content.encode()) + len(html_content.toc.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = html_content
+            self._sizes[key] = size
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def get_or_render(
+        self,
+        markdown_content: str,
+        *,
+        update_headers: bool,
+        render: Callable[[], HTMLContent],
+        profile: MarkdownProfile = MarkdownProfile.POST,
+        oembeds: Mapping[str, oembed.OEmbedResponse] | None = None,
+    ) -> HTMLContent:
+        """Get a cached render of some markdown, rendering it with `render` on a miss."""
+        key = self.get_key(
+            markdown_content, update_headers=update_headers, profile=profile, oembeds=oembeds
+        )
+        html_content = self.get(key)
+        if html_content is None:
+            html_content = render()
+            self.put(key, html_content)
+        return html_content
+
+    def clear(self) -> None:
+        """Remove all cached renders and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _pop(self, key: str) -> None:
+        """Remove a render from the cache, if present. Call with the lock held."""
+        if self._entries.pop(key, None) is not None:
+            self._total_bytes -= self._sizes.pop(key)
+
+
+render_cache = RenderCache(
+    max_entries=settings.render_cache_max_entries,
+    max_bytes=settings.render_cache_max_bytes,
+)
+
+
+def markdown_to_html(
+    markdown_content: str,
+    *,
+    update_headers: bool = True,
+    profile: MarkdownProfile = MarkdownProfile.POST,
+    oembeds: Mapping[str, oembed.OEmbedResponse] | None = None,
+) -> HTMLContent:
+    """Generate HTML representation of the markdown-formatted blog entry.
+
+    Renders are cached by content in `render_cache`.
+    """
+    return render_cache.get_or_render(
+        markdown_content,
+        update_headers=update_headers,
+        profile=profile,
+        oembeds=oembeds,
+        render=lambda: render_markdown(
+            markdown_content, update_headers=update_headers, profile=profile, oembeds=oembeds
+        ),
+    )
+
+
+def render_markdown(
+    markdown_content: str,
+    *,
+    update_headers: bool = True,
+    profile: MarkdownProfile = MarkdownProfile.POST,
+    oembeds: Mapping[str, oembed.OEmbedResponse] | None = None,
+) -> HTMLContent:
+    """Generate HTML representation of the markdown-formatted blog entry, uncached.
+
+    Also convert any media URLs into rich media objects such as video
+    players or images, from their already resolved oEmbed responses (see
+    `oembed.resolve`). Media URLs without a response are rendered as links.
+    """
+    md = _get_markdown(profile)
+    try:
+        html = md.convert(markdown_content)
+        toc = update_toc(md.toc) if profile == MarkdownProfile.POST else ""  # ty: ignore[unresolved-attribute]
+    finally:
+        md.reset()
     html = update_html(html, update_headers=update_headers)
     html_with_oembed = parse_html(
         html,
-        oembed_providers,
+        oembed.ResolvedProviders(oembeds or {}),
         urlize_all=True,
-        maxwidth=MAX_MEDIA_WIDTH,
+        maxwidth=oembed.MAX_MEDIA_WIDTH,
     )
-    return HTMLContent(content=html_with_oembed, toc=update_toc(md.toc))  # ty: ignore[invalid-argument-type]
+    return HTMLContent(content=html_with_oembed, toc=toc)
 
 
-def update_html(html: str, *, update_headers: bool = True) -> str:
-    """Update the blog HTML content."""
-    html_soup = BeautifulSoup(html, HTML_PARSER)
-    _update_html_links(html_soup)
-    if update_headers:
-        _update_html_headers(html_soup)
-    _update_html_pre_tags(html_soup)
-    _update_html_code_highlights(html_soup)
-    _update_html_media(html_soup)
-    return str(html_soup)
-
-
-def _update_html_links(html_soup: BeautifulSoup) -> None:
-    """Make all links open in new tab."""
-    for a_tag in html_soup.find_all("a"):
-        if a_tag.get("href", "").startswith("#"):  # ty: ignore[unresolved-attribute]
-            continue
-        a_tag["target"] = "_blank"
-        a_tag["rel"] = "noopener noreferrer"
-
-
-def _update_html_headers(html_soup: BeautifulSoup) -> None:
-    """Fix header IDs that don't start alpha to work with scrollspy."""
-    for h_tag in html_soup.find_all(re.compile(r"^h[1-6]$")):
-        id_ = h_tag.get("id")
-        if h_tag.get("id") and not id_[0].isalpha():  # ty: ignore[not-subscriptable]
-            h_tag["id"] = f"blog-{id_}"
-        h_tag["x-intersect"] = f"highlightTocElement('{_update_intersect_id(id_)}')"  # ty: ignore[invalid-argument-type]
+def render_markdown_blocks(
+    markdown_blocks: list[str],
+    *,
+    update_headers: bool = True,
+    oembeds: Mapping[str, oembed.OEmbedResponse] | None = None,
+) -> list[HTMLContent]:
+    """Render several markdown documents (or blocks of one), uncached."""
+    return [
+        render_markdown(block, update_headers=update_headers, oembeds=oembeds)
+        for block in markdown_blocks
+    ]
 
 
-def _update_html_pre_tags(html_soup: BeautifulSoup) -> None:
-    """Make all pre tags tab-to-able (for accessibility)."""
-    for pre_tag in html_soup.find_all("pre"):
-        pre_tag["tabindex"] = "0"
+def update_html(html: str, *, update_headers: bool = True) -> str:
+    """Update the blog HTML content."""
+    return _BlogHTMLRewriter(update_headers=update_headers).rewrite(html)
+
+
+class _BlogHTMLRewriter(html_rewriter.HTMLRewriter):
+    """Apply all the blog HTML content updates in a single pass."""
+
+    def __init__(self, *, update_headers: bool) -> None:
+        super().__init__()
+        self.update_headers = update_headers
+
+    def on_start(self, element: html_rewriter.Element) -> None:
+        tag = element.tag
+        if tag == "a":
+            _update_link(element)
+        elif tag in HEADER_TAGS and self.update_headers:
+            _update_header(element)
+        elif tag == "pre":
+            element.attrs["tabindex"] = "0"  # <-- Make tab-to-able (for accessibility)
+        elif tag == "div" and "highlight" in element.classes:
+            element.add_classes("not-prose")
+        elif tag == "img":
+            _update_img(element)
+        elif tag == "source" and self.is_open("video"):
+            _update_video_source(element)
+        _center_media(element)
+
+    def on_end(self, element: html_rewriter.Element) -> None:
+        if element.tag == "video":
+            element.add_classes("lazy")
+
+
+def _update_link(a_tag: html_rewriter.Element) -> None:
+    """Make links open in new tab."""
+    if a_tag.attrs.get("href", "").startswith("#"):
+        return
+    a_tag.attrs["target"] = "_blank"
+    a_tag.attrs["rel"] = "noopener noreferrer"
 
 
-def _update_html_code_highlights(html_soup: BeautifulSoup) -> None:
-    """Add "not-prose" class to all "highlight" code blocks."""
-    for code_tag in html_soup.find_all("div", {"class": "highlight"}):
-        code_tag["class"].append("not-prose")  # ty: ignore[unresolved-attribute]
+def _update_header(h_tag: html_rewriter.Element) -> None:
+    """Fix header IDs that don't start alpha to work with scrollspy."""
+    id_ = h_tag.attrs.get("id")
+    if id_ and not id_[0].isalpha():
+        h_tag.attrs["id"] = f"blog-{id_}"
+    h_tag.attrs["x-intersect"] = f"highlightTocElement('{_update_intersect_id(id_)}')"  # ty: ignore[invalid-argument-type]
 
 
-def _update_html_media(html_soup: BeautifulSoup) -> None:
-    """Add classes to all images.
+def _update_img(img: html_rewriter.Element) -> None:
+    """Update the image tag.
 
     - Make all images centered.
     - Make all image paragraphs centered for captions.
     - Make all images rounded.
     - Make all images lazy loaded.
     """
-    for img in html_soup.find_all("img"):
-        _update_img(img)
-    for picture in html_soup.find_all("picture"):
-        picture.parent["class"] = [*picture.parent.get("class", []), "text-center"]  # ty: ignore[invalid-assignment, not-iterable, unresolved-attribute, invalid-argument-type]
-    for media in html_soup.find_all(class_="media-element"):
-        media.parent["class"] = [*media.parent.get("class", []), "text-center"]  # ty: ignore[invalid-assignment, not-iterable, unresolved-attribute, invalid-argument-type]
-    for video in html_soup.find_all("video"):
-        _update_video(video)
-
-
-def _update_img(img: Tag) -> None:
-    """Update the image tag."""
-    img["class"] = [*img.get("class", []), "rounded-lg", "mx-auto"]  # ty: ignore[invalid-assignment, invalid-argument-type, not-iterable]
-    img["loading"] = "lazy"
-    if img.attrs.get("src", "").endswith(".svg"):  # ty: ignore[unresolved-attribute]
-        img["class"].extend(["w-4/5", "max-sm:w-full"])  # ty: ignore[unresolved-attribute]
-    if img.parent.name != "p":  # ty: ignore[unresolved-attribute]
+    img.add_classes("rounded-lg", "mx-auto")
+    img.attrs["loading"] = "lazy"
+    if img.attrs.get("src", "").endswith(".svg"):
+        img.add_classes("w-4/5", "max-sm:w-full")
+    if img.parent is not None and img.parent.name == "p":
+        img.parent.add_classes("text-center")
+
+
+def _center_media(element: html_rewriter.Element) -> None:
+    """Center pictures and media elements, and their captions, by centering their parent."""
+    if element.parent is None:
         return
-    img.parent["class"] = [*img.parent.get("class", []), "text-center"]  # ty: ignore[invalid-assignment, not-iterable, unresolved-attribute, invalid-argument-type]
+    if element.tag == "picture":
+        element.parent.add_classes("text-center")
+    if "media-element" in element.classes:
+        element.parent.add_classes("text-center")
 
 
-def _update_video(video: Tag) -> None:
-    """Update the video tag."""
-    video["class"] = [*video.get("class", []), "lazy"]  # ty: ignore[invalid-assignment, invalid-argument-type, not-iterable]
-    for source in video.find_all("source"):
-        if source.get("src"):
-            source["data-src"] = source["src"]
-            del source["src"]
+def _update_video_source(source: html_rewriter.Element) -> None:
+    """Lazy load video sources."""
+    if source.attrs.get("src"):
+        source.attrs["data-src"] = source.attrs.pop("src")
 
 
-def update_toc(toc: str) -> str:
-    """Update the table of contents HTML."""
-    toc_soup = BeautifulSoup(toc, HTML_PARSER)
-    toc_element = toc_soup.find("div", {"class": "toc"})
-    if not toc_element:  # Something went wrong...
-        return ""
-    assert isinstance(toc_element, Tag)  # noqa: S101
-    update_element(
-        element=toc_element,
-        name="nav",
-        id_="toc",
-        class_="not-prose",
-    )
-    toc_list_outer = toc_element.find("ul")
-    assert isinstance(toc_list_outer, Tag)  # noqa: S101
-    update_element(
-        element=toc_list_outer,
-        class_="flex flex-col gap-3",
-    )
-    for li_tag in toc_list_outer.find_all("li"):
-        update_element(
-            element=li_tag,
-            class_="flex flex-col gap-3",
-        )
-        a_tag = li_tag.find("a")
-        assert isinstance(a_tag, Tag)  # noqa: S101
-        update_element(
-            element=a_tag,
-            class_="link px-2 py-1 rounded-lg",
-        )
-        a_tag["@click"] = "tocOpen = false; allowTocClose = false;"
-        ul_tags = li_tag.find_all("ul")
-        for ul_tag in ul_tags:
-            update_element(
-                element=ul_tag,
-                class_="flex flex-col gap-3 ml-6",
-            )
-
-        update_a_tag_alpha_href(a_tag)
-    # Add title comments and contact sections
-    title = BeautifulSoup(
-        (
-            '<li class="flex flex-col gap-3">'
-            '<a class="link px-2 py-1 rounded-lg"'
-            ' @click="tocOpen = false; allowTocClose = false;"'
-            ' href="#">Title</a></li>'
-        ),
-        HTML_PARSER,
-    )
-    toc_list_outer.insert(0, title)
-    about = BeautifulSoup(
-        (
-            '<li class="flex flex-col gap-3">'
-            '<a class="link px-2 py-1 rounded-lg"'
-            ' @click="tocOpen = false; allowTocClose = false;"'
-            ' href="#about-the-author">About the author</a></li>'
-        ),
-        HTML_PARSER,
-    )
-    comments = BeautifulSoup(
-        (
-            '<li class="flex flex-col gap-3">'
-            '<a class="link px-2 py-1 rounded-lg"'
-            ' @click="tocOpen = false; allowTocClose = false;"'
-            ' href="#comments">Comments</a></li>'
-        ),
-        HTML_PARSER,
+# Classes (and click handler) of the TOC's elements
+TOC_CLASS = "not-prose"
+TOC_ITEM_CLASS = "flex flex-col gap-3"
+TOC_SUBLIST_CLASS = "flex flex-col gap-3 ml-6"
+TOC_LINK_CLASS = "link px-2 py-1 rounded-lg"
+TOC_LINK_CLICK = "tocOpen = false; allowTocClose = false;"
+
+
+def _render_toc_item(href: str, text: str) -> str:
+    """Render a TOC list item, as updated by `update_toc`."""
+    return (
+        f'<li class="{TOC_ITEM_CLASS}">'
+        f'<a @click="{TOC_LINK_CLICK}" class="{TOC_LINK_CLASS}" href="{href}">{text}</a></li>'
     )
-    toc_list_outer.extend([about, comments])
-    return str(toc_soup)
 
 
-def update_element(
-    *,
-    element: Tag,
-    name: str | None = None,
-    id_: str | None = None,
-    class_: str | None = None,
-) -> None:
-    """Update an element's name and class."""
-    if name:
-        element.name = name
-    if class_:  # pragma: no branch
-        element["class"] = class_
-    if id_:
-        element["id"] = id_
-
-
-def update_a_tag_alpha_href(a_tag: Tag) -> None:
-    """Update a tag ID if not alpha.
+# The title, comments and contact sections, added around the post's headings
+TOC_TITLE_ITEM = _render_toc_item("#", "Title")
+TOC_FOOTER_ITEMS = _render_toc_item("#about-the-author", "About the author") + _render_toc_item(
+    "#comments", "Comments"
+)
+
+
+def update_toc(toc: str) -> str:
+    """Update the table of contents HTML."""
+    rewriter = _TocRewriter()
+    toc = rewriter.rewrite(toc)
+    if rewriter.toc is None:  # Something went wrong...
+        return ""
+    return toc
+
+
+class _TocRewriter(html_rewriter.HTMLRewriter):
+    """Apply all the table of contents updates in a single pass."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.toc: html_rewriter.Element | None = None
+        self.toc_list: html_rewriter.Element | None = None
+        self.in_toc_list = False
+        self.open_items: list[html_rewriter.Element] = []
+        self.items_without_link: list[html_rewriter.Element] = []
+
+    def on_start(self, element: html_rewriter.Element) -> None:
+        if self.toc is None:
+            if element.tag == "div" and "toc" in element.classes:
+                self.toc = element
+                element.name = "nav"
+                element.attrs["class"] = TOC_CLASS
+                element.attrs["id"] = "toc"
+        elif self.toc_list is None:
+            if element.tag == "ul" and self.toc in self.open_elements:
+                self.toc_list = element
+                self.in_toc_list = True
+                element.attrs["class"] = TOC_ITEM_CLASS
+                self.output.append(TOC_TITLE_ITEM)
+        elif self.in_toc_list:
+            self._update_toc_list_element(element)
+
+    def on_end(self, element: html_rewriter.Element) -> None:
+        if element is self.toc_list:
+            self.in_toc_list = False
+            self.output.append(TOC_FOOTER_ITEMS)
+        elif element in self.open_items:
+            self.open_items.remove(element)
+            if element in self.items_without_link:
+                self.items_without_link.remove(element)
+
+    def _update_toc_list_element(self, element: html_rewriter.Element) -> None:
+        """Update an element in the TOC's (outer) list."""
+        if element.tag == "li":
+            element.attrs["class"] = TOC_ITEM_CLASS
+            self.open_items.append(element)
+            self.items_without_link.append(element)
+        elif element.tag == "a" and self.items_without_link:
+            # The first link in each list item
+            element.attrs["class"] = TOC_LINK_CLASS
+            element.attrs["@click"] = TOC_LINK_CLICK
+            element.attrs["href"] = _update_alpha_href(element.attrs["href"])
+            self.items_without_link.clear()
+        elif element.tag == "ul" and self.open_items:
+            element.attrs["class"] = TOC_SUBLIST_CLASS
+
+
+def _update_alpha_href(href: str) -> str:
+    """Update an href's ID if not alpha.
 
     Scrollspy fails when the ID does not begin with a letter [a-zA-Z].
     Fix by adding a prefix to the ID of the element and the TOC link
     if the ID does not begin with a letter.
     """
-    href = str(a_tag["href"])
     if href.startswith("#") and not href[1].isalpha():
-        a_tag["href"] = f"#blog-{href[1:]}"
+        return f"#blog-{href[1:]}"
+    return href
 
 
 def _update_intersect_id(id_: str) -> str:
@@ -295,44 +521,82 @@ ALLOWED_COMMENT_ATTRIBUTES = {
 }
 
 
+# Comment headings are demoted below the blog post's headings (h1 -> h3, ..., h5 -> h6)
+COMMENT_HEADING_LEVELS = {"1": "3", "2": "4", "3": "5", "4": "6", "5": "6"}
+COMMENT_HEADING_RE = re.compile(r"<\s*(/?)h([1-5])\b[^>]*>", flags=re.IGNORECASE)
+# Markdown hidden from bleach while cleaning comment markdown, and its placeholders
+CODE_BLOCK_RE = re.compile(r"```.*?```", flags=re.DOTALL)
+BLOCKQUOTE_RE = re.compile(r"^> ", flags=re.MULTILINE)
+CODE_BLOCK_PLACEHOLDER = "___CODEBLOCK{}___"
+BLOCKQUOTE_PLACEHOLDER = "___BLOCKQUOTE___"
+PLACEHOLDER_RE = re.compile(r"___CODEBLOCK(\d+)___|___BLOCKQUOTE___")
+
+
+def comment_to_html(
+    content: str, *, oembeds: Mapping[str, oembed.OEmbedResponse] | None = None
+) -> str:
+    """Generate sanitized HTML for a markdown-formatted comment."""
+    sanitized_before = clean_with_exceptions(content)
+    html = markdown_to_html(
+        sanitized_before, update_headers=False, profile=MarkdownProfile.COMMENT, oembeds=oembeds
+    ).content
+    html = convert_h_tags(html)
+    return bleach_comment_html(html)
+
+
+def _get_cleaner(*, allow_comment_tags: bool) -> bleach.Cleaner:
+    """Get this thread's bleach `Cleaner`, creating it on first use.
+
+    Setting up a `Cleaner` (and its HTML parser) costs about as much as
+    cleaning a typical comment, so cleaners are reused. Like `Markdown`
+    instances, they aren't thread safe, hence one per thread.
+    """
+    cleaners: dict[bool, bleach.Cleaner] = _thread_local.__dict__.setdefault("cleaners", {})
+    if allow_comment_tags not in cleaners:
+        cleaners[allow_comment_tags] = (
+            bleach.Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_COMMENT_ATTRIBUTES)
+            if allow_comment_tags
+            else bleach.Cleaner()
+        )
+    return cleaners[allow_comment_tags]
+
+
 def bleach_comment_html(html: str) -> str:
     """Bleach the comment HTML to remove any unwanted tags or attributes."""
-    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_COMMENT_ATTRIBUTES)
+    return _get_cleaner(allow_comment_tags=True).clean(html)
 
 
 def convert_h_tags(html: str) -> str:
     """Convert h1 tags to h3, h2 to h4, h3 to h5, and h4 and h5 to h6."""
-    html = re.sub(r"<\s*(/?)h5\b[^>]*>", r"<\1h6>", html, flags=re.IGNORECASE)
-    html = re.sub(r"<\s*(/?)h4\b[^>]*>", r"<\1h6>", html, flags=re.IGNORECASE)
-    html = re.sub(r"<\s*(/?)h3\b[^>]*>", r"<\1h5>", html, flags=re.IGNORECASE)
-    html = re.sub(r"<\s*(/?)h2\b[^>]*>", r"<\1h4>", html, flags=re.IGNORECASE)
-    html = re.sub(r"<\s*(/?)h1\b[^>]*>", r"<\1h3>", html, flags=re.IGNORECASE)
-    return html  # noqa: RET504
+    return COMMENT_HEADING_RE.sub(
+        lambda match: f"<{match[1]}h{COMMENT_HEADING_LEVELS[match[2]]}>", html
+    )
 
 
 def clean_with_exceptions(content: str) -> str:
     """Clean the content, with some exceptions.
 
-    Meant to clean html from comments.
+    Meant to clean html from comments. Code blocks and blockquote markers
+    are swapped for placeholders while cleaning, so bleach leaves them be.
     """
-    nefarious_strings = ("___CODEBLOCK", "___BLOCKQUOTE___")
+    nefarious_strings = ("___CODEBLOCK", BLOCKQUOTE_PLACEHOLDER)
     if any(nefarious in content for nefarious in nefarious_strings):
-        return bleach.clean(content)
-
-    # Extract code blocks
-    code_blocks = re.findall(r"```.*?```", content, re.DOTALL)
+        return _get_cleaner(allow_comment_tags=False).clean(content)
 
     # Replace exceptions with placeholders
-    for i, block in enumerate(code_blocks):
-        content = content.replace(block, f"___CODEBLOCK{i}___")
-    content = re.sub(r"^> ", "___BLOCKQUOTE___", content, flags=re.MULTILINE)
+    code_blocks: list[str] = []
+
+    def hide_code_block(match: re.Match[str]) -> str:
+        code_blocks.append(match[0])
+        return CODE_BLOCK_PLACEHOLDER.format(len(code_blocks) - 1)
+
+    content = CODE_BLOCK_RE.sub(hide_code_block, content)
+    content = BLOCKQUOTE_RE.sub(BLOCKQUOTE_PLACEHOLDER, content)
 
     # Clean content
-    content = bleach.clean(content)
+    content = _get_cleaner(allow_comment_tags=False).clean(content)
 
     # Replace placeholders with their values
-    content = content.replace("___BLOCKQUOTE___", "> ")
-    for i, block in enumerate(code_blocks):
-        content = content.replace(f"___CODEBLOCK{i}___", block)
-
-    return content
+    return PLACEHOLDER_RE.sub(
+        lambda match: "> " if match[1] is None else code_blocks[int(match[1])], content
+    )
@@ -0,0 +1,168 @@
+"""oembed: resolve media URLs (YouTube, etc.) to oEmbed responses before rendering.
+
+Renders never look up oEmbed providers themselves. Instead, the media URLs in
+the markdown are resolved first: from the `oembed_cache` table (shared by all
+workers), or else fetched from their provider, concurrently and with a
+timeout. The responses are then handed to the render, which embeds them with a
+`ResolvedProviders` registry. A URL without a response (its lookup failed, or
+timed out) is rendered as a plain link.
+
+Failed lookups are cached too, for `oembed_negative_ttl_secs`, so a dead
+provider slows down at most one render per URL.
+"""
+
+import asyncio
+from collections.abc import Iterable, Mapping
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from logging import getLogger
+from typing import Any
+
+import sqlalchemy.exc
+from micawber import ProviderException, ProviderRegistry, bootstrap_basic
+from micawber.parsers import url_re
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.datastore import database, db_models
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+OEmbedResponse = dict[str, Any]
+
+MAX_MEDIA_WIDTH = 800
+
+
+def _get_providers() -> ProviderRegistry:
+    """Configure micawber with the default oEmbed providers (YouTube, etc)."""
+    providers = bootstrap_basic()
+    for _pattern, provider in providers:
+        provider.socket_timeout = settings.oembed_timeout_secs
+        if settings.oembed_endpoint:
+            provider.endpoint = settings.oembed_endpoint
+    return providers
+
+
+oembed_providers = _get_providers()
+
+
+class ResolvedProviders(ProviderRegistry):
+    """Provider registry serving already resolved oEmbed responses, never fetching.
+
+    Looking up a URL without a response raises `ProviderException`, which
+    micawber handles by rendering the URL as a plain link.
+    """
+
+    def __init__(self, responses: Mapping[str, OEmbedResponse]) -> None:
+        super().__init__()
+        self.responses = responses
+
+    def request(self, url: str, **_params: object) -> OEmbedResponse:
+        """Get the resolved response for a URL."""
+        response = self.responses.get(url)
+        if response is None:
+            error_msg = f'No oEmbed response resolved for "{url}"'
+            raise ProviderException(error_msg)
+        return response
+
+    def request_many(self, urls: Iterable[str], **_params: object) -> dict[str, OEmbedResponse]:
+        """Get the resolved responses for several URLs, skipping those without one."""
+        return {url: self.responses[url] for url in urls if url in self.responses}
+
+
+def find_media_urls(content: str) -> list[str]:
+    """Find the URLs in some content which an oEmbed provider could embed."""
+    urls = dict.fromkeys(url_re.findall(content))
+    return [url for url in urls if oembed_providers.provider_for_url(url) is not None]
+
+
+def select_responses(
+    responses: Mapping[str, OEmbedResponse], content: str
+) -> dict[str, OEmbedResponse]:
+    """Select the responses for the media URLs in some content (e.g. one markdown block)."""
+    return {url: responses[url] for url in find_media_urls(content) if url in responses}
+
+
+async def resolve(
+    content: str, *, session_maker: async_sessionmaker[AsyncSession] | None = None
+) -> dict[str, OEmbedResponse]:
+    """Resolve the media URLs in some content to their oEmbed responses.
+
+    Content without media URLs doesn't touch the database, which is the app's
+    unless another's `session_maker` is given (e.g. a script's). URLs whose
+    lookup failed are left out.
+    """
+    urls = find_media_urls(content)
+    if not urls:
+        return {}
+    session_maker = session_maker or database.get_session_maker()
+    try:
+        async with session_maker() as db:
+            return await _resolve_urls(db, urls)
+    except sqlalchemy.exc.SQLAlchemyError:
+        logger.exception("Error resolving oEmbed responses, rendering plain links")
+        return {}
+
+
+async def _resolve_urls(db: AsyncSession, urls: list[str]) -> dict[str, OEmbedResponse]:
+    """Resolve URLs from the cache table, fetching (and caching) any missing."""
+    now = datetime.now(UTC)
+    stmt = select(db_models.OEmbedCacheEntry.url, db_models.OEmbedCacheEntry.response).where(
+        db_models.OEmbedCacheEntry.url.in_(urls),
+        db_models.OEmbedCacheEntry.expires_timestamp > now,
+    )
+    cached: dict[str, OEmbedResponse | None] = dict((await db.execute(stmt)).tuples().all())
+    missing = [url for url in urls if url not in cached]
+    if missing:
+        responses = await asyncio.gather(*(fetch(url) for url in missing))
+        fetched = dict(zip(missing, responses, strict=True))
+        await _store(db, fetched, now=now)
+        cached |= fetched
+    return {url: response for url, response in cached.items() if response is not None}
+
+
+async def fetch(url: str) -> OEmbedResponse | None:
+    """Fetch a URL's oEmbed response from its provider, or None if the lookup fails.
+
+    micawber fetches with blocking I/O, so fetches run in threads (and are
+    abandoned after `oembed_timeout_secs`).
+    """
+    provider = oembed_providers.provider_for_url(url)
+    if provider is None:
+        return None
+    request = partial(provider.request, url, maxwidth=MAX_MEDIA_WIDTH)
+    try:
+        async with asyncio.timeout(settings.oembed_timeout_secs):
+            return await asyncio.to_thread(request)
+    except (ProviderException, OSError) as e:  # <-- OSError includes TimeoutError
+        logger.warning("oEmbed lookup failed for %s: %r", url, e)
+        return None
+
+
+async def _store(
+    db: AsyncSession, responses: Mapping[str, OEmbedResponse | None], *, now: datetime
+) -> None:
+    """Upsert fetched responses (None for failed lookups) into the cache table."""
+    ttl = timedelta(seconds=settings.oembed_ttl_secs)
+    negative_ttl = timedelta(seconds=settings.oembed_negative_ttl_secs)
+    stmt = insert(db_models.OEmbedCacheEntry).values([
+        {
+            "url": url,
+            "response": response,
+            "fetched_timestamp": now,
+            "expires_timestamp": now + (negative_ttl if response is None else ttl),
+        }
+        for url, response in responses.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[db_models.OEmbedCacheEntry.url],
+        set_={
+            "response": stmt.excluded.response,
+            "fetched_timestamp": stmt.excluded.fetched_timestamp,
+            "expires_timestamp": stmt.excluded.expires_timestamp,
+        },
+    )
+    await db.execute(stmt)
+    await db.commit()
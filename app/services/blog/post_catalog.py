@@ -0,0 +1,286 @@
+"""post_catalog: in-process catalog of published blog posts, for listing them.
+
+The list fields of the published blog posts are few and small enough to hold
+in every worker, so listing them (without a search) never queries the
+database. Each post is a compact `__slots__` record with a bit of its own, and
+each tag is an int bitset of its posts' bits, so filtering by tags is a few
+ORs and ANDs. Posts are presorted by every field they can be ordered by, so a
+page is a slice (or, filtered by tags, a short scan) of one array.
+
+The catalog is loaded at startup and rebuilt in the background when a blog
+post is saved (see the `invalidation_bus` handlers in `blog_handler`), listing
+from the database until then. Likes, comments and views only move a post
+within that field's array. If reloading fails (say, the
+database is unreachable), the catalog already loaded keeps being served.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from datetime import datetime
+from itertools import islice
+from logging import getLogger
+from operator import attrgetter
+from typing import Any
+
+import sqlalchemy.exc
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.datastore import db_models
+
+logger = getLogger(__name__)
+
+# Tag filters matching fewer than 1 in this many posts sort their posts, rather
+# than scanning a field's sorted posts for them
+SPARSE_FRACTION = 8
+
+# The columns of a blog post shown when listing blog posts
+LIST_COLUMNS = (
+    db_models.BlogPost.id,
+    db_models.BlogPost.title,
+    db_models.BlogPost.slug,
+    db_models.BlogPost.thumbnail_location,
+    db_models.BlogPost.read_mins,
+    db_models.BlogPost.html_description,
+    db_models.BlogPost.created_timestamp,
+    db_models.BlogPost.updated_timestamp,
+    db_models.BlogPost.views,
+    db_models.BlogPost.likes,
+    db_models.BlogPost.tag_names,
+    db_models.BlogPost.comment_count,
+)
+
+
+class CatalogPost:
+    """The list fields of a published blog post."""
+
+    __slots__ = (
+        "bit",
+        "comment_count",
+        "created_timestamp",
+        "html_description",
+        "id",
+        "likes",
+        "read_mins",
+        "slug",
+        "tag_names",
+        "thumbnail_location",
+        "title",
+        "title_rank",
+        "updated_timestamp",
+        "views",
+    )
+    id: int
+    title: str
+    slug: str
+    thumbnail_location: str | None
+    read_mins: int | None
+    html_description: str
+    created_timestamp: datetime
+    updated_timestamp: datetime
+    views: int
+    likes: int
+    tag_names: list[str]
+    comment_count: int
+
+    def __init__(self, fields: Mapping[str, Any], *, bit: int, title_rank: int) -> None:
+        for column in LIST_COLUMNS:
+            setattr(self, column.key, fields[column.key])
+        self.bit = bit  # <-- This post's bit in the tag bitsets
+        self.title_rank = title_rank  # <-- Position by title, as the database orders them
+
+
+# Sort keys of the posts by each field they can be listed by. Titles are sorted
+# by the database (its collation, not Python's string order, decides), and
+# `read_mins` is coalesced like `blog_handler.KEYSET_SORT_KEYS` (it's always set
+# when a post is saved).
+SORT_KEYS: dict[str, Callable[[CatalogPost], tuple[Any, int]]] = {
+    "created_timestamp": attrgetter("created_timestamp", "id"),
+    "title": attrgetter("title_rank", "id"),
+    "read_mins": lambda post: (post.read_mins or 0, post.id),
+    "views": attrgetter("views", "id"),
+    "likes": attrgetter("likes", "id"),
+    "comment_count": attrgetter("comment_count", "id"),
+}
+
+
+class PostCatalog:
+    """Published blog posts' list fields, presorted and indexed by tag."""
+
+    def __init__(self) -> None:
+        self.is_loaded = False
+        self._posts: dict[int, CatalogPost] = {}
+        self._by_bit: list[CatalogPost] = []  # <-- Indexed by bit position (title order)
+        self._sorted: dict[str, list[CatalogPost]] = {}  # <-- Ascending by `SORT_KEYS`
+        self._tag_bits: dict[str, int] = {}
+        self._title_ranks: dict[str, int] = {}
+        self._all_bits = 0
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def count(self, *, tags: list[str] | None = None) -> int:
+        """Return the number of posts (with any of the tags, if given)."""
+        return self._get_mask(tags).bit_count()
+
+    def get_page(
+        self,
+        *,
+        order_by_field: str,
+        asc: bool,
+        tags: list[str] | None = None,
+        offset: int = 0,
+        limit: int,
+    ) -> list[CatalogPost]:
+        """Return a page of the posts (with any of the tags, if given)."""
+        mask = self._get_mask(tags)
+        if self._is_sparse(mask):
+            posts = self._sort_masked(order_by_field, mask)
+        elif mask == self._all_bits:
+            posts = self._sorted[order_by_field]
+        else:
+            ordered = (
+                self._sorted[order_by_field] if asc else reversed(self._sorted[order_by_field])
+            )
+            matches = (post for post in ordered if post.bit & mask)
+            return list(islice(matches, offset, offset + limit))
+        if asc:
+            return posts[offset : offset + limit]
+        stop = max(len(posts) - offset, 0)
+        return posts[max(stop - limit, 0) : stop][::-1]
+
+    def get_after(
+        self,
+        *,
+        order_by_field: str,
+        asc: bool,
+        tags: list[str] | None = None,
+        position: tuple[Any, int] | None,
+        limit: int,
+    ) -> list[CatalogPost] | None:
+        """Return the posts after a `(sort value, id)` keyset position.
+
+        Returns `None` if the position can't be placed in the catalog (a title
+        that's no longer a published post's, or a sort value of the wrong type).
+        """
+        mask = self._get_mask(tags)
+        if self._is_sparse(mask):
+            posts = self._sort_masked(order_by_field, mask)
+            mask = self._all_bits
+        else:
+            posts = self._sorted[order_by_field]
+        if position is None:
+            start = 0 if asc else len(posts)
+        else:
+            sort_value, bp_id = position
+            if (
+                order_by_field == "title"
+                and (sort_value := self._title_ranks.get(sort_value)) is None
+            ):
+                return None
+            bisect = bisect_right if asc else bisect_left
+            try:
+                start = bisect(posts, (sort_value, bp_id), key=SORT_KEYS[order_by_field])
+            except TypeError:
+                return None
+        ordered = islice(posts, start, None) if asc else _iter_backwards(posts, start)
+        return list(islice((post for post in ordered if post.bit & mask), limit))
+
+    def set_counts(self, field: str, counts: Mapping[int, int]) -> None:
+        """Set posts' likes, views or comment counts, by id."""
+        for bp_id, count in counts.items():
+            if (post := self._posts.get(bp_id)) is not None:
+                self._set_count(post, field, count)
+
+    def build(self, posts: Iterable[Mapping[str, Any]]) -> None:
+        """Replace the catalog with published posts' `LIST_COLUMNS`, in title order."""
+        records = [CatalogPost(fields, bit=1 << i, title_rank=i) for i, fields in enumerate(posts)]
+        tag_bits: defaultdict[str, int] = defaultdict(int)
+        for post in records:
+            for tag in post.tag_names:
+                tag_bits[tag] |= post.bit
+        self._posts = {post.id: post for post in records}
+        self._by_bit = records
+        self._sorted = {field: sorted(records, key=key) for field, key in SORT_KEYS.items()}
+        self._tag_bits = dict(tag_bits)
+        self._title_ranks = {post.title: post.title_rank for post in records}
+        self._all_bits = (1 << len(records)) - 1
+        self.is_loaded = True
+
+    def mark_stale(self) -> None:
+        """Stop listing blog posts from the catalog (without emptying it) until it's rebuilt."""
+        self.is_loaded = False
+
+    def reset(self) -> None:
+        """Empty the catalog, so blog posts are listed from the database until it's rebuilt."""
+        self.build([])
+        self.is_loaded = False
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Rebuild the catalog from the database."""
+        stmt = (
+            select(*LIST_COLUMNS)
+            .where(db_models.BlogPost.is_published)
+            .order_by(db_models.BlogPost.title, db_models.BlogPost.id)
+        )
+        result = await db.execute(stmt)
+        self.build(result.mappings())
+
+    async def refresh_counts(self, db: AsyncSession, bp_ids: Iterable[int]) -> None:
+        """Reload posts' likes and comment counts from the database."""
+        bp = db_models.BlogPost
+        result = await db.execute(
+            select(bp.id, bp.likes, bp.comment_count).where(bp.id.in_(list(bp_ids)))
+        )
+        rows = result.tuples().all()
+        self.set_counts("likes", {bp_id: likes for bp_id, likes, _ in rows})
+        self.set_counts("comment_count", {bp_id: count for bp_id, _, count in rows})
+
+    async def refresh_with_new_session(
+        self, session_maker: async_sessionmaker[AsyncSession]
+    ) -> None:
+        """Rebuild the catalog with a new session, logging (not raising) errors."""
+        try:
+            async with session_maker() as db:
+                await self.refresh(db)
+        except sqlalchemy.exc.SQLAlchemyError:
+            logger.exception("Error building the published blog post catalog")
+
+    def _get_mask(self, tags: list[str] | None) -> int:
+        """Return the bitset of the posts with any of the tags (all posts, without tags)."""
+        if tags is None:
+            return self._all_bits
+        mask = 0
+        for tag in tags:
+            mask |= self._tag_bits.get(tag, 0)
+        return mask
+
+    def _is_sparse(self, mask: int) -> bool:
+        """Return whether few enough posts are in a bitset to sort them, rather than scan."""
+        return mask.bit_count() * SPARSE_FRACTION < len(self._by_bit)
+
+    def _sort_masked(self, order_by_field: str, mask: int) -> list[CatalogPost]:
+        """Return the posts in a bitset, sorted (ascending) by a field."""
+        posts = []
+        while mask:
+            bit = mask & -mask  # <-- The lowest set bit
+            posts.append(self._by_bit[bit.bit_length() - 1])
+            mask ^= bit
+        return sorted(posts, key=SORT_KEYS[order_by_field])
+
+    def _set_count(self, post: CatalogPost, field: str, count: int) -> None:
+        """Set a post's count, moving it to its new place in the field's sorted posts."""
+        posts, key = self._sorted[field], SORT_KEYS[field]
+        del posts[bisect_left(posts, key(post), key=key)]
+        setattr(post, field, count)
+        insort(posts, post, key=key)
+
+
+def _iter_backwards(posts: list[CatalogPost], stop: int) -> Iterator[CatalogPost]:
+    """Iterate over the posts before `stop`, last first."""
+    for i in range(stop - 1, -1, -1):
+        yield posts[i]
+
+
+published_posts = PostCatalog()
@@ -0,0 +1,282 @@
+"""render_executor: run CPU-bound markdown rendering off the event loop.
+
+Markdown conversion, HTML post-processing and bleach sanitization are pure
+CPU work which would otherwise block the event loop (and every other request on
+this worker) for the duration of a render. Renders are submitted to a process
+pool instead, falling back to a thread pool where processes can't be created.
+If a worker process dies (e.g. is OOM killed), the broken pool is replaced by a
+new one, unless pools keep breaking (`max_pool_restarts` times in a row,
+without a render finishing in between), when renders fall back to threads.
+
+The number of in-flight renders is bounded: once `max_pending` renders are
+queued or running, further renders are rejected immediately rather than piling
+up behind the slow ones. Each render is also given `timeout_secs` to finish.
+
+Media URLs are resolved to oEmbed responses (see `oembed.resolve`) before a
+render is submitted, so renders never wait on an oEmbed provider.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from logging import getLogger
+
+from app import errors
+from app.services.blog import markdown_blocks, markdown_parser, oembed
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+
+class RenderExecutor:
+    """Bounded pool for running render functions from async code."""
+
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        max_pending: int,
+        timeout_secs: float,
+        use_processes: bool = True,
+        max_pool_restarts: int = 3,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout_secs = timeout_secs
+        self.use_processes = use_processes
+        self.max_pool_restarts = max_pool_restarts
+        self.pool_restarts = 0  # <-- Broken process pools replaced since a render last finished
+        self._executor: Executor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of renders queued or running."""
+        return self._pending
+
+    @property
+    def uses_processes(self) -> bool:
+        """Whether renders run in a process pool (rather than a thread pool)."""
+        return isinstance(self._executor, ProcessPoolExecutor)
+
+    def start(self) -> None:
+        """Create the underlying pool, if not already created.
+
+        Workers are started (and warmed up, see `markdown_parser.warm_up`) straight
+        away, so the first renders don't pay for importing Pygments' lexers.
+        """
+        if self._executor is not None:
+            return
+        if self.use_processes:
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=markdown_parser.warm_up,
+                )
+            except OSError, NotImplementedError:
+                logger.warning("Could not start render process pool, falling back to threads")
+            else:
+                self._start_workers()
+                return
+        self._executor = self._new_thread_pool()
+        self._start_workers()
+
+    def shutdown(self) -> None:
+        """Shut down the underlying pool, cancelling any renders not yet started."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    async def run[**P, R](self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """Run `func(*args, **kwargs)` in the pool and await its result.
+
+        `func` and its arguments must be picklable (module level functions and
+        plain data). Raises `RenderQueueFullError` if too many renders are
+        already pending and `RenderTimeoutError` if the render doesn't finish
+        within `timeout_secs`.
+        """
+        try:
+            return await self._run_once(func, *args, **kwargs)
+        except BrokenProcessPool:
+            # A worker process died (e.g. was OOM killed). Retry once in the replacement pool.
+            return await self._run_once(func, *args, **kwargs)
+
+    async def _run_once[**P, R](self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """Submit a render to the pool and await its result, with a timeout."""
+        self.start()
+        executor = self._executor
+        assert executor is not None  # noqa: S101 (assert) -- for type checker
+        try:
+            future = self._submit(executor, func, *args, **kwargs)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_secs)
+        except TimeoutError as e:
+            raise errors.RenderTimeoutError from e
+        except BrokenProcessPool:
+            self._replace_broken_pool(executor)
+            raise
+        self.pool_restarts = 0
+        return result
+
+    def _submit[**P, R](
+        self, executor: Executor, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs
+    ) -> Future[R]:
+        """Submit a render to the pool, counting it as pending until it's done."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise errors.RenderQueueFullError
+            self._pending += 1
+        try:
+            future = executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        """Mark a render as no longer pending."""
+        with self._lock:
+            self._pending -= 1
+
+    def _replace_broken_pool(self, broken: Executor) -> None:
+        """Replace a broken process pool with a new one, or with threads if they keep breaking."""
+        if broken is not self._executor:
+            return  # <-- Already replaced, after another render found it broken
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.pool_restarts += 1
+        if self.pool_restarts > self.max_pool_restarts:
+            logger.error(
+                "Render process pool broke %d times in a row, falling back to threads",
+                self.pool_restarts,
+            )
+            self._executor = self._new_thread_pool()
+            self._start_workers()
+            return
+        logger.warning("Render process pool is broken, restarting it")
+        self._executor = None
+        self.start()  # <-- Falls back to threads if processes can't be started
+
+    def _new_thread_pool(self) -> ThreadPoolExecutor:
+        """Create the fallback thread pool."""
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="render",
+            initializer=markdown_parser.warm_up,
+        )
+
+    def _start_workers(self) -> None:
+        """Start all the pool's workers now, rather than as renders are submitted."""
+        assert self._executor is not None  # noqa: S101 (assert) -- for type checker
+        for _ in range(self.max_workers):
+            self._executor.submit(markdown_parser.warm_up)
+
+
+async def markdown_to_html(
+    markdown_content: str, *, update_headers: bool = True
+) -> markdown_parser.HTMLContent:
+    """Render markdown to HTML in the render pool. See `markdown_parser.markdown_to_html`.
+
+    Renders are cached in this process's `markdown_parser.render_cache`, so
+    unchanged markdown isn't sent to the pool at all.
+    """
+    oembeds = await oembed.resolve(markdown_content)
+    return await _markdown_to_html(markdown_content, update_headers=update_headers, oembeds=oembeds)
+
+
+async def markdown_to_html_incremental(
+    markdown_content: str, *, update_headers: bool = True
+) -> markdown_parser.HTMLContent:
+    """Render markdown to HTML block by block in the render pool, caching each block.
+
+    Gives the same result as `markdown_to_html` (see `markdown_blocks` for how
+    markdown is split). Blocks missing from the render cache are rendered
+    together, in one trip to the pool.
+    """
+    oembeds = await oembed.resolve(markdown_content)
+    blocks = markdown_blocks.split_markdown_blocks(markdown_content)
+    if blocks is None:
+        return await _markdown_to_html(
+            markdown_content, update_headers=update_headers, oembeds=oembeds
+        )
+    rendered = await _markdown_blocks_to_html(
+        blocks, update_headers=update_headers, oembeds=oembeds
+    )
+    toc_markdown = markdown_blocks.get_toc_markdown(blocks, rendered)
+    if toc_markdown is None:
+        return await _markdown_to_html(
+            markdown_content, update_headers=update_headers, oembeds=oembeds
+        )
+    # Only the TOC is kept, so media needn't be embedded
+    toc = (await _markdown_to_html(toc_markdown, update_headers=update_headers, oembeds={})).toc
+    return markdown_blocks.join_rendered_blocks(rendered, toc=toc)
+
+
+async def _markdown_to_html(
+    markdown_content: str, *, update_headers: bool, oembeds: dict[str, oembed.OEmbedResponse]
+) -> markdown_parser.HTMLContent:
+    """Render markdown with resolved oEmbed responses, from the render cache if possible."""
+    cache = markdown_parser.render_cache
+    key = cache.get_key(markdown_content, update_headers=update_headers, oembeds=oembeds)
+    if (html_content := cache.get(key)) is not None:
+        return html_content
+    html_content = await renderer.run(
+        markdown_parser.render_markdown,
+        markdown_content,
+        update_headers=update_headers,
+        oembeds=oembeds,
+    )
+    cache.put(key, html_content)
+    return html_content
+
+
+async def _markdown_blocks_to_html(
+    blocks: list[str], *, update_headers: bool, oembeds: dict[str, oembed.OEmbedResponse]
+) -> list[markdown_parser.HTMLContent]:
+    """Render markdown blocks, from the render cache where possible.
+
+    Each block's cache key only includes the oEmbed responses for its own media
+    URLs, so adding media to one block doesn't invalidate the others.
+    """
+    cache = markdown_parser.render_cache
+    keys = [
+        cache.get_key(
+            block,
+            update_headers=update_headers,
+            oembeds=oembed.select_responses(oembeds, block),
+        )
+        for block in blocks
+    ]
+    found = {key: html_content for key in keys if (html_content := cache.get(key)) is not None}
+    missing = {key: block for key, block in zip(keys, blocks, strict=True) if key not in found}
+    if missing:
+        rendered = await renderer.run(
+            markdown_parser.render_markdown_blocks,
+            list(missing.values()),
+            update_headers=update_headers,
+            oembeds=oembeds,
+        )
+        for key, html_content in zip(missing, rendered, strict=True):
+            cache.put(key, html_content)
+            found[key] = html_content
+    return [found[key] for key in keys]
+
+
+async def comment_to_html(content: str) -> str:
+    """Render comment markdown to HTML in the render pool. See `markdown_parser.comment_to_html`."""
+    oembeds = await oembed.resolve(content)
+    return await renderer.run(markdown_parser.comment_to_html, content, oembeds=oembeds)
+
+
+renderer = RenderExecutor(
+    max_workers=settings.render_workers,
+    max_pending=settings.render_max_pending,
+    timeout_secs=settings.render_timeout_secs,
+    use_processes=settings.render_use_processes,
+    max_pool_restarts=settings.render_max_pool_restarts,
+)
@@ -0,0 +1,277 @@
+"""search_completions: search-as-you-type completions of blog post titles, tags and series.
+
+Completions are served from in-process sorted arrays of `(key, completion)`
+pairs, searched with `bisect`, so typing in the search box never costs a
+database round trip. Every completion is keyed by its whole label, and titles
+and series names also by the rest of the label from each later word (so
+"tips" completes "Pytest tips"), in a second array searched after the first.
+
+Only published posts (and the tags and series of published posts) are
+indexed. The index is built at startup and updated incrementally as blog
+posts and series are saved (see the `invalidation_bus` handlers in
+`blog_handler`).
+"""
+
+import enum
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from itertools import islice
+from logging import getLogger
+
+import sqlalchemy.exc
+from sqlalchemy import ColumnElement, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.datastore import db_models
+
+logger = getLogger(__name__)
+
+DEFAULT_MAX_COMPLETIONS = 8
+WORD_START_RE = re.compile(r"\b\w")
+
+
+class CompletionKind(enum.IntEnum):
+    """Kinds of completions, in the order they're listed."""
+
+    POST = 0
+    SERIES = 1
+    TAG = 2
+
+
+@dataclass(slots=True, frozen=True, order=True)
+class Completion:
+    """A completion of a search, linking to what it names."""
+
+    kind: CompletionKind
+    label: str
+    value: str  # <-- Post slug, series name or tag
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class IndexedPost:
+    """The fields of a published blog post that are completed."""
+
+    title: str
+    slug: str
+    tags: tuple[str, ...]
+    series_id: int | None
+
+
+class CompletionIndex:
+    """Sorted prefix index of published blog post titles, tags and series names."""
+
+    def __init__(self, *, max_completions: int = DEFAULT_MAX_COMPLETIONS) -> None:
+        self.max_completions = max_completions
+        self._entries: list[tuple[str, Completion]] = []  # <-- Keyed by whole labels
+        self._word_entries: list[tuple[str, Completion]] = []  # <-- Keyed from later words
+        self._posts: dict[int, IndexedPost] = {}
+        self._series_names: dict[int, str] = {}
+        self._tag_counts: Counter[str] = Counter()  # <-- Published posts per tag
+        self._series_counts: Counter[int] = Counter()  # <-- Published posts per series
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def complete(self, search: str) -> list[Completion]:
+        """Return completions of a partly typed search.
+
+        Completions whose label starts with the search come first, then those
+        with a later word starting with it, each by kind and then label.
+        """
+        prefix = _normalize(search)
+        if not prefix:
+            return []
+        completions = _find_prefixed(self._entries, prefix, limit=self.max_completions)
+        if len(completions) < self.max_completions:
+            word_completions = _find_prefixed(
+                self._word_entries, prefix, limit=self.max_completions
+            )
+            completions += [c for c in word_completions if c not in completions]
+        return completions[: self.max_completions]
+
+    def build(
+        self, *, posts: Iterable[tuple[int, IndexedPost]], series_names: dict[int, str]
+    ) -> None:
+        """Replace the index with published posts, by id, and all series' names."""
+        self._entries = []
+        self._word_entries = []
+        self._posts = {}
+        self._series_names = dict(series_names)
+        self._tag_counts = Counter()
+        self._series_counts = Counter()
+        for bp_id, post in posts:
+            self._add_post(bp_id, post)
+
+    def reset(self) -> None:
+        """Empty the index, until it's next refreshed."""
+        self.build(posts=(), series_names={})
+
+    def update_post(self, bp_id: int, post: IndexedPost | None) -> None:
+        """Update (or with `None`, remove) a blog post's completions."""
+        if (old_post := self._posts.pop(bp_id, None)) is not None:
+            self._remove_completion(Completion(CompletionKind.POST, old_post.title, old_post.slug))
+            for tag in old_post.tags:
+                self._decrement_tag(tag)
+            if old_post.series_id is not None:
+                self._decrement_series(old_post.series_id)
+        if post is not None:
+            self._add_post(bp_id, post)
+
+    def update_series(self, series_id: int, name: str | None) -> None:
+        """Update (or with `None`, remove) a series' name."""
+        old_name = self._series_names.pop(series_id, None)
+        is_indexed = self._series_counts[series_id] > 0
+        if is_indexed and old_name is not None:
+            self._remove_completion(Completion(CompletionKind.SERIES, old_name, old_name))
+        if name is None:
+            self._series_counts.pop(series_id, None)
+            for bp_id, post in self._posts.items():
+                if post.series_id == series_id:
+                    self._posts[bp_id] = IndexedPost(
+                        title=post.title, slug=post.slug, tags=post.tags, series_id=None
+                    )
+            return
+        self._series_names[series_id] = name
+        if is_indexed:
+            self._add_completion(Completion(CompletionKind.SERIES, name, name))
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Rebuild the index from the database."""
+        posts = await _select_published_posts(db)
+        series = await db.execute(
+            select(db_models.BlogPostSeries.id, db_models.BlogPostSeries.name)
+        )
+        self.build(posts=posts.items(), series_names=dict(series.tuples().all()))
+
+    async def refresh_posts(self, db: AsyncSession, bp_ids: Iterable[int]) -> None:
+        """Update blog posts' completions from the database (removing unpublished posts')."""
+        bp_ids = list(bp_ids)
+        posts = await _select_published_posts(db, db_models.BlogPost.id.in_(bp_ids))
+        for bp_id in bp_ids:
+            self.update_post(bp_id, posts.get(bp_id))
+
+    async def refresh_series(self, db: AsyncSession, series_ids: Iterable[int]) -> None:
+        """Update series' names from the database (removing deleted series)."""
+        series_ids = list(series_ids)
+        result = await db.execute(
+            select(db_models.BlogPostSeries.id, db_models.BlogPostSeries.name).where(
+                db_models.BlogPostSeries.id.in_(series_ids)
+            )
+        )
+        names = dict(result.tuples().all())
+        for series_id in series_ids:
+            self.update_series(series_id, names.get(series_id))
+
+    async def refresh_with_new_session(
+        self, session_maker: async_sessionmaker[AsyncSession]
+    ) -> None:
+        """Rebuild the index with a new session, logging (not raising) errors."""
+        try:
+            async with session_maker() as db:
+                await self.refresh(db)
+        except sqlalchemy.exc.SQLAlchemyError:
+            logger.exception("Error building blog search completions")
+
+    def _add_post(self, bp_id: int, post: IndexedPost) -> None:
+        """Add a published blog post's title, tags and series."""
+        self._posts[bp_id] = post
+        self._add_completion(Completion(CompletionKind.POST, post.title, post.slug))
+        for tag in post.tags:
+            self._tag_counts[tag] += 1
+            if self._tag_counts[tag] == 1:
+                self._add_completion(Completion(CompletionKind.TAG, tag, tag))
+        if post.series_id is not None:
+            self._series_counts[post.series_id] += 1
+            name = self._series_names.get(post.series_id)
+            if self._series_counts[post.series_id] == 1 and name is not None:
+                self._add_completion(Completion(CompletionKind.SERIES, name, name))
+
+    def _decrement_tag(self, tag: str) -> None:
+        """Count one less published post with a tag, removing it if it was the last."""
+        self._tag_counts[tag] -= 1
+        if self._tag_counts[tag] <= 0:
+            del self._tag_counts[tag]
+            self._remove_completion(Completion(CompletionKind.TAG, tag, tag))
+
+    def _decrement_series(self, series_id: int) -> None:
+        """Count one less published post in a series, removing it if it was the last."""
+        self._series_counts[series_id] -= 1
+        if self._series_counts[series_id] <= 0:
+            del self._series_counts[series_id]
+            if (name := self._series_names.get(series_id)) is not None:
+                self._remove_completion(Completion(CompletionKind.SERIES, name, name))
+
+    def _add_completion(self, completion: Completion) -> None:
+        """Insert a completion under each of its keys."""
+        label, word_keys = _get_keys(completion)
+        insort(self._entries, (label, completion))
+        for key in word_keys:
+            insort(self._word_entries, (key, completion))
+
+    def _remove_completion(self, completion: Completion) -> None:
+        """Delete a completion from under each of its keys."""
+        label, word_keys = _get_keys(completion)
+        _remove_entry(self._entries, (label, completion))
+        for key in word_keys:
+            _remove_entry(self._word_entries, (key, completion))
+
+
+async def _select_published_posts(
+    db: AsyncSession, *filters: ColumnElement[bool]
+) -> dict[int, IndexedPost]:
+    """Select the completed fields of published blog posts, by id."""
+    bp = db_models.BlogPost
+    result = await db.execute(
+        select(bp.id, bp.title, bp.slug, bp.tag_names, bp.series_id).where(
+            bp.is_published.is_(True), *filters
+        )
+    )
+    return {
+        bp_id: IndexedPost(title=title, slug=slug, tags=tuple(tags), series_id=series_id)
+        for bp_id, title, slug, tags, series_id in result.tuples()
+    }
+
+
+def _find_prefixed(
+    entries: list[tuple[str, Completion]], prefix: str, *, limit: int
+) -> list[Completion]:
+    """Return the completions of sorted entries with keys starting with a prefix.
+
+    Matches are taken in key order (so a one letter search doesn't walk the
+    whole index), up to a few times the limit, then ordered by kind and label.
+    """
+    matches: dict[Completion, None] = {}
+    for key, completion in islice(entries, bisect_left(entries, (prefix,)), None):
+        if not key.startswith(prefix) or len(matches) >= limit * 4:
+            break
+        matches[completion] = None
+    return sorted(matches)[:limit]
+
+
+def _remove_entry(entries: list[tuple[str, Completion]], entry: tuple[str, Completion]) -> None:
+    """Delete an entry from sorted entries, if present."""
+    i = bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+def _normalize(text: str) -> str:
+    """Return text as compared when completing (case-insensitive, single spaced)."""
+    return " ".join(text.casefold().split())
+
+
+def _get_keys(completion: Completion) -> tuple[str, set[str]]:
+    """Return the key of a completion's whole label, and its keys from later words.
+
+    Tags are only keyed by the whole tag.
+    """
+    label = _normalize(completion.label)
+    if completion.kind == CompletionKind.TAG:
+        return label, set()
+    return label, {label[match.start() :] for match in WORD_START_RE.finditer(label)} - {label}
+
+
+blog_completions = CompletionIndex()
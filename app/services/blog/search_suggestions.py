@@ -0,0 +1,225 @@
+"""search_suggestions: "did you mean" suggestions for blog searches without results.
+
+Suggestions come from an in-process symmetric delete index (as in SymSpell)
+of the published posts' vocabulary: the words of their titles, descriptions,
+content and tags, plus the lexemes of their search vectors. Each word is
+indexed under every string left by deleting up to `max_distance` characters
+from its prefix, so correcting a misspelled word only means looking up that
+word's own deletes (no fuzzy scan of the vocabulary, or of `blog_posts`).
+
+The index is built at startup and rebuilt whenever a blog post is saved.
+"""
+
+import re
+from collections.abc import Iterator, Mapping
+from itertools import combinations
+from logging import getLogger
+
+import sqlalchemy.exc
+from sqlalchemy import CompoundSelect, Select, func, literal_column, select, union_all
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.datastore import db_models
+
+logger = getLogger(__name__)
+
+DEFAULT_MAX_DISTANCE = 2
+DEFAULT_PREFIX_LENGTH = 7  # <-- Deletes of longer words' prefixes only (bounds the index size)
+DEFAULT_MAX_SUGGESTIONS = 3
+MAX_WORD_LENGTH = 30  # <-- Longer "words" are more likely URLs or code than prose
+WORD_RE = re.compile(r"[^\W\d_]+")  # <-- Runs of letters
+
+
+class SuggestionIndex:
+    """Symmetric delete spelling correction index of a vocabulary."""
+
+    def __init__(
+        self,
+        *,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        prefix_length: int = DEFAULT_PREFIX_LENGTH,
+        max_suggestions: int = DEFAULT_MAX_SUGGESTIONS,
+    ) -> None:
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.max_suggestions = max_suggestions
+        self._counts: dict[str, int] = {}
+        self._deletes: dict[str, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, word: str) -> bool:
+        return word.lower() in self._counts
+
+    def build(self, counts: Mapping[str, int]) -> None:
+        """Replace the vocabulary with words and how many posts they're found in."""
+        new_counts: dict[str, int] = {}
+        new_deletes: dict[str, list[str]] = {}
+        for word, count in counts.items():
+            word = word.lower()  # noqa: PLW2901 (redefined-loop-name)
+            if not WORD_RE.fullmatch(word) or len(word) > MAX_WORD_LENGTH:
+                continue
+            new_counts[word] = max(count, new_counts.get(word, 0))
+            for deleted in self._get_deletes(word):
+                new_deletes.setdefault(deleted, []).append(word)
+        # Swapped in whole, so lookups never see a half built index
+        self._counts, self._deletes = new_counts, new_deletes
+
+    def lookup(self, word: str) -> list[str]:
+        """Return the closest vocabulary words to a word, most likely first.
+
+        Candidates are ordered by edit distance, then by how close they are in
+        length (favouring a transposition over a deletion), then by how many
+        posts they're found in. Shorter words get a smaller maximum distance, so that they
+        aren't "corrected" to any other short word.
+        """
+        word = word.lower()
+        max_distance = min(self.max_distance, (len(word) - 1) // 2)
+        if word in self._counts or max_distance < 1:
+            return []
+        counts, deletes = self._counts, self._deletes
+        candidates: dict[str, int] = {}
+        for deleted in self._get_deletes(word, max_distance=max_distance):
+            for candidate in deletes.get(deleted, ()):
+                if candidate not in candidates:
+                    candidates[candidate] = get_edit_distance(
+                        word, candidate, max_distance=max_distance
+                    )
+        return sorted(
+            (c for c, distance in candidates.items() if distance <= max_distance),
+            key=lambda c: (candidates[c], abs(len(c) - len(word)), -counts[c], c),
+        )[: self.max_suggestions]
+
+    def suggest(self, search: str) -> list[str]:
+        """Return corrected versions of a search, most likely first.
+
+        Only words missing from the vocabulary are corrected. The best
+        suggestion corrects every such word; the others try the next best
+        corrections of the first one.
+        """
+        corrections: dict[str, list[str]] = {}
+        for match in WORD_RE.finditer(search):
+            word = match.group()
+            if word not in corrections and (candidates := self.lookup(word)):
+                corrections[word] = candidates
+        if not corrections:
+            return []
+        best = {word: candidates[0] for word, candidates in corrections.items()}
+        first_word = next(iter(corrections))
+        return [
+            _replace_words(search, best | {first_word: first_correction})
+            for first_correction in corrections[first_word]
+        ]
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Rebuild the index from the published blog posts' vocabulary."""
+        result = await db.execute(_get_vocabulary_statement())
+        counts: dict[str, int] = {}
+        for word, count in result.tuples():
+            counts[word] = max(count, counts.get(word, 0))
+        self.build(counts)
+
+    async def refresh_with_new_session(
+        self, session_maker: async_sessionmaker[AsyncSession]
+    ) -> None:
+        """Rebuild the index with a new session, logging (not raising) errors."""
+        try:
+            async with session_maker() as db:
+                await self.refresh(db)
+        except sqlalchemy.exc.SQLAlchemyError:
+            logger.exception("Error building blog search suggestions")
+
+    def _get_deletes(self, word: str, *, max_distance: int | None = None) -> Iterator[str]:
+        """Yield the word's prefix with every combination of up to `max_distance` deletes."""
+        prefix = word[: self.prefix_length]
+        max_distance = self.max_distance if max_distance is None else max_distance
+        yield prefix
+        for distance in range(1, min(max_distance, len(prefix) - 1) + 1):
+            for deleted in combinations(range(len(prefix)), distance):
+                yield "".join(c for i, c in enumerate(prefix) if i not in deleted)
+
+
+def get_edit_distance(a: str, b: str, *, max_distance: int | None = None) -> int:
+    """Return the optimal string alignment distance between two strings.
+
+    That is, the Levenshtein distance, counting the transposition of two
+    adjacent characters as a single edit (the most common typo). Past
+    `max_distance`, gives up early and returns `max_distance + 1`.
+    """
+    a, b = _strip_common_affixes(a, b)
+    if max_distance is None:
+        max_distance = max(len(a), len(b))
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            distance = min(
+                previous[j] + 1,  # <-- Deletion
+                current[j - 1] + 1,  # <-- Insertion
+                previous[j - 1] + (char_a != char_b),  # <-- Substitution
+            )
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, previous_previous[j - 2] + 1)  # <-- Transposition
+            current.append(distance)
+        if min(current) > max_distance:  # <-- Distances only grow from here
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def _strip_common_affixes(a: str, b: str) -> tuple[str, str]:
+    """Return two strings without their shared prefix and suffix (which cost no edits)."""
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < min(len(a), len(b)) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    return a[start : len(a) - end], b[start : len(b) - end]
+
+
+def _replace_words(text: str, replacements: Mapping[str, str]) -> str:
+    """Return the text with words replaced, leaving everything between them as is."""
+    return WORD_RE.sub(lambda match: replacements.get(match.group(), match.group()), text)
+
+
+def _get_vocabulary_statement() -> CompoundSelect:
+    """Return a statement selecting published posts' words and how many posts they're in.
+
+    Words are taken as written (lowercased, the "simple" configuration) for
+    readable suggestions, along with the stemmed lexemes actually searched.
+    """
+    published = db_models.BlogPost.is_published.is_(True)
+    words = select(
+        func.to_tsvector(
+            literal_column("'simple'::regconfig"),  # <-- As SQL (regconfig has no literal renderer)
+            func.concat_ws(
+                " ",
+                db_models.BlogPost.title,
+                db_models.BlogPost.markdown_description,
+                db_models.BlogPost.markdown_content,
+                func.array_to_string(db_models.BlogPost.tag_names, " "),
+            ),
+        )
+    ).where(published)
+    lexemes = select(db_models.BlogPost.ts_vector).where(published)
+    return union_all(_select_ts_stat(words), _select_ts_stat(lexemes))
+
+
+def _select_ts_stat(vectors: Select) -> Select:
+    """Return a statement selecting each word in some vectors, with its document count.
+
+    `ts_stat` takes its query as SQL text, so the statement is compiled with
+    its (constant) parameters inlined.
+    """
+    query = vectors.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    stat = func.ts_stat(str(query)).table_valued("word", "ndoc")
+    return select(stat.c.word, stat.c.ndoc)
+
+
+blog_search_suggestions = SuggestionIndex()
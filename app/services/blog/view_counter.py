@@ -0,0 +1,181 @@
+"""view_counter: buffered, batched blog post view counting.
+
+Rather than an UPDATE + COMMIT (and a row lock) per page view, views are
+collected in-process per blog post and written with a single batched
+`UPDATE ... FROM (VALUES ...)`, by a background task, either periodically or
+once enough views are pending. Displayed counts are the last known database value plus any pending
+views for this worker. Other workers learn of written counts from the
+`BLOG_POST_VIEWS` invalidation events flushes commit with.
+"""
+
+import asyncio
+import contextlib
+from logging import getLogger
+
+import sqlalchemy.exc
+from sqlalchemy import Integer, column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import errors
+from app.datastore import db_models
+from app.services.blog import post_catalog
+from app.services.general import invalidation_bus, single_flight
+from app.services.general.invalidation_bus import InvalidationEvent, Namespace
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+
+class ViewCounter:
+    """In-process aggregator of blog post views."""
+
+    def __init__(self, *, flush_interval_secs: float, max_pending: int) -> None:
+        self.flush_interval_secs = flush_interval_secs
+        self.max_pending = max_pending
+        self._pending: dict[int, int] = {}
+        self._pending_total = 0
+        self._known: dict[int, int] = {}
+        self._known_loads: single_flight.SingleFlight[int, int] = single_flight.SingleFlight(
+            "blog_post_view_loads"
+        )
+        self._flush_requested: asyncio.Event | None = None  # <-- Set up by `run`
+
+    @property
+    def pending_total(self) -> int:
+        """Number of views not yet written to the database."""
+        return self._pending_total
+
+    async def get_views(self, db: AsyncSession, bp_id: int) -> int:
+        """Return the displayed view count for a blog post.
+
+        Only hits the database the first time a blog post is seen by this worker
+        (once, however many requests see it at the same time).
+        """
+        if (known := self._known.get(bp_id)) is None:
+            selected = await self._known_loads.do(
+                bp_id, lambda: _select_bp_views(db=db, bp_id=bp_id)
+            )
+            # Unless a flush set a newer count while it was being selected
+            known = self._known.setdefault(bp_id, selected)
+        return known + self._pending.get(bp_id, 0)
+
+    async def record_view(self, db: AsyncSession, bp_id: int) -> int:
+        """Record a view for a blog post and return its new displayed view count.
+
+        Once `max_pending` views have built up, `run` is woken up to flush them
+        (rather than the caller waiting on the flush).
+        """
+        views = await self.get_views(db=db, bp_id=bp_id) + 1
+        self._pending[bp_id] = self._pending.get(bp_id, 0) + 1
+        self._pending_total += 1
+        if self._pending_total >= self.max_pending and self._flush_requested is not None:
+            self._flush_requested.set()
+        return views
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Write all pending views to the database in one statement.
+
+        Returns the number of blog posts updated. On failure, the pending views
+        are put back so they're retried by the next flush.
+        """
+        pending, self._pending = self._pending, {}
+        self._pending_total = 0
+        if not pending:
+            return 0
+        try:
+            known = await _add_bp_views(db=db, deltas=pending)
+            await invalidation_bus.bus.commit(db, Namespace.BLOG_POST_VIEWS, counts=known)
+        except sqlalchemy.exc.SQLAlchemyError:
+            await db.rollback()
+            self._restore(pending)
+            raise
+        return len(known)
+
+    async def run(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """Flush pending views every `flush_interval_secs` (or at `max_pending`) until cancelled."""
+        self._flush_requested = flush_requested = asyncio.Event()
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(flush_requested.wait(), timeout=self.flush_interval_secs)
+            flush_requested.clear()
+            await self.flush_with_new_session(session_maker)
+
+    async def flush_with_new_session(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """Flush pending views with a new session, logging (not raising) errors."""
+        try:
+            async with session_maker() as db:
+                await self.flush(db)
+        except Exception:  # <-- Mustn't end `run`'s loop
+            logger.exception("Error flushing blog post views")
+
+    async def stop(
+        self, task: asyncio.Task, session_maker: async_sessionmaker[AsyncSession]
+    ) -> None:
+        """Cancel the periodic flush task and write any remaining views."""
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await self.flush_with_new_session(session_maker)
+
+    def set_known(self, counts: dict[int, int]) -> None:
+        """Set blog posts' last known database view counts, by id."""
+        self._known.update(counts)
+
+    def forget_known(self) -> None:
+        """Forget known view counts, so they're selected again when next displayed."""
+        self._known.clear()
+
+    def reset(self) -> None:
+        """Forget all pending and known view counts."""
+        self._pending.clear()
+        self._pending_total = 0
+        self._known.clear()
+
+    def _restore(self, pending: dict[int, int]) -> None:
+        """Put views from a failed flush back into the pending views."""
+        for bp_id, delta in pending.items():
+            self._pending[bp_id] = self._pending.get(bp_id, 0) + delta
+            self._pending_total += delta
+
+
+async def _select_bp_views(*, db: AsyncSession, bp_id: int) -> int:
+    """Select a blog post's view count, without loading the blog post."""
+    stmt = select(db_models.BlogPost.views).where(db_models.BlogPost.id == bp_id)
+    result = await db.execute(stmt)
+    try:
+        return result.scalars().one()
+    except sqlalchemy.exc.NoResultFound as e:
+        raise errors.BlogPostNotFoundError from e
+
+
+async def _add_bp_views(*, db: AsyncSession, deltas: dict[int, int]) -> dict[int, int]:
+    """Add view deltas to blog posts and return their updated view counts."""
+    deltas_table = values(column("id", Integer), column("delta", Integer), name="view_deltas").data(
+        list(deltas.items())
+    )
+    stmt = (
+        update(db_models.BlogPost)
+        .where(db_models.BlogPost.id == deltas_table.c.id)
+        .values(views=db_models.BlogPost.views + deltas_table.c.delta)
+        .returning(db_models.BlogPost.id, db_models.BlogPost.views)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    return dict(result.tuples().all())
+
+
+blog_post_views = ViewCounter(
+    flush_interval_secs=settings.view_counter_flush_secs,
+    max_pending=settings.view_counter_max_pending,
+)
+
+
+@invalidation_bus.bus.register(Namespace.BLOG_POST_VIEWS)
+async def _reload_blog_post_views(db: AsyncSession, event: InvalidationEvent) -> None:
+    """Update known view counts (and the catalog's) with the counts written by a flush."""
+    if event.counts:
+        blog_post_views.set_known(event.counts)
+        post_catalog.published_posts.set_counts("views", event.counts)
+    else:  # <-- Counts unknown (e.g. missed while reconnecting), so reload them
+        blog_post_views.forget_known()
+        await post_catalog.published_posts.refresh(db)
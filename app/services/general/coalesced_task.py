@@ -0,0 +1,56 @@
+"""coalesced_task: background jobs that run once for a burst of requests.
+
+Some caches are rebuilt from the whole database (e.g. the published post
+catalog), which is too slow to do inline in the request that made them stale.
+A `CoalescedTask` runs its job in a background task instead, and requests made
+while the job runs queue one more run (rather than a run each), so a burst of
+saves costs at most two rebuilds per worker.
+
+Errors are logged, not raised: there's no caller left to raise them to.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+class CoalescedTask:
+    """Runs a job in the background, once more for any requests made while it runs."""
+
+    def __init__(self, name: str, job: Callable[[], Awaitable[None]]) -> None:
+        self.name = name
+        self.job = job
+        self.runs = 0
+        self._is_requested = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def is_pending(self) -> bool:
+        """Whether a run is requested or running."""
+        return self._task is not None and not self._task.done()
+
+    def request(self) -> None:
+        """Request a run of the job, starting it unless one's already queued."""
+        self._is_requested = True
+        loop = asyncio.get_running_loop()
+        task = self._task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return  # <-- Its loop picks up the request
+        self._task = loop.create_task(self._run(), name=self.name)
+
+    async def wait(self) -> None:
+        """Wait for the requested runs to finish."""
+        if self._task is not None and self._task.get_loop() is asyncio.get_running_loop():
+            await asyncio.shield(self._task)
+
+    async def _run(self) -> None:
+        """Run the job until no more runs are requested."""
+        while self._is_requested:
+            self._is_requested = False
+            self.runs += 1
+            try:
+                await self.job()
+            except Exception:
+                logger.exception("Error running %s", self.name)
@@ -0,0 +1,182 @@
+"""invalidation_bus: cross-worker invalidation of in-process caches.
+
+Every worker keeps its own in-process caches (rendered pages, the published
+post catalog, search indexes, the sitemap...), so a write handled by one
+worker would leave the others' caches stale. Instead, service-layer writes
+commit with `InvalidationBus.commit`, which sends a typed `InvalidationEvent`
+with Postgres `pg_notify` in the write's own transaction (Postgres delivers it
+on commit, so it's sent exactly when the write is committed). Every worker
+holds one asyncpg connection LISTENing for them, which dispatches each event
+to the handlers registered for its namespace. No broker is needed beyond the
+database the writes go to anyway.
+
+Events are handled by the committing worker right after the commit (so it
+reads its own writes), and by every other worker when notified. Handlers must
+be idempotent, and treat an event without keys as "everything in the
+namespace changed". Their errors are logged, never raised: the write they're
+about is already committed.
+"""
+
+import asyncio
+import contextlib
+import enum
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from logging import getLogger
+from uuid import uuid4
+
+import asyncpg
+import pydantic
+import sqlalchemy.exc
+from pydantic import BaseModel
+from sqlalchemy import URL, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+MAX_PAYLOAD_BYTES = 7999  # <-- Postgres rejects longer `NOTIFY` payloads
+
+
+class Namespace(enum.StrEnum):
+    """What an invalidation event says changed."""
+
+    BLOG_POSTS = "blog_posts"  # <-- Blog posts were saved
+    BLOG_POST_PAGES = "blog_post_pages"  # <-- Blog posts' media or comments were edited
+    BLOG_POST_COUNTS = "blog_post_counts"  # <-- Blog posts' likes or comments changed
+    BLOG_POST_VIEWS = "blog_post_views"  # <-- Blog posts' buffered views were written
+    BLOG_SERIES = "blog_series"
+    USERS = "users"
+
+
+class InvalidationEvent(BaseModel):
+    """A change, for the caches of it to be invalidated."""
+
+    namespace: Namespace
+    keys: list[int] = []  # <-- Ids of what changed (everything in the namespace, if empty)
+    counts: dict[int, int] = {}  # <-- New counts, by id (for `BLOG_POST_VIEWS`)
+    origin: str = ""  # <-- The committing worker's `InvalidationBus.origin`
+
+
+type Handler = Callable[[AsyncSession, InvalidationEvent], Awaitable[None]]
+
+
+class InvalidationBus:
+    """Publishes invalidation events to every worker, and dispatches them to handlers."""
+
+    def __init__(self, *, channel: str, reconnect_secs: float) -> None:
+        self.channel = channel
+        self.reconnect_secs = reconnect_secs
+        self.origin = uuid4().hex  # <-- Identifies this worker's events
+        self._handlers: defaultdict[Namespace, list[Handler]] = defaultdict(list)
+        self.listening = asyncio.Event()  # <-- Set while LISTENing for other workers' events
+        self._has_listened = False
+
+    def register(self, namespace: Namespace) -> Callable[[Handler], Handler]:
+        """Decorate a handler of a namespace's events."""
+
+        def decorator(handler: Handler) -> Handler:
+            self._handlers[namespace].append(handler)
+            return handler
+
+        return decorator
+
+    async def commit(
+        self,
+        db: AsyncSession,
+        namespace: Namespace,
+        *,
+        keys: Iterable[int] = (),
+        counts: Mapping[int, int] | None = None,
+    ) -> None:
+        """Commit a session's transaction, with an event about the changes in it.
+
+        The event is sent to the other workers in the transaction, then handled
+        in this worker (with a new session) once it's committed. Events too
+        large to send are sent as a change to everything in the namespace.
+        Errors committing are raised, as from `db.commit()`.
+        """
+        event = InvalidationEvent(
+            namespace=namespace, keys=list(keys), counts=dict(counts or {}), origin=self.origin
+        )
+        payload = event.model_dump_json()
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            payload = InvalidationEvent(namespace=namespace, origin=self.origin).model_dump_json()
+        await db.execute(select(func.pg_notify(self.channel, payload)))
+        await db.commit()
+        async with AsyncSession(db.bind, expire_on_commit=False) as handler_db:
+            await self.dispatch(handler_db, event)
+
+    async def dispatch(self, db: AsyncSession, event: InvalidationEvent) -> None:
+        """Run the handlers of an event's namespace, logging (not raising) their errors."""
+        for handler in self._handlers[event.namespace]:
+            try:
+                await handler(db, event)
+            except Exception:
+                logger.exception(
+                    "Error handling %s invalidation event with %s",
+                    event.namespace,
+                    handler.__qualname__,
+                )
+                with contextlib.suppress(sqlalchemy.exc.SQLAlchemyError):
+                    await db.rollback()  # <-- So the next handlers can use the session
+
+    async def run(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """Handle other workers' events until cancelled, reconnecting if disconnected."""
+        while True:
+            try:
+                await self._listen(session_maker)
+            except Exception:
+                logger.exception("Error listening for invalidation events")
+            await asyncio.sleep(self.reconnect_secs)
+
+    async def stop(self, task: asyncio.Task) -> None:
+        """Stop handling other workers' events."""
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _listen(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """LISTEN for events on one connection, handling them until it's closed."""
+        payloads: asyncio.Queue[str | None] = asyncio.Queue()
+        async with session_maker() as db:
+            url = db.get_bind().engine.url
+        connection = await asyncpg.connect(_get_asyncpg_dsn(url))
+        try:
+            connection.add_termination_listener(lambda _: payloads.put_nowait(None))
+            await connection.add_listener(self.channel, lambda *args: payloads.put_nowait(args[-1]))
+            if self._has_listened:  # <-- Events were missed while reconnecting
+                for namespace in Namespace:
+                    await self._handle(session_maker, InvalidationEvent(namespace=namespace))
+            self._has_listened = True
+            self.listening.set()
+            while (payload := await payloads.get()) is not None:
+                try:
+                    event = InvalidationEvent.model_validate_json(payload)
+                except pydantic.ValidationError:
+                    logger.warning("Ignoring invalid invalidation event: %s", payload)
+                    continue
+                if event.origin != self.origin:
+                    await self._handle(session_maker, event)
+        finally:
+            self.listening.clear()
+            await connection.close()
+
+    async def _handle(
+        self, session_maker: async_sessionmaker[AsyncSession], event: InvalidationEvent
+    ) -> None:
+        """Dispatch an event with a new session."""
+        async with session_maker() as db:
+            await self.dispatch(db, event)
+
+
+def _get_asyncpg_dsn(url: URL) -> str:
+    """Return the asyncpg DSN of a SQLAlchemy database URL (of any Postgres driver)."""
+    return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+bus = InvalidationBus(
+    channel=settings.invalidation_channel,
+    reconnect_secs=settings.invalidation_reconnect_secs,
+)
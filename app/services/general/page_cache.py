@@ -0,0 +1,193 @@
+"""page_cache: in-process cache for fully rendered HTML pages.
+
+Rendered pages contain the per-request CSP nonce (see `CSPMiddleware`), so they
+can't be cached as-is. Instead, pages are rendered with `NONCE_PLACEHOLDER` in
+place of the nonce, stored once, and the real nonce is swapped in at serve time
+with a single string substitution.
+
+Only pages that are identical for every visitor sharing a cache key should be
+stored here (e.g. anonymous visitors without pending flash messages).
+
+Pages have a soft and a hard TTL. Past the soft TTL a page is stale: it's
+still served, and the first request for it re-renders it in the background
+(see `PageCache.claim_refresh`). If that fails (say, the database is down),
+the stale page keeps being served, and re-rendered every `retry_seconds`,
+until the hard TTL. Invalidated pages are dropped right away.
+"""
+
+import secrets
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable
+
+from app.settings import settings
+
+# Random per process, so it can't be guessed and smuggled into user content.
+NONCE_PLACEHOLDER = f"__csp_nonce_{secrets.token_hex(16)}__"
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_SOFT_TTL_SECONDS = 60 * 10
+DEFAULT_HARD_TTL_SECONDS = 60 * 60 * 24
+DEFAULT_RETRY_SECONDS = 30
+
+
+class CachedPage:
+    """A rendered page, stored with a placeholder CSP nonce."""
+
+    __slots__ = (
+        "bp_id",
+        "expires_at",
+        "html",
+        "is_refreshing",
+        "owner_guest_ids",
+        "shown_bp_ids",
+        "stale_at",
+    )
+
+    def __init__(  # noqa: PLR0913 (too-many-arguments)
+        self,
+        *,
+        html: str,
+        bp_id: int,
+        shown_bp_ids: frozenset[int],
+        owner_guest_ids: frozenset[str],
+        stale_at: float,
+        expires_at: float,
+    ) -> None:
+        self.html = html
+        self.bp_id = bp_id
+        self.shown_bp_ids = shown_bp_ids  # <-- Other blog posts linked from the page
+        self.owner_guest_ids = owner_guest_ids
+        self.stale_at = stale_at
+        self.expires_at = expires_at
+        self.is_refreshing = False
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the page has outlived its soft TTL (and should be re-rendered)."""
+        return time.monotonic() >= self.stale_at
+
+    @property
+    def is_expired(self) -> bool:
+        """Whether the page has outlived its hard TTL (and can't be served)."""
+        return time.monotonic() >= self.expires_at
+
+    def render(self, nonce: str) -> str:
+        """Return the page HTML with the request's CSP nonce swapped in."""
+        return self.html.replace(NONCE_PLACEHOLDER, nonce)
+
+
+class PageCache:
+    """Bounded LRU cache of rendered pages, invalidated per blog post."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        soft_ttl_seconds: float = DEFAULT_SOFT_TTL_SECONDS,
+        hard_ttl_seconds: float = DEFAULT_HARD_TTL_SECONDS,
+        retry_seconds: float = DEFAULT_RETRY_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.soft_ttl_seconds = soft_ttl_seconds
+        self.hard_ttl_seconds = hard_ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._pages: OrderedDict[str, CachedPage] = OrderedDict()
+        self._keys_by_bp_id: defaultdict[int, set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, key: str) -> CachedPage | None:
+        """Return the cached page for the key, if present and not expired (it may be stale)."""
+        page = self._pages.get(key)
+        if page is None:
+            return None
+        if page.is_expired:
+            self._discard(key)
+            return None
+        self._pages.move_to_end(key)
+        return page
+
+    def set(
+        self,
+        key: str,
+        *,
+        html: str,
+        bp_id: int,
+        shown_bp_ids: Iterable[int] = (),
+        owner_guest_ids: Iterable[str] = (),
+    ) -> CachedPage:
+        """Store a rendered page under the key.
+
+        Invalidating any of `shown_bp_ids` (e.g. the posts of its series, whose
+        titles it links to) drops the page too.
+        """
+        now = time.monotonic()
+        page = CachedPage(
+            html=html,
+            bp_id=bp_id,
+            shown_bp_ids=frozenset(shown_bp_ids),
+            owner_guest_ids=frozenset(owner_guest_ids),
+            stale_at=now + self.soft_ttl_seconds,
+            expires_at=now + self.hard_ttl_seconds,
+        )
+        self._discard(key)
+        self._pages[key] = page
+        for page_bp_id in _get_bp_ids(page):
+            self._keys_by_bp_id[page_bp_id].add(key)
+        while len(self._pages) > self.max_entries:
+            oldest_key = next(iter(self._pages))
+            self._discard(oldest_key)
+        return page
+
+    def claim_refresh(self, page: CachedPage) -> bool:
+        """Return whether the caller should re-render a page, claiming its refresh if so.
+
+        Only stale pages are refreshed, by one caller at a time, who must call
+        `end_refresh` once done (whether or not it succeeded).
+        """
+        if page.is_refreshing or not page.is_stale:
+            return False
+        page.is_refreshing = True
+        return True
+
+    def end_refresh(self, page: CachedPage) -> None:
+        """Release a page's refresh. If it wasn't replaced, it's retried after `retry_seconds`."""
+        page.is_refreshing = False
+        page.stale_at = max(page.stale_at, time.monotonic() + self.retry_seconds)
+
+    def invalidate(self, bp_id: int) -> None:
+        """Drop every cached page of (or showing) a blog post."""
+        for key in list(self._keys_by_bp_id.get(bp_id, ())):
+            self._discard(key)
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        self._pages.clear()
+        self._keys_by_bp_id.clear()
+
+    def _discard(self, key: str) -> None:
+        """Remove a single key, keeping the blog post index in sync."""
+        page = self._pages.pop(key, None)
+        if page is None:
+            return
+        for page_bp_id in _get_bp_ids(page):
+            keys = self._keys_by_bp_id.get(page_bp_id)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_bp_id[page_bp_id]
+
+
+def _get_bp_ids(page: CachedPage) -> set[int]:
+    """Return the ids of the blog posts a page is invalidated by."""
+    return {page.bp_id, *page.shown_bp_ids}
+
+
+# Rendered `/blog/{slug}` pages for anonymous visitors.
+blog_post_pages = PageCache(
+    soft_ttl_seconds=settings.page_cache_soft_ttl_secs,
+    hard_ttl_seconds=settings.page_cache_hard_ttl_secs,
+    retry_seconds=settings.page_cache_retry_secs,
+)
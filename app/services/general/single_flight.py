@@ -0,0 +1,60 @@
+"""single_flight: coalescing of concurrent identical loads within a worker.
+
+When a cached page expires or is invalidated (say, as a post is published),
+every request for it misses at once, and each would run the same queries (and
+render) at the same time. With a `SingleFlight`, the first caller for a key
+runs the load while concurrent callers for that key await its result, so a
+burst of misses costs one load per worker. Results are shared by every caller
+collapsed into a load, so they must be treated as read-only, and must not
+depend on the loading caller's session: load plain data (or rendered pages),
+never ORM instances.
+
+Errors are shared too, but if the loading caller is cancelled (e.g. its
+client disconnected), the callers waiting on it start a load of their own.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class SingleFlight[K: Hashable, V]:
+    """Runs one load at a time per key, sharing its result with concurrent callers."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.loads = 0  # <-- Loads run
+        self.collapsed = 0  # <-- Callers who awaited another caller's load instead
+        self._in_flight: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        """Return the result of loading a key, awaiting a load already in flight for it."""
+        while (in_flight := self._in_flight.get(key)) is not None:
+            self.collapsed += 1
+            await asyncio.wait([in_flight])  # <-- Unlike awaiting it, doesn't raise its errors
+            if not in_flight.cancelled():
+                return in_flight.result()
+        future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.loads += 1
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # <-- Marks it retrieved, in case no caller was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def reset_stats(self) -> None:
+        """Reset the load and collapsed caller counters."""
+        self.loads = 0
+        self.collapsed = 0
@@ -16,7 +16,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app import errors
 from app.datastore import db_models
 from app.permissions import Role
-from app.services.general import auth_helpers, email_handler, encryption_handler
+from app.services.general import (
+    auth_helpers,
+    email_handler,
+    encryption_handler,
+    invalidation_bus,
+    page_cache,
+)
+from app.services.general.invalidation_bus import InvalidationEvent, Namespace
 from app.services.media import media_handler
 
 logger = getLogger(__name__)
@@ -95,7 +102,7 @@ async def update_user(
     field_errors: defaultdict[str, list[str]] = defaultdict(list)
 
     try:
-        await db.commit()
+        await invalidation_bus.bus.commit(db, Namespace.USERS, keys=[user.id])
     except sqlalchemy.exc.IntegrityError as e:
         await db.rollback()
         await db.refresh(user)
@@ -222,3 +229,10 @@ async def reset_password_from_token(db: AsyncSession, query: str, password: str)
     await db.commit()
     await db.refresh(user)
     return user
+
+
+# ---------------- Cache invalidation -----------------
+@invalidation_bus.bus.register(Namespace.USERS)
+async def _drop_user_pages(db: AsyncSession, event: InvalidationEvent) -> None:  # noqa: ARG001 (unused-argument)
+    """Drop cached blog post pages, as users' names and avatars are shown by their comments."""
+    page_cache.blog_post_pages.clear()
@@ -26,6 +26,38 @@ class Settings(BaseSettings):
     db_max_overflow: int = 10
     db_create_tables: bool = True
 
+    # Blog view counter settings
+    view_counter_flush_secs: float = 10
+    view_counter_max_pending: int = 500
+
+    # Cross-worker cache invalidation settings (see `invalidation_bus`)
+    invalidation_channel: str = "cache_invalidation"
+    invalidation_reconnect_secs: float = 5
+
+    # Cached page and list settings: stale after the soft TTL (served while
+    # refreshed), and served stale (while refreshes fail) until the hard TTL
+    page_cache_soft_ttl_secs: float = 10 * 60
+    page_cache_hard_ttl_secs: float = 24 * 60 * 60
+    page_cache_retry_secs: float = 30  # <-- Between refreshes of a stale page or list
+
+    # Markdown render pool settings
+    render_workers: int = 2
+    render_max_pending: int = 32
+    render_timeout_secs: float = 10
+    render_use_processes: bool = True
+    render_max_pool_restarts: int = 3  # <-- in a row, before falling back to threads
+    render_cache_max_entries: int = 2048
+    render_cache_max_bytes: int = 32 * 1024 * 1024
+    highlight_cache_max_entries: int = 4096  # <-- highlighted code blocks, per render worker
+
+    # oEmbed (rich media embed) cache settings
+    oembed_ttl_secs: float = 7 * 24 * 60 * 60
+    oembed_negative_ttl_secs: float = 60 * 60  # <-- for URLs whose lookup failed
+    oembed_timeout_secs: float = 3
+    # Used instead of every provider's endpoint when set, e.g. a local fixture
+    # server (`python -m scripts.oembed_fixture_server`) for working offline
+    oembed_endpoint: str | None = None
+
     # JWT settings
     jwt_secret: str
     jwt_algorithm: str = "HS256"
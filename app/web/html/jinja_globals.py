@@ -6,7 +6,6 @@ Adds custom Jinja2 globals to the templates environment.
 import textwrap
 from urllib.parse import quote
 
-from app.services.blog.blog_utils import strip_markdown
 from app.settings import settings
 from app.web.html import flash_messages
 from app.web.html.const import templates
@@ -32,6 +31,5 @@ def shorten(
 templates.env.globals["abs"] = abs  # ty: ignore[invalid-assignment]
 templates.env.globals["hasattr"] = hasattr  # ty: ignore[invalid-assignment]
 templates.env.globals["shorten"] = shorten  # ty: ignore[invalid-assignment]
-templates.env.globals["strip_markdown"] = strip_markdown  # ty: ignore[invalid-assignment]
 templates.env.globals["get_flashed_messages"] = flash_messages.get_flashed_messages  # ty: ignore[invalid-assignment]
 templates.env.globals["sentry_cdn"] = settings.sentry_cdn  # ty: ignore[invalid-assignment]
@@ -19,15 +19,17 @@ from wtforms import (
 )
 
 from app import constants, errors
-from app.datastore.database import DBSession
+from app.datastore import db_models
+from app.datastore.database import DBSession, get_session_maker
 from app.permissions import Action, requires_permission
-from app.services.blog import blog_handler
-from app.services.general import email_handler
+from app.services.blog import blog_handler, search_completions, view_counter
+from app.services.general import email_handler, page_cache, single_flight, transforms
 from app.web.auth import LoggedInUser, LoggedInUserOptional
 from app.web.html import web_user_handlers
 from app.web.html.const import templates
 from app.web.html.flash_messages import (
     DEFAULT_FORM_ERROR_MESSAGE,
+    MESSAGES,
     FlashCategory,
     FlashMessage,
     FormErrorMessage,
@@ -45,13 +47,16 @@ BLOG_POSTS = "blog_posts"
 LIKED = "liked"
 LIST_POSTS_FULL_TEMPLATE = "blog/list_posts.html"
 LIST_POSTS_FORM_TEMPLATE = "blog/partials/list_posts_form.html"
+SEARCH_COMPLETIONS_TEMPLATE = "blog/partials/search_completions.html"
 LISTED_POSTS_TEMPLATE = "blog/partials/listed_posts.html"
+SCROLLED_POSTS_TEMPLATE = "blog/partials/scrolled_posts.html"
 EDIT_BP_TEMPLATE = "blog/edit_post.html"
 UPLOAD_MEDIA_TEMPLATE = "blog/partials/edit_post_media_form.html"
 LIST_MEDIA_TEMPLATE = "blog/partials/list_post_media.html"
 FLASH_ERRORS_TEMPLATE = "shared/partials/flash_error_messages.html"
-COMMENTS_TEMPLATE = "blog/partials/comments.html"
+COMMENTS_PAGE_TEMPLATE = "blog/partials/comments_page.html"
 COMMENT_TEMPLATE = "blog/partials/comment.html"
+COMMENT_FORM_RESPONSE_TEMPLATE = "blog/partials/comment_form_response.html"
 COMMENT_FORM_TEMPLATE = "blog/partials/comment_form.html"
 MANAGE_SERIES_TEMPLATE = "blog/manage_series.html"
 LIST_SERIES_TEMPLATE = "blog/partials/list_series.html"
@@ -65,6 +70,12 @@ LIKED_POSTS_COOKIE = "liked_posts"  # Sets a cookie with a list of liked posts,
 VIEWED_POSTS_COOKIE = "viewed_posts"  # Sets a cookie with a list of viewed posts, by id
 ERROR_SAVING_COMMENT = "Error saving comment"
 BLOG_POST_URL = "blog_post_url"
+COMMENTS_PAGE = "comments_page"
+
+# Blog post pages being rendered into the page cache, by URL
+blog_post_renders: single_flight.SingleFlight[str, None] = single_flight.SingleFlight(
+    "blog_post_renders"
+)
 
 
 class SearchForm(Form):
@@ -87,6 +98,8 @@ class SearchForm(Form):
             ("read_mins", "Read time"),
             ("views", "Views"),
             ("likes", "Likes"),
+            ("comment_count", "Comments"),
+            (blog_handler.RELEVANCE, "Relevance"),  # <-- Of search results (else, newest first)
         ],
         default="created_timestamp",
     )
@@ -98,6 +111,9 @@ class SearchForm(Form):
         coerce=int,
     )
     page = IntegerField("Page", default=1, validators=[validators.optional()])
+    # Keyset pagination (infinite scroll), used instead of `page` when present.
+    cursor = StringField("Cursor", validators=[validators.optional()])
+    include_total = BooleanField("Include total", default=False)
 
 
 @router.get("/blog", response_model=None)
@@ -106,8 +122,14 @@ async def list_blog_posts(
     current_user: LoggedInUserOptional,
     db: DBSession,
 ) -> _TemplateResponse:
-    """Return the blog list page."""
+    """Return the blog list page.
+
+    Passing a `cursor` (empty for the first page) switches from page numbers
+    to keyset pagination, with an infinite scroll loader in place of the
+    paginator.
+    """
     is_form_request = request.headers.get("hx-target") == "blog-post-list"
+    is_scroll_request = request.headers.get("hx-target") == "blog-post-scroll"
     params = dict(request.query_params)
     form = SearchForm.load(params)
     status_code = status.HTTP_200_OK
@@ -119,18 +141,12 @@ async def list_blog_posts(
             category=FlashCategory.ERROR,
         ).flash(request)
         status_code = status.HTTP_422_UNPROCESSABLE_CONTENT
+    paginator: blog_handler.Paginator | blog_handler.CursorPaginator | None
     try:
-        paginator: blog_handler.Paginator | None = await blog_handler.get_blog_posts(
-            db=db,
-            can_see_unpublished=current_user.has_permission(Action.READ_UNPUBLISHED_BP),
-            search=form.search.data,
-            tags=form.tags.data,
-            order_by_field=str(form.order_by.data or "created_timestamp"),
-            asc=form.asc.data,
-            results_per_page=int(form.results_per_page.data or 20),
-            page=int(form.page.data or 1),
+        paginator = await _get_listed_blog_posts(
+            db=db, current_user=current_user, form=form, use_cursor="cursor" in params
         )
-    except AttributeError:
+    except errors.InvalidCursorError, errors.InvalidSortFieldError:
         FlashMessage(
             title="Error retrieving blog posts",
             category=FlashCategory.ERROR,
@@ -138,9 +154,24 @@ async def list_blog_posts(
         paginator = None
         status_code = status.HTTP_422_UNPROCESSABLE_CONTENT
 
-    if paginator:
+    if isinstance(paginator, blog_handler.Paginator):
         form.page.data = paginator.current_page
-    template = LISTED_POSTS_TEMPLATE if is_form_request else LIST_POSTS_FULL_TEMPLATE
+    # The form (and its tag facets) isn't re-rendered when scrolling
+    tag_facets = (
+        []
+        if is_scroll_request
+        else await blog_handler.get_tag_facets(
+            db=db,
+            can_see_unpublished=current_user.has_permission(Action.READ_UNPUBLISHED_BP),
+            search=form.search.data,
+        )
+    )
+    if is_scroll_request:
+        template = SCROLLED_POSTS_TEMPLATE
+    elif is_form_request:
+        template = LISTED_POSTS_TEMPLATE
+    else:
+        template = LIST_POSTS_FULL_TEMPLATE
 
     return templates.TemplateResponse(
         request,
@@ -151,11 +182,62 @@ async def list_blog_posts(
             constants.LOGIN_FORM: LoginForm(redirect_url=str(request.url)),
             constants.FORM: form,
             "paginator": paginator,
+            "tag_facets": tag_facets,
+            "selected_tags": transforms.to_list(form.tags.data, lowercase=True),
+            "tag_facets_oob": is_form_request,  # <-- Swapped into the form, outside the list
         },
         status_code=status_code,
     )
 
 
+async def _get_listed_blog_posts(
+    *, db: DBSession, current_user: LoggedInUserOptional, form: SearchForm, use_cursor: bool
+) -> blog_handler.Paginator | blog_handler.CursorPaginator:
+    """Get the blog posts to list, by page number or by cursor."""
+    can_see_unpublished = current_user.has_permission(Action.READ_UNPUBLISHED_BP)
+    order_by_field = str(form.order_by.data or "created_timestamp")
+    results_per_page = int(form.results_per_page.data or 20)
+    if use_cursor:
+        return await blog_handler.get_blog_posts_by_cursor(
+            db=db,
+            can_see_unpublished=can_see_unpublished,
+            search=form.search.data,
+            tags=form.tags.data,
+            order_by_field=order_by_field,
+            asc=form.asc.data,
+            results_per_page=results_per_page,
+            cursor=form.cursor.data,
+            include_total=form.include_total.data,
+        )
+    return await blog_handler.get_blog_posts(
+        db=db,
+        can_see_unpublished=can_see_unpublished,
+        search=form.search.data,
+        tags=form.tags.data,
+        order_by_field=order_by_field,
+        asc=form.asc.data,
+        results_per_page=results_per_page,
+        page=int(form.page.data or 1),
+    )
+
+
+@router.get("/blog/search/suggest", response_model=None)
+async def suggest_blog_search(request: Request, search: str = "") -> _TemplateResponse:
+    """Return completions of a partly typed blog search (as it's typed).
+
+    Served from the in-process `search_completions` index, without a database
+    session.
+    """
+    return templates.TemplateResponse(
+        request,
+        SEARCH_COMPLETIONS_TEMPLATE,
+        {
+            constants.REQUEST: request,
+            "completions": search_completions.blog_completions.complete(search),
+        },
+    )
+
+
 class BlogPostForm(Form):
     """Form for creating and editing blog posts."""
 
@@ -478,48 +560,247 @@ def _get_viewed_posts_from_cookie(request: Request) -> set[int]:
 
 @router.get("/blog/{slug}", response_model=None)
 async def read_blog_post(
-    request: Request, current_user: LoggedInUserOptional, db: DBSession, slug: str
-) -> _TemplateResponse:
+    request: Request,
+    current_user: LoggedInUserOptional,
+    db: DBSession,
+    slug: str,
+    background_tasks: BackgroundTasks,
+) -> _TemplateResponse | HTMLResponse:
     """Return page to read a blog post.
 
+    Pages rendered for anonymous visitors are stored in
+    `page_cache.blog_post_pages` and re-served with the request's CSP nonce.
+    Stale pages are served as they are, and re-rendered in the background.
+    Concurrent anonymous requests missing the cache share one render of the
+    page into the cache (see `blog_post_renders`).
+
     NOTE: This route needs to be after the create_bp_get route,
     otherwise it will match.
     """
+    liked_posts = _get_liked_posts_from_cookie(request)
+    cacheable = _is_page_cacheable(request=request, current_user=current_user)
+    if cacheable and (
+        cached_page := _get_cached_blog_post_page(
+            request=request, current_user=current_user, liked_posts=liked_posts
+        )
+    ):
+        if page_cache.blog_post_pages.claim_refresh(cached_page):
+            background_tasks.add_task(
+                _refresh_blog_post_page,
+                request=request,
+                current_user=current_user,
+                slug=slug,
+                liked_posts=liked_posts,
+                page=cached_page,
+            )
+        return _serve_cached_page(request=request, current_user=current_user, page=cached_page)
+    if cacheable:
+        await blog_post_renders.do(
+            _get_page_url(request),
+            lambda: _cache_blog_post_page(
+                request=request,
+                current_user=current_user,
+                db=db,
+                slug=slug,
+                liked_posts=liked_posts,
+            ),
+        )
+        if cached_page := _get_cached_blog_post_page(
+            request=request, current_user=current_user, liked_posts=liked_posts
+        ):
+            return _serve_cached_page(request=request, current_user=current_user, page=cached_page)
+        # <-- Not shareable with this visitor (their comments, or the other liked variant)
+
     bp = await blog_handler.get_bp_from_slug(db=db, slug=slug)
     if (not bp.is_published) and (not current_user.has_permission(Action.READ_UNPUBLISHED_BP)):
         raise errors.BlogPostNotFoundError
-    liked = bp.id in _get_liked_posts_from_cookie(request)
+    comments_page = await blog_handler.get_bp_comments(db=db, bp_id=bp.id)
+    response = _render_blog_post_page(
+        request=request,
+        current_user=current_user,
+        bp=bp,
+        comments_page=comments_page,
+        liked_posts=liked_posts,
+        cacheable=cacheable,
+    )
+    web_user_handlers.set_guest_user_id_cookie(guest_id=current_user.guest_id, response=response)
+    return response
+
+
+def _render_blog_post_page(  # noqa: PLR0913 (too-many-arguments)
+    *,
+    request: Request,
+    current_user: LoggedInUserOptional,
+    bp: db_models.BlogPost,
+    comments_page: blog_handler.CommentsPage,
+    liked_posts: set[int],
+    cacheable: bool,
+) -> _TemplateResponse | HTMLResponse:
+    """Render a blog post's page, storing it in the page cache if it can be shared."""
+    liked = bp.id in liked_posts
     comment_form_class = (
         LoggedInCommentForm if current_user.is_authenticated else NotLoggedInCommentForm
     )
+    # Comment authors see edit/delete buttons on their comments, so their
+    # pages are personalized and can't be shared.
+    owner_guest_ids = {comment.guest_id for comment in comments_page.comments if comment.guest_id}
+    cacheable = cacheable and current_user.guest_id not in owner_guest_ids
+    nonce = request.state.nonce
+    if cacheable:
+        request.state.nonce = page_cache.NONCE_PLACEHOLDER
     response = templates.TemplateResponse(
         request,
         "blog/read_post.html",
         {
             constants.REQUEST: request,
             constants.CURRENT_USER: current_user,
-            constants.LOGIN_FORM: LoginForm(redirect_url=str(request.url)),
+            constants.LOGIN_FORM: LoginForm(redirect_url=_get_page_url(request)),
             BLOG_POST: bp,
             LIKED: liked,
             COMMENT_FORM: comment_form_class(),
+            COMMENTS_PAGE: comments_page,
             BLOG_POST_URL: request.url_for("html:read_blog_post", slug=bp.slug),
         },
     )
+    if cacheable:
+        request.state.nonce = nonce
+        cached_page = page_cache.blog_post_pages.set(
+            _get_page_cache_key(request=request, liked=liked),
+            html=bytes(response.body).decode(),
+            bp_id=bp.id,
+            shown_bp_ids=[post.id for post in bp.series.posts] if bp.series else (),
+            owner_guest_ids=owner_guest_ids,
+        )
+        response = HTMLResponse(content=cached_page.render(nonce))
+    return response
+
+
+async def _refresh_blog_post_page(
+    *,
+    request: Request,
+    current_user: LoggedInUserOptional,
+    slug: str,
+    liked_posts: set[int],
+    page: page_cache.CachedPage,
+) -> None:
+    """Re-render a stale cached page, after it's been served.
+
+    Best effort: if it fails (say, the database is unreachable), the error is
+    logged and the stale page keeps being served until its hard TTL. It's
+    rendered inside the session it's loaded with (see `_cache_blog_post_page`).
+    """
+    try:
+        async with get_session_maker()() as db:
+            await blog_post_renders.do(
+                _get_page_url(request),
+                lambda: _cache_blog_post_page(
+                    request=request,
+                    current_user=current_user,
+                    db=db,
+                    slug=slug,
+                    liked_posts=liked_posts,
+                ),
+            )  # <-- Replaces the stale page (unless it's now personalized for this visitor)
+    except errors.BlogPostNotFoundError:
+        page_cache.blog_post_pages.invalidate(page.bp_id)
+    except Exception:
+        logger.exception("Error refreshing the cached page of blog post %s", page.bp_id)
+    finally:
+        page_cache.blog_post_pages.end_refresh(page)
+
+
+async def _cache_blog_post_page(
+    *,
+    request: Request,
+    current_user: LoggedInUserOptional,
+    db: DBSession,
+    slug: str,
+    liked_posts: set[int],
+) -> None:
+    """Load and render a blog post's page for anonymous visitors, into the page cache.
+
+    Rendered with the session it's loaded with, so no ORM objects outlive it.
+    Not cached if it's personalized for the visitor (see `_render_blog_post_page`).
+    """
+    bp = await blog_handler.get_bp_from_slug(db=db, slug=slug)
+    if not bp.is_published:  # <-- Anonymous visitors can't read unpublished posts
+        raise errors.BlogPostNotFoundError
+    comments_page = await blog_handler.get_bp_comments(db=db, bp_id=bp.id)
+    _render_blog_post_page(
+        request=request,
+        current_user=current_user,
+        bp=bp,
+        comments_page=comments_page,
+        liked_posts=liked_posts,
+        cacheable=True,
+    )
+
+
+def _serve_cached_page(
+    *, request: Request, current_user: LoggedInUserOptional, page: page_cache.CachedPage
+) -> HTMLResponse:
+    """Return a cached page, with the request's CSP nonce swapped in."""
+    response = HTMLResponse(content=page.render(request.state.nonce))
     web_user_handlers.set_guest_user_id_cookie(guest_id=current_user.guest_id, response=response)
     return response
 
 
+def _is_page_cacheable(*, request: Request, current_user: LoggedInUserOptional) -> bool:
+    """Return whether the page for this request can be shared via the page cache.
+
+    Logged in users see personalized pages, and pending flash messages are
+    popped from the session while rendering, so neither can be cached.
+    """
+    return not (current_user.is_authenticated or request.session.get(MESSAGES))
+
+
+def _get_page_url(request: Request) -> str:
+    """Return the URL a page is cached by (and rendered with, e.g. as the login redirect).
+
+    Without the query string, which the page doesn't read, so that tracking
+    parameters (`?utm_source=...`) share the page. The host is kept, since
+    absolute URLs (e.g. the canonical URL) are rendered from it.
+    """
+    return str(request.url.replace(query=""))
+
+
+def _get_page_cache_key(*, request: Request, liked: bool) -> str:
+    """Return the page cache key for a request."""
+    return f"{_get_page_url(request)}|liked={liked}"
+
+
+def _get_cached_blog_post_page(
+    *, request: Request, current_user: LoggedInUserOptional, liked_posts: set[int]
+) -> page_cache.CachedPage | None:
+    """Return the cached blog post page for an anonymous visitor, if any.
+
+    The un-liked variant is looked up first since it tells us the post ID,
+    which decides whether the visitor should get the liked variant instead.
+    """
+    cached_page = page_cache.blog_post_pages.get(_get_page_cache_key(request=request, liked=False))
+    if cached_page and cached_page.bp_id in liked_posts:
+        cached_page = page_cache.blog_post_pages.get(
+            _get_page_cache_key(request=request, liked=True)
+        )
+    if cached_page is None or current_user.guest_id in cached_page.owner_guest_ids:
+        return None
+    return cached_page
+
+
 @router.get("/blog/{bp_id}/view", response_model=None)
 async def view_blog_post(request: Request, db: DBSession, bp_id: int) -> HTMLResponse:
-    """Increment the view count for a blog post."""
-    bp = await blog_handler.get_bp_from_id(db=db, bp_id=bp_id)
+    """Increment the view count for a blog post.
+
+    Views are buffered and written in batches by `view_counter.blog_post_views`.
+    """
     viewed_posts = _get_viewed_posts_from_cookie(request)
-    if bp.id in viewed_posts:
-        return HTMLResponse(content=f"{bp.views:,}")
-    bp = await blog_handler.increment_bp_views(db=db, bp=bp)
-    viewed_posts.add(bp.id)
+    if bp_id in viewed_posts:
+        views = await view_counter.blog_post_views.get_views(db=db, bp_id=bp_id)
+        return HTMLResponse(content=f"{views:,}")
+    views = await view_counter.blog_post_views.record_view(db=db, bp_id=bp_id)
+    viewed_posts.add(bp_id)
     viewed_posts_str = ",".join(str(id_) for id_ in sorted(viewed_posts))
-    response = HTMLResponse(content=f"{bp.views:,}")
+    response = HTMLResponse(content=f"{views:,}")
     response.set_cookie(
         VIEWED_POSTS_COOKIE,
         viewed_posts_str,
@@ -677,7 +958,7 @@ async def comment_post_preview(
         )
     except ValidationError:  # pragma: no cover (not sure this is reachable)
         return HTMLResponse()
-    comment = blog_handler.generate_comment(input_data)
+    comment = await blog_handler.generate_comment(input_data)
     return templates.TemplateResponse(
         request,
         COMMENT_TEMPLATE,
@@ -691,6 +972,30 @@ async def comment_post_preview(
     )
 
 
+@router.get("/blog/{bp_id}/comments", response_model=None)
+async def get_comments(
+    request: Request,
+    db: DBSession,
+    bp_id: int,
+    current_user: LoggedInUserOptional,
+    cursor: str | None = None,
+) -> _TemplateResponse:
+    """Return a page of a blog post's comments, before the cursor."""
+    is_published = await blog_handler.is_bp_published(db=db, bp_id=bp_id)
+    if (not is_published) and (not current_user.has_permission(Action.READ_UNPUBLISHED_BP)):
+        raise errors.BlogPostNotFoundError
+    comments_page = await blog_handler.get_bp_comments(db=db, bp_id=bp_id, before=cursor)
+    return templates.TemplateResponse(
+        request,
+        COMMENTS_PAGE_TEMPLATE,
+        {
+            constants.REQUEST: request,
+            constants.CURRENT_USER: current_user,
+            COMMENTS_PAGE: comments_page,
+        },
+    )
+
+
 @router.post("/blog/{bp_id}/comment", response_model=None)
 async def comment_blog_post(
     request: Request,
@@ -708,7 +1013,6 @@ async def comment_blog_post(
     )
     form = comment_form_class.load(form_data)
     bp = await blog_handler.get_bp_from_id(db=db, bp_id=bp_id)
-    liked = bp.id in _get_liked_posts_from_cookie(request)
 
     if (not bp.can_comment) and (not current_user.is_admin):
         FlashMessage(
@@ -718,15 +1022,13 @@ async def comment_blog_post(
         ).flash(request)
         return templates.TemplateResponse(
             request,
-            COMMENTS_TEMPLATE,
+            COMMENT_FORM_RESPONSE_TEMPLATE,
             {
                 constants.REQUEST: request,
                 constants.CURRENT_USER: current_user,
                 COMMENT_FORM: form,
                 constants.MESSAGE: FormErrorMessage(),
                 BLOG_POST: bp,
-                LIKED: liked,
-                BLOG_POST_URL: request.url_for("html:read_blog_post", slug=bp.slug),
             },
             status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
         )
@@ -748,19 +1050,17 @@ async def comment_blog_post(
         ).flash(request)
         return templates.TemplateResponse(
             request,
-            COMMENTS_TEMPLATE,
+            COMMENT_FORM_RESPONSE_TEMPLATE,
             {
                 constants.REQUEST: request,
                 constants.CURRENT_USER: current_user,
                 COMMENT_FORM: form,
                 constants.MESSAGE: FormErrorMessage(),
                 BLOG_POST: bp,
-                LIKED: liked,
-                BLOG_POST_URL: request.url_for("html:read_blog_post", slug=bp.slug),
             },
             status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
         )
-    comment = blog_handler.generate_comment(input_data)
+    comment = await blog_handler.generate_comment(input_data)
     if not form.validate():
         form_error_msg = (
             "No robots allowed!"
@@ -774,7 +1074,7 @@ async def comment_blog_post(
         ).flash(request)
         return templates.TemplateResponse(
             request,
-            COMMENTS_TEMPLATE,
+            COMMENT_FORM_RESPONSE_TEMPLATE,
             {
                 constants.REQUEST: request,
                 constants.CURRENT_USER: current_user,
@@ -782,12 +1082,12 @@ async def comment_blog_post(
                 constants.MESSAGE: FormErrorMessage(text=form_error_msg),
                 BLOG_POST: bp,
                 "comment_preview": comment,
-                LIKED: liked,
-                BLOG_POST_URL: request.url_for("html:read_blog_post", slug=bp.slug),
             },
             status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
         )
-    await blog_handler.save_new_comment(db, input_data)
+    save_response = await blog_handler.save_new_comment(db, input_data)
+    assert save_response.comment  # noqa: S101 (assert-used for type checker)
+    new_comment = await blog_handler.get_comment_from_id(db=db, comment_id=save_response.comment.id)
     await db.refresh(bp)
     FlashMessage(
         title="Comment saved!",
@@ -800,16 +1100,16 @@ async def comment_blog_post(
         email_handler.send_comment_notification_emails, comment=comment, post=bp
     )
 
+    # Only the new comment is rendered, appended to the comments list out-of-band.
     response = templates.TemplateResponse(
         request,
-        COMMENTS_TEMPLATE,
+        COMMENT_FORM_RESPONSE_TEMPLATE,
         {
             constants.REQUEST: request,
             constants.CURRENT_USER: current_user,
             COMMENT_FORM: comment_form_class(),
             BLOG_POST: bp,
-            LIKED: liked,
-            BLOG_POST_URL: request.url_for("html:read_blog_post", slug=bp.slug),
+            "new_comment": new_comment,
         },
     )
     web_user_handlers.set_guest_user_id_cookie(guest_id=current_user.guest_id, response=response)
@@ -1049,7 +1349,7 @@ async def edit_bp_live_update(
     if not form.validate():
         return f"Invalid form data. Errors: {form.errors}"
     input_data = blog_handler.SaveBlogInput(**form.data)
-    bp = await blog_handler.set_new_bp_fields(data=input_data)
+    bp = await blog_handler.set_new_bp_fields(data=input_data, incremental=True)
     return templates.TemplateResponse(
         request,
         "blog/partials/edit_preview.html",
@@ -3,23 +3,35 @@
 import aiocache
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.datastructures import URL
 
-from app.datastore import db_models
 from app.datastore.database import DBSession
 from app.services.blog import blog_handler
+from app.services.general import invalidation_bus, single_flight
+from app.services.general.invalidation_bus import InvalidationEvent, Namespace
+
+SITEMAP_CACHE_KEY = "sitemap"
+# Long, as saving blog posts drops the cached sitemap (see `_drop_sitemap`)
+SITEMAP_CACHE_TTL_SECS = 24 * 60 * 60
+# Sitemaps being built, by host (URLs are built from the request)
+sitemap_builds: single_flight.SingleFlight[str, str] = single_flight.SingleFlight("sitemap_builds")
 
 # ----------- Routers -----------
 router = APIRouter(tags=["sitemap"])
 
 
 @router.get("/sitemap.xml", response_model=None)
-@aiocache.cached(key="sitemap", ttl=3600)
+@aiocache.cached(key=SITEMAP_CACHE_KEY, ttl=SITEMAP_CACHE_TTL_SECS)
 async def sitemap(request: Request, db: DBSession) -> HTMLResponse:
-    """Return the sitemap page."""
-    return HTMLResponse(
-        content=await create_sitemap_xml(request=request, db=db), media_type="application/xml"
+    """Return the sitemap page.
+
+    Requests missing the cache while the sitemap is being built await that build.
+    """
+    content = await sitemap_builds.do(
+        str(request.base_url), lambda: create_sitemap_xml(request=request, db=db)
     )
+    return HTMLResponse(content=content, media_type="application/xml")
 
 
 async def create_sitemap_xml(*, request: Request, db: DBSession) -> str:
@@ -74,7 +86,7 @@ async def get_blog_urls_xml(*, request: Request, db: DBSession) -> str:
     ])
 
 
-def produce_blog_url_xml(*, request: Request, blog_post: db_models.BlogPost) -> str:
+def produce_blog_url_xml(*, request: Request, blog_post: blog_handler.ListedBlogPost) -> str:
     """Return the url xml."""
     url = request.url_for("html:read_blog_post", slug=blog_post.slug)
     last_mod = blog_post.updated_timestamp.strftime("%Y-%m-%d")
@@ -82,3 +94,9 @@ def produce_blog_url_xml(*, request: Request, blog_post: db_models.BlogPost) ->
         f"\n<url>\n  <loc>{url}</loc>\n  <lastmod>{last_mod}</lastmod>"
         "\n  <changefreq>weekly</changefreq>\n</url>"
     )
+
+
+@invalidation_bus.bus.register(Namespace.BLOG_POSTS)
+async def _drop_sitemap(db: AsyncSession, event: InvalidationEvent) -> None:  # noqa: ARG001 (unused-argument)
+    """Drop the cached sitemap, as blog posts were saved."""
+    await sitemap.cache.delete(SITEMAP_CACHE_KEY)  # ty: ignore[unresolved-attribute]
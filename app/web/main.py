@@ -3,6 +3,7 @@
 This is the main entrypoint for the web app. It mounts the API and HTML apps.
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
@@ -13,7 +14,15 @@ from fastapi.responses import RedirectResponse
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.datastore import db_models
-from app.datastore.database import get_engine
+from app.datastore.database import get_engine, get_session_maker
+from app.services.blog import (
+    post_catalog,
+    render_executor,
+    search_completions,
+    search_suggestions,
+    view_counter,
+)
+from app.services.general import invalidation_bus
 from app.settings import settings
 from app.web.api import main as api_main
 from app.web.html import main as html_main
@@ -69,6 +78,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None]:  # noqa: ARG001 (unuse
             " Is the server running on that host and accepting TCP/IP connections?"
         )
         raise RuntimeError(err_msg) from e
+    render_executor.renderer.start()
+    session_maker = get_session_maker()
+    await search_suggestions.blog_search_suggestions.refresh_with_new_session(session_maker)
+    await search_completions.blog_completions.refresh_with_new_session(session_maker)
+    await post_catalog.published_posts.refresh_with_new_session(session_maker)
+    view_flush_task = asyncio.create_task(view_counter.blog_post_views.run(session_maker))
+    invalidation_task = asyncio.create_task(invalidation_bus.bus.run(session_maker))
     yield
     # Code to run before shutdown.
+    await invalidation_bus.bus.stop(invalidation_task)
+    await view_counter.blog_post_views.stop(view_flush_task, session_maker)
+    render_executor.renderer.shutdown()
     await engine.dispose()
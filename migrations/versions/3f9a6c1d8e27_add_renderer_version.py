@@ -0,0 +1,28 @@
+"""Add renderer version to blog posts and comments.
+
+Revision ID: 3f9a6c1d8e27
+Revises: b71c05e2d9a4
+Create Date: 2026-10-17 16:21:40.583102
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a6c1d8e27"
+down_revision: str | None = "b71c05e2d9a4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("blog_posts", sa.Column("renderer_version", sa.String(), nullable=True))
+    op.add_column("blog_post_comments", sa.Column("renderer_version", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("blog_post_comments", "renderer_version")
+    op.drop_column("blog_posts", "renderer_version")
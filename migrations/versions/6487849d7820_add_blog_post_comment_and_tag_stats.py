@@ -0,0 +1,67 @@
+"""Add blog post comment and tag stats.
+
+Revision ID: 6487849d7820
+Revises: 9477169e5ea8
+Create Date: 2026-10-17 10:12:31.514806
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "6487849d7820"
+down_revision: str | None = "9477169e5ea8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("blog_posts", sa.Column("comment_count", sa.Integer(), nullable=True))
+    op.add_column(
+        "blog_posts", sa.Column("tag_names", postgresql.ARRAY(sa.String()), nullable=True)
+    )
+    op.add_column("blog_posts", sa.Column("last_activity", sa.DateTime(), nullable=True))
+    op.execute(
+        """
+        UPDATE blog_posts SET
+            comment_count = (
+                SELECT count(*) FROM blog_post_comments
+                WHERE blog_post_comments.blog_post_id = blog_posts.id
+            ),
+            last_activity = (
+                SELECT max(blog_post_comments.created_timestamp) FROM blog_post_comments
+                WHERE blog_post_comments.blog_post_id = blog_posts.id
+            ),
+            tag_names = coalesce(
+                (
+                    SELECT array_agg(
+                        blog_tags_associations.blog_post_tag_id
+                        ORDER BY blog_tags_associations.blog_post_tag_id
+                    )
+                    FROM blog_tags_associations
+                    WHERE blog_tags_associations.blog_post_id = blog_posts.id
+                ),
+                '{}'
+            )
+        """
+    )
+    op.alter_column("blog_posts", "comment_count", nullable=False)
+    op.alter_column("blog_posts", "tag_names", nullable=False)
+    op.create_index(
+        op.f("ix_blog_posts_comment_count"), "blog_posts", ["comment_count"], unique=False
+    )
+    op.create_index(
+        op.f("ix_blog_posts_last_activity"), "blog_posts", ["last_activity"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_blog_posts_last_activity"), table_name="blog_posts")
+    op.drop_index(op.f("ix_blog_posts_comment_count"), table_name="blog_posts")
+    op.drop_column("blog_posts", "last_activity")
+    op.drop_column("blog_posts", "tag_names")
+    op.drop_column("blog_posts", "comment_count")
@@ -0,0 +1,53 @@
+"""Weight blog post search vector.
+
+Revision ID: 8d1f3b6a9c42
+Revises: c4e8b2a7f105
+Create Date: 2026-10-17 18:32:07.915264
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+import app.datastore.db_models
+
+# revision identifiers, used by Alembic.
+revision: str = "8d1f3b6a9c42"
+down_revision: str | None = "c4e8b2a7f105"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+WEIGHTED_TS_VECTOR = """\
+setweight(to_tsvector('english', title), 'A')
+|| setweight(to_tsvector('english', markdown_description), 'B')
+|| setweight(to_tsvector('english', array_to_tsvector(tag_names)::text), 'B')
+|| setweight(to_tsvector('english', markdown_content), 'C')"""
+UNWEIGHTED_TS_VECTOR = "to_tsvector('english', title || ' ' || markdown_content)"
+
+
+def upgrade() -> None:
+    _replace_ts_vector(WEIGHTED_TS_VECTOR)
+
+
+def downgrade() -> None:
+    _replace_ts_vector(UNWEIGHTED_TS_VECTOR)
+
+
+def _replace_ts_vector(expression: str) -> None:
+    """Replace the generated column (Postgres can't alter a generated column's expression)."""
+    op.drop_index("ix_blog_post_ts_vector", table_name="blog_posts", postgresql_using="gin")
+    op.drop_column("blog_posts", "ts_vector")
+    op.add_column(
+        "blog_posts",
+        sa.Column(
+            "ts_vector",
+            app.datastore.db_models.TSVector(),
+            sa.Computed(expression, persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_blog_post_ts_vector", "blog_posts", ["ts_vector"], unique=False, postgresql_using="gin"
+    )
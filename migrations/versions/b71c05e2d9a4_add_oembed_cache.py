@@ -0,0 +1,41 @@
+"""Add oEmbed cache.
+
+Revision ID: b71c05e2d9a4
+Revises: 6487849d7820
+Create Date: 2026-10-17 14:03:52.218734
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b71c05e2d9a4"
+down_revision: str | None = "6487849d7820"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "oembed_cache",
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("response", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("fetched_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("expires_timestamp", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("url"),
+    )
+    op.create_index(
+        op.f("ix_oembed_cache_expires_timestamp"),
+        "oembed_cache",
+        ["expires_timestamp"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_oembed_cache_expires_timestamp"), table_name="oembed_cache")
+    op.drop_table("oembed_cache")
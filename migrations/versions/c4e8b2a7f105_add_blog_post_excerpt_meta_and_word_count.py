@@ -0,0 +1,89 @@
+"""Add blog post excerpt, meta description and word count.
+
+Revision ID: c4e8b2a7f105
+Revises: 3f9a6c1d8e27
+Create Date: 2026-10-17 17:05:12.640377
+
+"""
+
+import re
+import textwrap
+from collections.abc import Sequence
+from itertools import starmap
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e8b2a7f105"
+down_revision: str | None = "3f9a6c1d8e27"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+blog_posts = sa.table(
+    "blog_posts",
+    sa.column("id", sa.Integer()),
+    sa.column("markdown_description", sa.String()),
+    sa.column("markdown_content", sa.String()),
+    sa.column("read_mins", sa.Integer()),
+    sa.column("excerpt", sa.String()),
+    sa.column("meta_description", sa.String()),
+    sa.column("word_count", sa.Integer()),
+)
+
+# Frozen copies of `blog_utils` as of this revision, so later changes to it
+# don't change what this migration computes
+EXCERPT_WIDTH = 200
+
+
+def _strip_markdown(md: str) -> str:
+    """Strip markdown of weird syntax (as `blog_utils.strip_markdown`)."""
+    md = re.sub(r"\!\[(.*?)\].*?\)", r"\1", md)
+    md = re.sub(r"<picture>.*?</picture>", "", md, flags=re.DOTALL)
+    md = re.sub(r"\{\:.*?\}", "", md)
+    md = re.sub(r"\[(.*?)\]\(.*?\)", r"\1", md)
+    md = re.sub(r"^#+\s*(.*?)\s*$", lambda m: m.group(1).capitalize() + ".", md, flags=re.MULTILINE)
+    return " ".join(md.split())
+
+
+def _get_backfill(
+    bp_id: int, markdown_description: str, markdown_content: str, read_mins: int | None
+) -> dict[str, object]:
+    """Get a blog post's new column values (as `blog_handler` computes them when saving)."""
+    description = _strip_markdown(markdown_description)
+    return {
+        "bp_id": bp_id,
+        "excerpt": textwrap.shorten(description, width=EXCERPT_WIDTH, placeholder="..."),
+        "meta_description": f"{read_mins or 0} min read | {description}",
+        "word_count": len(_strip_markdown(markdown_content).split()),
+    }
+
+
+def upgrade() -> None:
+    op.add_column("blog_posts", sa.Column("excerpt", sa.String(), nullable=True))
+    op.add_column("blog_posts", sa.Column("meta_description", sa.String(), nullable=True))
+    op.add_column("blog_posts", sa.Column("word_count", sa.Integer(), nullable=True))
+    # Computed in Python, as when saving a blog post
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(
+            blog_posts.c.id,
+            blog_posts.c.markdown_description,
+            blog_posts.c.markdown_content,
+            blog_posts.c.read_mins,
+        )
+    ).all()
+    if rows:  # <-- One executemany UPDATE, rather than one round trip per row
+        connection.execute(
+            blog_posts.update().where(blog_posts.c.id == sa.bindparam("bp_id")),
+            list(starmap(_get_backfill, rows)),
+        )
+    op.alter_column("blog_posts", "excerpt", nullable=False)
+    op.alter_column("blog_posts", "meta_description", nullable=False)
+    op.alter_column("blog_posts", "word_count", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("blog_posts", "word_count")
+    op.drop_column("blog_posts", "meta_description")
+    op.drop_column("blog_posts", "excerpt")
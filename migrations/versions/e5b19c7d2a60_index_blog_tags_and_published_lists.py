@@ -0,0 +1,74 @@
+"""Index blog tags and published blog post lists.
+
+Revision ID: e5b19c7d2a60
+Revises: 8d1f3b6a9c42
+Create Date: 2026-10-17 21:04:51.302118
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b19c7d2a60"
+down_revision: str | None = "8d1f3b6a9c42"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# As `db_models.PUBLISHED_LIST_ORDER_BY_FIELDS`, when this migration was written
+PUBLISHED_LIST_ORDER_BY_FIELDS = (
+    "created_timestamp",
+    "title",
+    "read_mins",
+    "views",
+    "likes",
+    "comment_count",
+)
+
+
+def upgrade() -> None:
+    # Rows that can't be part of the primary key (incomplete or duplicate) are dropped
+    op.execute(
+        "DELETE FROM blog_tags_associations WHERE blog_post_id IS NULL OR blog_post_tag_id IS NULL"
+    )
+    op.execute(
+        "DELETE FROM blog_tags_associations AS a USING blog_tags_associations AS b"
+        " WHERE a.blog_post_id = b.blog_post_id"
+        " AND a.blog_post_tag_id = b.blog_post_tag_id"
+        " AND a.ctid > b.ctid"
+    )
+    op.create_primary_key(
+        "blog_tags_associations_pkey",
+        "blog_tags_associations",
+        ["blog_post_id", "blog_post_tag_id"],
+    )
+    op.create_index(
+        "ix_blog_tags_associations_tag",
+        "blog_tags_associations",
+        ["blog_post_tag_id", "blog_post_id"],
+        unique=False,
+    )
+    for field in PUBLISHED_LIST_ORDER_BY_FIELDS:
+        op.create_index(
+            f"ix_blog_posts_published_{field}",
+            "blog_posts",
+            [field, "id"],
+            unique=False,
+            postgresql_where=sa.text("is_published"),
+        )
+
+
+def downgrade() -> None:
+    for field in PUBLISHED_LIST_ORDER_BY_FIELDS:
+        op.drop_index(
+            f"ix_blog_posts_published_{field}",
+            table_name="blog_posts",
+            postgresql_where=sa.text("is_published"),
+        )
+    op.drop_index("ix_blog_tags_associations_tag", table_name="blog_tags_associations")
+    op.drop_constraint("blog_tags_associations_pkey", "blog_tags_associations", type_="primary")
+    # Primary key columns were made NOT NULL, which the original columns weren't
+    op.alter_column("blog_tags_associations", "blog_post_id", nullable=True)
+    op.alter_column("blog_tags_associations", "blog_post_tag_id", nullable=True)
@@ -0,0 +1,332 @@
+"""Microbenchmarks for the markdown rendering pipeline.
+
+Run with command: `python -m scripts.benchmark_rendering --help`
+
+Each benchmark times the current implementation against the approach it
+replaced, on the example blog posts and some typical (short) comments.
+"""
+
+import re
+import timeit
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from typing import Annotated
+
+import bleach
+import typer
+from bs4 import BeautifulSoup, Tag
+from markdown import Markdown
+
+from app.services.blog import highlight_cache, markdown_parser
+
+EXAMPLE_BP_DIR = Path(__file__).parent.parent / "tests" / "data" / "example_blog_posts"
+EXAMPLE_COMMENTS = [
+    "Great post, thanks!",
+    "This helped me a lot. One question: does `pytest -k` work with **parametrized** tests?",
+    "I think there's a typo in the second code block:\n\n```python\nassert foo == bar\n```",
+    "> Use fixtures for setup\n\nAgreed, but don't overdo it. See https://docs.pytest.org/",
+]
+LONG_COMMENT = (
+    "# Follow-up\n\nI tried this on a <b>big</b> project & hit a snag <script>x()</script>.\n\n"
+    "## What I ran\n\n```bash\npytest -n 4 --dist loadfile\n```\n\n"
+    "> Prefer fixtures over setup methods\n> (they compose better)\n\n"
+    "### Result\n\nIt's `3x` faster, though `conftest.py` needed <i>some</i> changes:\n\n"
+    "```python\n@pytest.fixture(scope='session')\ndef db():\n    return connect()\n```\n\n"
+    "#### Thanks!\n\n* one\n* two\n* <a href='https://example.com' onclick='x()'>three</a>"
+)
+
+cli_app = typer.Typer(add_completion=False, no_args_is_help=True, pretty_exceptions_enable=False)
+
+
+def time_per_call(func: Callable[[], object], *, number: int) -> float:
+    """Get the best time per call of `func`, in microseconds (us)."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000
+
+
+def echo_comparison(name: str, *, before: float, after: float) -> None:
+    """Echo the before and after times of a benchmark."""
+    typer.echo(f"{name:<40} {before:>10.1f}us {after:>10.1f}us {before / after:>7.1f}x")
+
+
+def echo_header(title: str) -> None:
+    """Echo the header of a benchmark's results table."""
+    typer.echo(f"\n{title}")
+    typer.echo(f"{'input':<40} {'before':>12} {'after':>12} {'speedup':>8}")
+
+
+def convert_fresh(content: str, *, profile: markdown_parser.MarkdownProfile) -> None:
+    """Convert markdown with a new `Markdown` instance (the old approach)."""
+    Markdown(extensions=markdown_parser.get_extensions(profile)).convert(content)
+
+
+def convert_pooled(content: str, *, md: Markdown) -> None:
+    """Convert markdown with a reused `Markdown` instance, resetting it after."""
+    md.convert(content)
+    md.reset()
+
+
+@cli_app.command()
+def markdown_setup(
+    *, number: Annotated[int, typer.Option(help="Calls per timing, for comments.")] = 200
+) -> None:
+    """Time a fresh `Markdown` instance per render against reusing a pooled instance."""
+    inputs = {f"comment {i}": comment for i, comment in enumerate(EXAMPLE_COMMENTS)}
+    inputs |= {path.name: path.read_text() for path in sorted(EXAMPLE_BP_DIR.glob("*.md"))}
+    for profile in markdown_parser.MarkdownProfile:
+        echo_header(f"Markdown conversion ({profile} profile)")
+        md = Markdown(extensions=markdown_parser.get_extensions(profile))
+        for name, content in inputs.items():
+            calls = number if name.startswith("comment") else max(number // 20, 1)
+            echo_comparison(
+                name,
+                before=time_per_call(
+                    partial(convert_fresh, content, profile=profile), number=calls
+                ),
+                after=time_per_call(partial(convert_pooled, content, md=md), number=calls),
+            )
+
+
+@cli_app.command()
+def post_processing(*, number: Annotated[int, typer.Option(help="Calls per timing.")] = 10) -> None:
+    """Time the BeautifulSoup HTML/TOC post-processing against the single pass rewriter.
+
+    Also shows post-processing's share of the render time (excluding oEmbed
+    lookups, which depend on the network).
+    """
+    md = Markdown(extensions=markdown_parser.get_extensions())
+    shares: dict[str, tuple[float, float]] = {}
+    echo_header("HTML post-processing")
+    for path in sorted(EXAMPLE_BP_DIR.glob("*.md")):
+        content = path.read_text()
+        html = md.convert(content)
+        toc: str = md.toc  # ty: ignore[unresolved-attribute]
+        md.reset()
+        convert_time = time_per_call(partial(convert_pooled, content, md=md), number=number)
+        before = time_per_call(partial(post_process_with_soup, html, toc), number=number)
+        after = time_per_call(partial(post_process, html, toc), number=number)
+        echo_comparison(path.name, before=before, after=after)
+        shares[path.name] = (before / (convert_time + before), after / (convert_time + after))
+    typer.echo("\nPost-processing share of render time")
+    typer.echo(f"{'input':<40} {'before':>12} {'after':>12}")
+    for name, (before_share, after_share) in shares.items():
+        typer.echo(f"{name:<40} {before_share:>12.0%} {after_share:>12.0%}")
+
+
+@cli_app.command()
+def highlighting(*, number: Annotated[int, typer.Option(help="Calls per timing.")] = 10) -> None:
+    """Time converting posts after a prose edit, without and with the highlight cache."""
+    md = Markdown(extensions=markdown_parser.get_extensions())
+    echo_header("Markdown conversion after a prose edit")
+    for path in sorted(EXAMPLE_BP_DIR.glob("*.md")):
+        edited = f"{path.read_text()}\nOne more sentence.\n"
+        before = time_per_call(
+            partial(convert_without_highlight_cache, edited, md=md), number=number
+        )
+        convert_pooled(edited, md=md)  # <-- Fill the highlight cache
+        after = time_per_call(partial(convert_pooled, edited, md=md), number=number)
+        echo_comparison(path.name, before=before, after=after)
+
+
+@cli_app.command()
+def comment_sanitization(
+    *, number: Annotated[int, typer.Option(help="Calls per timing.")] = 200
+) -> None:
+    """Time rendering comment previews with the multi-pass and the compiled sanitization.
+
+    This is the work behind each `comment_post_preview` request (the render
+    cache is cleared every call, as previews are rarely rendered twice).
+    """
+    inputs = {f"comment {i}": comment for i, comment in enumerate(EXAMPLE_COMMENTS)}
+    inputs["long comment"] = LONG_COMMENT
+    echo_header("Comment preview rendering")
+    total_before = total_after = 0.0
+    for name, content in inputs.items():
+        before = time_per_call(partial(multi_pass_comment_to_html, content), number=number)
+        after = time_per_call(partial(comment_to_html_uncached, content), number=number)
+        echo_comparison(name, before=before, after=after)
+        total_before += before
+        total_after += after
+    typer.echo(
+        f"\nThroughput: {len(inputs) / total_before * 1_000_000:.0f} -> "
+        f"{len(inputs) / total_after * 1_000_000:.0f} comment previews/s (per worker)"
+    )
+
+
+def comment_to_html_uncached(content: str) -> None:
+    """Render a comment's sanitized HTML, without the render cache."""
+    markdown_parser.render_cache.clear()
+    markdown_parser.comment_to_html(content)
+
+
+def convert_without_highlight_cache(content: str, *, md: Markdown) -> None:
+    """Convert markdown, highlighting every code block (the old approach)."""
+    highlight_cache.code_cache.clear()
+    convert_pooled(content, md=md)
+
+
+def post_process(html: str, toc: str) -> None:
+    """Post-process rendered markdown with the single pass rewriters."""
+    markdown_parser.update_html(html)
+    markdown_parser.update_toc(toc)
+
+
+def post_process_with_soup(html: str, toc: str) -> None:
+    """Post-process rendered markdown with BeautifulSoup (the old approach)."""
+    soup_update_html(html)
+    soup_update_toc(toc)
+
+
+# The BeautifulSoup post-processing replaced by `markdown_parser.update_html`
+# and `markdown_parser.update_toc`. Also the reference for their parity tests.
+SOUP_TOC_ITEM = (
+    '<li class="flex flex-col gap-3">'
+    '<a class="link px-2 py-1 rounded-lg"'
+    ' @click="tocOpen = false; allowTocClose = false;"'
+    ' href="{href}">{text}</a></li>'
+)
+
+
+def soup_update_html(html: str, *, update_headers: bool = True) -> str:
+    """Update the blog HTML content, walking a BeautifulSoup tree once per update."""
+    html_soup = BeautifulSoup(html, "html.parser")
+    _soup_update_links(html_soup)
+    if update_headers:
+        _soup_update_headers(html_soup)
+    for pre_tag in html_soup.find_all("pre"):
+        pre_tag["tabindex"] = "0"
+    for code_tag in html_soup.find_all("div", {"class": "highlight"}):
+        code_tag["class"].append("not-prose")  # ty: ignore[unresolved-attribute]
+    _soup_update_media(html_soup)
+    return str(html_soup)
+
+
+def _soup_update_links(html_soup: BeautifulSoup) -> None:
+    """Make all links open in new tab."""
+    for a_tag in html_soup.find_all("a"):
+        if not a_tag.get("href", "").startswith("#"):  # ty: ignore[unresolved-attribute]
+            a_tag["target"] = "_blank"
+            a_tag["rel"] = "noopener noreferrer"
+
+
+def _soup_update_headers(html_soup: BeautifulSoup) -> None:
+    """Fix header IDs that don't start alpha to work with scrollspy."""
+    for h_tag in html_soup.find_all(re.compile(r"^h[1-6]$")):
+        id_ = h_tag.get("id")
+        if id_ and not id_[0].isalpha():  # ty: ignore[not-subscriptable]
+            h_tag["id"] = f"blog-{id_}"
+        intersect_id = id_ if id_[0].isalpha() else f"blog-{id_}"  # ty: ignore[not-subscriptable]
+        h_tag["x-intersect"] = f"highlightTocElement('{intersect_id}')"
+
+
+def _soup_update_media(html_soup: BeautifulSoup) -> None:
+    """Add classes to all images and videos (and center their parents)."""
+    for img in html_soup.find_all("img"):
+        _soup_update_img(img)  # ty: ignore[invalid-argument-type]
+    for picture in html_soup.find_all("picture"):
+        _soup_add_text_center(picture.parent)  # ty: ignore[invalid-argument-type]
+    for media in html_soup.find_all(class_="media-element"):
+        _soup_add_text_center(media.parent)  # ty: ignore[invalid-argument-type]
+    for video in html_soup.find_all("video"):
+        video["class"] = [*video.get("class", []), "lazy"]  # ty: ignore[invalid-assignment, invalid-argument-type, not-iterable]
+        for source in video.find_all("source"):
+            if source.get("src"):
+                source["data-src"] = source["src"]
+                del source["src"]
+
+
+def _soup_update_img(img: Tag) -> None:
+    """Update the image tag."""
+    img["class"] = [*img.get("class", []), "rounded-lg", "mx-auto"]  # ty: ignore[invalid-assignment, invalid-argument-type, not-iterable]
+    img["loading"] = "lazy"
+    if img.attrs.get("src", "").endswith(".svg"):  # ty: ignore[unresolved-attribute]
+        img["class"].extend(["w-4/5", "max-sm:w-full"])  # ty: ignore[unresolved-attribute]
+    if img.parent.name == "p":  # ty: ignore[unresolved-attribute]
+        _soup_add_text_center(img.parent)  # ty: ignore[invalid-argument-type]
+
+
+def _soup_add_text_center(tag: Tag) -> None:
+    """Add the "text-center" class to a tag."""
+    tag["class"] = [*tag.get("class", []), "text-center"]  # ty: ignore[invalid-assignment, not-iterable, invalid-argument-type]
+
+
+def soup_update_toc(toc: str) -> str:
+    """Update the table of contents HTML, walking a BeautifulSoup tree."""
+    toc_soup = BeautifulSoup(toc, "html.parser")
+    toc_element = toc_soup.find("div", {"class": "toc"})
+    if not isinstance(toc_element, Tag):
+        return ""
+    toc_element.name = "nav"
+    toc_element["class"] = "not-prose"
+    toc_element["id"] = "toc"
+    toc_list_outer = toc_element.find("ul")
+    assert isinstance(toc_list_outer, Tag)
+    toc_list_outer["class"] = "flex flex-col gap-3"
+    for li_tag in toc_list_outer.find_all("li"):
+        li_tag["class"] = "flex flex-col gap-3"
+        a_tag = li_tag.find("a")
+        assert isinstance(a_tag, Tag)
+        a_tag["class"] = "link px-2 py-1 rounded-lg"
+        a_tag["@click"] = "tocOpen = false; allowTocClose = false;"
+        for ul_tag in li_tag.find_all("ul"):
+            ul_tag["class"] = "flex flex-col gap-3 ml-6"
+        href = str(a_tag["href"])
+        if href.startswith("#") and not href[1].isalpha():
+            a_tag["href"] = f"#blog-{href[1:]}"
+    toc_list_outer.insert(
+        0, BeautifulSoup(SOUP_TOC_ITEM.format(href="#", text="Title"), "html.parser")
+    )
+    toc_list_outer.extend([
+        BeautifulSoup(
+            SOUP_TOC_ITEM.format(href="#about-the-author", text="About the author"),
+            "html.parser",
+        ),
+        BeautifulSoup(SOUP_TOC_ITEM.format(href="#comments", text="Comments"), "html.parser"),
+    ])
+    return str(toc_soup)
+
+
+# The multi-pass comment sanitization replaced by `markdown_parser.comment_to_html`
+def multi_pass_comment_to_html(content: str) -> str:
+    """Generate sanitized HTML for a comment, re-scanning the string per step."""
+    markdown_parser.render_cache.clear()
+    sanitized_before = multi_pass_clean_with_exceptions(content)
+    html = markdown_parser.render_markdown(
+        sanitized_before, update_headers=False, profile=markdown_parser.MarkdownProfile.COMMENT
+    ).content
+    html = multi_pass_convert_h_tags(html)
+    return bleach.clean(
+        html,
+        tags=markdown_parser.ALLOWED_TAGS,
+        attributes=markdown_parser.ALLOWED_COMMENT_ATTRIBUTES,
+    )
+
+
+def multi_pass_convert_h_tags(html: str) -> str:
+    """Demote comment headings, with a pass per heading level."""
+    html = re.sub(r"<\s*(/?)h5\b[^>]*>", r"<\1h6>", html, flags=re.IGNORECASE)
+    html = re.sub(r"<\s*(/?)h4\b[^>]*>", r"<\1h6>", html, flags=re.IGNORECASE)
+    html = re.sub(r"<\s*(/?)h3\b[^>]*>", r"<\1h5>", html, flags=re.IGNORECASE)
+    html = re.sub(r"<\s*(/?)h2\b[^>]*>", r"<\1h4>", html, flags=re.IGNORECASE)
+    html = re.sub(r"<\s*(/?)h1\b[^>]*>", r"<\1h3>", html, flags=re.IGNORECASE)
+    return html  # noqa: RET504
+
+
+def multi_pass_clean_with_exceptions(content: str) -> str:
+    """Clean comment markdown, with a `str.replace` per placeholder."""
+    nefarious_strings = ("___CODEBLOCK", "___BLOCKQUOTE___")
+    if any(nefarious in content for nefarious in nefarious_strings):
+        return bleach.clean(content)
+    code_blocks = re.findall(r"```.*?```", content, re.DOTALL)
+    for i, block in enumerate(code_blocks):
+        content = content.replace(block, f"___CODEBLOCK{i}___")
+    content = re.sub(r"^> ", "___BLOCKQUOTE___", content, flags=re.MULTILINE)
+    content = bleach.clean(content)
+    content = content.replace("___BLOCKQUOTE___", "> ")
+    for i, block in enumerate(code_blocks):
+        content = content.replace(f"___CODEBLOCK{i}___", block)
+    return content
+
+
+if __name__ == "__main__":
+    cli_app()
@@ -0,0 +1,83 @@
+"""Local oEmbed fixture server, for rendering media embeds offline.
+
+Run with command: `python -m scripts.oembed_fixture_server --help`
+
+Point the app at it by setting `OEMBED_ENDPOINT=http://localhost:8001/oembed`.
+Every media URL (YouTube, etc.) then gets a placeholder embed of the requested
+size, except URLs containing "not-found", which get a 404 (a failed lookup).
+"""
+
+import html
+import json
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Annotated, Any
+from urllib.parse import parse_qs, urlsplit
+
+import typer
+
+DEFAULT_WIDTH = 800
+NOT_FOUND_MARKER = "not-found"
+
+cli_app = typer.Typer(add_completion=False, no_args_is_help=True, pretty_exceptions_enable=False)
+
+
+@cli_app.command()
+def serve(*, port: Annotated[int, typer.Option(help="Port to listen on.")] = 8001) -> None:
+    """Serve placeholder oEmbed responses until interrupted."""
+    server = ThreadingHTTPServer(("localhost", port), FixtureHandler)
+    typer.echo(f"Serving oEmbed fixtures on http://localhost:{port}/oembed")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        typer.echo("Stopped")
+    finally:
+        server.server_close()
+
+
+def get_fixture_response(
+    url: str, *, maxwidth: int | None, maxheight: int | None
+) -> dict[str, Any]:
+    """Get a placeholder "video" oEmbed response for a media URL."""
+    width = maxwidth or DEFAULT_WIDTH
+    height = maxheight or width * 9 // 16
+    return {
+        "version": "1.0",
+        "type": "video",
+        "provider_name": "oEmbed fixture server",
+        "title": f"Fixture for {url}",
+        "url": url,
+        "width": width,
+        "height": height,
+        "html": (
+            f'<div class="oembed-fixture" style="width: {width}px; height: {height}px">'
+            f"{html.escape(url)}</div>"
+        ),
+    }
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Handle oEmbed requests (`GET /oembed?url=...&maxwidth=...`)."""
+
+    def do_GET(self) -> None:
+        """Respond with a fixture for the requested URL."""
+        params = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        url = params.get("url")
+        if not url or NOT_FOUND_MARKER in url:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        response = get_fixture_response(
+            url,
+            maxwidth=int(params["maxwidth"]) if "maxwidth" in params else None,
+            maxheight=int(params["maxheight"]) if "maxheight" in params else None,
+        )
+        body = json.dumps(response).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    cli_app()
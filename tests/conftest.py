@@ -14,6 +14,8 @@ from sqlalchemy_utils.functions import database_exists
 
 from app.datastore import database as db_module
 from app.datastore.database import get_engine
+from app.services.blog import blog_handler, post_catalog, search_completions, view_counter
+from app.services.general import page_cache
 from app.services.general.transforms import to_bool
 from scripts.start_local_postgres import DBBuilder
 from tests import ADMIN_COOKIE, ADMIN_TOKEN, BASIC_COOKIE, BASIC_TOKEN
@@ -194,6 +196,8 @@ async def delete_all_data(
     session: AsyncSession, db_builder: DBBuilder, skip_tables: Iterable[str] | None = None
 ) -> None:
     """Delete all data from the database."""
+    # Let any background rebuild of the blog post caches finish before they're cleared below
+    await blog_handler.blog_post_index_rebuilds.wait()
     tables: Iterable[Table] = reversed(db_builder.metadata.sorted_tables)
     if skip_tables:
         tables = [table for table in tables if table.name not in skip_tables]
@@ -202,6 +206,13 @@ async def delete_all_data(
         await session.execute(delete(table))
     # Commit the transaction
     await session.commit()
+    # Cached pages, view counts, tag facets, the post catalog and search completions may
+    # reference the deleted rows
+    page_cache.blog_post_pages.clear()
+    view_counter.blog_post_views.reset()
+    blog_handler._unfiltered_tag_facets.clear()  # noqa: SLF001 (private-member-access)
+    post_catalog.published_posts.reset()
+    search_completions.blog_completions.reset()
 
 
 def _clear_tokens() -> None:
@@ -0,0 +1,152 @@
+"""test_db_indexes: tests that blog post lists can be served by their indexes.
+
+Plans are explained with sequential scans disabled, so they show whether an
+index can serve the query, regardless of the (few) rows and table statistics.
+"""
+
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.datastore import db_models
+from app.services.blog import blog_handler, post_catalog
+
+pytestmark = pytest.mark.anyio
+
+POST_COUNT = 60
+TAG_COUNT = 10
+TAGS_PER_POST = 3
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _clean_db_fixture(clean_db_module: None, anyio_backend: str) -> None:
+    """Clean the database after the module."""
+
+
+@pytest.fixture(name="blog_posts", scope="module")
+async def add_blog_posts(db_session_module: AsyncSession) -> None:
+    """Add blog posts and tags to list."""
+    db = db_session_module
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    tags = [f"tag-{i}" for i in range(TAG_COUNT)]
+    await db.execute(insert(db_models.BlogPostTag), [{"tag": tag} for tag in tags])
+    post_tags = [
+        [tags[(i * 7 + j) % TAG_COUNT] for j in range(TAGS_PER_POST)] for i in range(POST_COUNT)
+    ]
+    result = await db.execute(
+        insert(db_models.BlogPost).returning(db_models.BlogPost.id),
+        [
+            {
+                "title": f"Post {i}",
+                "slug": f"post-{i}",
+                "read_mins": i % 30,
+                "is_published": i % 10 != 0,
+                "can_comment": True,
+                "markdown_description": "Description",
+                "markdown_content": "Content",
+                "html_description": "<p>Description</p>",
+                "html_content": "<p>Content</p>",
+                "html_toc": "",
+                "excerpt": "Description",
+                "meta_description": "Description",
+                "word_count": 1,
+                "created_timestamp": start + timedelta(hours=i),
+                "updated_timestamp": start + timedelta(hours=i),
+                "likes": i % 97,
+                "views": i * 13 % 1009,
+                "comment_count": i % 11,
+                "tag_names": post_tags[i],
+            }
+            for i in range(POST_COUNT)
+        ],
+    )
+    bp_ids = result.scalars().all()
+    await db.execute(
+        insert(db_models.blog_tags_associations),
+        [
+            {"blog_post_id": bp_id, "blog_post_tag_id": tag}
+            for bp_id, bp_tags in zip(bp_ids, post_tags, strict=True)
+            for tag in bp_tags
+        ],
+    )
+    await db.commit()
+    # Otherwise published posts would be listed from the catalog, without these queries
+    post_catalog.published_posts.reset()
+
+
+async def explain_first_query(db: AsyncSession, list_posts: Callable[[], Awaitable[Any]]) -> str:
+    """Return the query plan of the first query run to list blog posts."""
+    statements: list[tuple[str, Any]] = []
+
+    def capture(*args: Any) -> None:
+        statements.append((args[2], args[3]))  # <-- (statement, parameters)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        await list_posts()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = statements[0]
+    connection = await db.connection()
+    await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    try:
+        result = await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return "\n".join(row[0] for row in result)
+    finally:
+        await db.rollback()  # <-- Ends the transaction, and the `SET LOCAL` with it
+
+
+@pytest.mark.usefixtures("blog_posts")
+@pytest.mark.parametrize("asc", [True, False])
+@pytest.mark.parametrize("order_by_field", db_models.PUBLISHED_LIST_ORDER_BY_FIELDS)
+async def test_published_list_uses_partial_index(
+    db_session_module: AsyncSession, order_by_field: str, *, asc: bool
+) -> None:
+    """Test that a page of published blog posts is read from its ordering's index."""
+    plan = await explain_first_query(
+        db_session_module,
+        lambda: blog_handler.get_blog_posts(
+            db=db_session_module,
+            can_see_unpublished=False,
+            order_by_field=order_by_field,
+            asc=asc,
+            page=3,
+        ),
+    )
+    assert f"ix_blog_posts_published_{order_by_field}" in plan
+
+
+@pytest.mark.usefixtures("blog_posts")
+@pytest.mark.parametrize(
+    "order_by_field",
+    [field for field in db_models.PUBLISHED_LIST_ORDER_BY_FIELDS if field != "read_mins"],
+)  # <-- Keyset pages order by `coalesce(read_mins, 0)`, which isn't indexed
+async def test_published_keyset_list_uses_partial_index(
+    db_session_module: AsyncSession, order_by_field: str
+) -> None:
+    """Test that a keyset page of published blog posts is read from its ordering's index."""
+    plan = await explain_first_query(
+        db_session_module,
+        lambda: blog_handler.get_blog_posts_by_cursor(
+            db=db_session_module, can_see_unpublished=False, order_by_field=order_by_field
+        ),
+    )
+    assert f"ix_blog_posts_published_{order_by_field}" in plan
+
+
+@pytest.mark.usefixtures("blog_posts")
+async def test_tag_filter_uses_association_index(db_session_module: AsyncSession) -> None:
+    """Test that a tag's posts are found from the association table's tag index."""
+    plan = await explain_first_query(
+        db_session_module,
+        lambda: blog_handler.get_blog_posts(
+            db=db_session_module, can_see_unpublished=False, tags="tag-3"
+        ),
+    )
+    assert "ix_blog_tags_associations_tag" in plan
+    assert "Seq Scan on blog_tags_associations" not in plan
@@ -0,0 +1,123 @@
+"""test_invalidation_bus: tests for the invalidation_bus service, over Postgres LISTEN/NOTIFY."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.general import invalidation_bus
+from app.services.general.invalidation_bus import InvalidationBus, InvalidationEvent, Namespace
+
+pytestmark = pytest.mark.anyio
+
+CHANNEL = "test_cache_invalidation"
+
+
+class Recorder:
+    """Records the events a bus dispatches."""
+
+    def __init__(self, bus: InvalidationBus) -> None:
+        self.events: asyncio.Queue[InvalidationEvent] = asyncio.Queue()
+        bus.register(Namespace.BLOG_POSTS)(self.handle)
+
+    async def handle(self, db: AsyncSession, event: InvalidationEvent) -> None:  # noqa: ARG002 (unused-argument)
+        """Record an event."""
+        self.events.put_nowait(event)
+
+    async def get(self) -> InvalidationEvent:
+        """Return the next recorded event."""
+        return await asyncio.wait_for(self.events.get(), timeout=5)
+
+
+@pytest.fixture(name="listening_bus")
+async def get_listening_bus(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> AsyncGenerator[InvalidationBus]:
+    """Return a bus listening for events, as another worker's."""
+    bus = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+    task = asyncio.create_task(bus.run(session_maker))
+    await asyncio.wait_for(bus.listening.wait(), timeout=5)
+    yield bus
+    await bus.stop(task)
+
+
+async def test_commit_dispatches_everywhere(
+    db_session: AsyncSession, listening_bus: InvalidationBus
+) -> None:
+    """Test that events are handled by the committing worker and the listening workers."""
+    publisher = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+    published, received = Recorder(publisher), Recorder(listening_bus)
+    await publisher.commit(db_session, Namespace.BLOG_POSTS, keys=[1, 2])
+    assert published.events.get_nowait().keys == [1, 2]  # <-- Handled once committed
+    event = await received.get()
+    assert event.keys == [1, 2]
+    assert event.origin == publisher.origin
+
+
+async def test_rolled_back_events_are_not_sent(
+    db_session: AsyncSession, listening_bus: InvalidationBus
+) -> None:
+    """Test that events are only sent if the write they're about is committed."""
+    received = Recorder(listening_bus)
+    await db_session.execute(select(func.pg_notify(CHANNEL, "not committed")))
+    await db_session.rollback()
+    other = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+    await other.commit(db_session, Namespace.BLOG_POSTS, keys=[4])
+    assert (await received.get()).keys == [4]
+    assert received.events.empty()
+
+
+async def test_handler_errors_are_logged_not_raised(
+    db_session: AsyncSession, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test that a failing handler doesn't fail the commit, or stop the other handlers."""
+    publisher = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+
+    @publisher.register(Namespace.BLOG_POSTS)
+    async def fail(db: AsyncSession, event: InvalidationEvent) -> None:  # noqa: ARG001 (unused-argument)
+        raise LookupError
+
+    published = Recorder(publisher)
+    await publisher.commit(db_session, Namespace.BLOG_POSTS, keys=[5])
+    assert published.events.get_nowait().keys == [5]
+    assert "Error handling blog_posts invalidation event" in caplog.text
+
+
+async def test_own_events_are_not_handled_twice(
+    db_session: AsyncSession, listening_bus: InvalidationBus
+) -> None:
+    """Test that a worker doesn't handle the events it sent again when notified."""
+    received = Recorder(listening_bus)
+    await listening_bus.commit(db_session, Namespace.BLOG_POSTS, keys=[1])
+    assert (await received.get()).keys == [1]
+    other = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+    await other.commit(db_session, Namespace.BLOG_POSTS, keys=[2])
+    assert (await received.get()).keys == [2]  # <-- Notified in order, so not [1] again
+    assert received.events.empty()
+
+
+async def test_oversized_event_is_sent_namespace_wide(
+    db_session: AsyncSession, listening_bus: InvalidationBus
+) -> None:
+    """Test that an event too large to NOTIFY is sent as a change to the whole namespace."""
+    publisher = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+    published, received = Recorder(publisher), Recorder(listening_bus)
+    keys = list(range(invalidation_bus.MAX_PAYLOAD_BYTES))
+    await publisher.commit(db_session, Namespace.BLOG_POSTS, keys=keys)
+    assert published.events.get_nowait().keys == keys
+    assert (await received.get()).keys == []
+
+
+async def test_invalid_payloads_are_ignored(
+    db_session: AsyncSession, listening_bus: InvalidationBus
+) -> None:
+    """Test that payloads that aren't events are skipped, not fatal to the listener."""
+    received = Recorder(listening_bus)
+    await db_session.execute(select(func.pg_notify(CHANNEL, "not an event")))
+    await db_session.commit()
+    other = InvalidationBus(channel=CHANNEL, reconnect_secs=0.01)
+    await other.commit(db_session, Namespace.BLOG_POSTS, keys=[3])
+    assert (await received.get()).keys == [3]
+    assert listening_bus.listening.is_set()
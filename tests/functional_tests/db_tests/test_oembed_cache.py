@@ -0,0 +1,50 @@
+"""test_oembed_cache: tests for caching oEmbed responses in the database."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.datastore import db_models
+from app.services.blog import oembed
+
+pytestmark = pytest.mark.anyio
+
+YOUTUBE_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+VIMEO_URL = "https://vimeo.com/76979871"
+YOUTUBE_RESPONSE = {
+    "type": "video",
+    "url": YOUTUBE_URL,
+    "title": "A video",
+    "html": '<iframe src="https://www.youtube.com/embed/dQw4w9WgXcQ"></iframe>',
+}
+
+
+@pytest.mark.usefixtures("clean_db")
+async def test_resolve_caches_responses_and_failures(
+    db_session: AsyncSession,
+    session_maker: async_sessionmaker[AsyncSession],
+    mocker: MockerFixture,
+) -> None:
+    """Test that fetched responses and failed lookups are cached until they expire."""
+    mocker.patch.object(oembed.database, "get_session_maker", return_value=session_maker)
+    responses = {YOUTUBE_URL: YOUTUBE_RESPONSE, VIMEO_URL: None}
+    fetch = mocker.patch.object(oembed, "fetch", side_effect=responses.get)
+    content = f"{YOUTUBE_URL}\n\n{VIMEO_URL}"
+    assert await oembed.resolve(content) == {YOUTUBE_URL: YOUTUBE_RESPONSE}
+    assert fetch.call_count == 2
+    # Cached, including the failed lookup
+    assert await oembed.resolve(content) == {YOUTUBE_URL: YOUTUBE_RESPONSE}
+    assert fetch.call_count == 2
+    # Expired entries are fetched again
+    await db_session.execute(
+        update(db_models.OEmbedCacheEntry)
+        .where(db_models.OEmbedCacheEntry.url == VIMEO_URL)
+        .values(expires_timestamp=datetime.now(UTC) - timedelta(seconds=1))
+    )
+    await db_session.commit()
+    await oembed.resolve(content)
+    assert fetch.call_count == 3
+    fetch.assert_called_with(VIMEO_URL)
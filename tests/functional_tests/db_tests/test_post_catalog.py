@@ -0,0 +1,36 @@
+"""test_post_catalog: tests that the post catalog lists blog posts like the database."""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.blog import blog_handler, post_catalog
+from tests.data import models as test_models
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.usefixtures("clean_db")
+async def test_catalog_lists_like_database(db_session: AsyncSession) -> None:
+    """Test that blog posts listed from the catalog are those listed from the database."""
+    for i, title in enumerate(["Beta", "alpha", "Gamma", "delta"]):
+        response = await blog_handler.save_blog_post(
+            db=db_session,
+            data=test_models.basic_blog_post(
+                title=title, tags=["python"] if i % 2 else ["vim"], likes=i % 2, views=i
+            ),
+        )
+        assert response.success
+    assert not post_catalog.published_posts.is_loaded  # <-- Listed from the database meanwhile
+    await blog_handler.blog_post_index_rebuilds.wait()
+    assert post_catalog.published_posts.is_loaded
+    for order_by_field in post_catalog.SORT_KEYS:
+        for asc in (True, False):
+            for tags in (None, "python", "vim, python"):
+                kwargs = {"order_by_field": order_by_field, "asc": asc, "tags": tags}
+                from_catalog = await blog_handler.get_blog_posts(
+                    db=db_session, can_see_unpublished=False, results_per_page=3, page=2, **kwargs
+                )
+                from_db = await blog_handler.get_blog_posts(
+                    db=db_session, can_see_unpublished=True, results_per_page=3, page=2, **kwargs
+                )
+                assert from_catalog == from_db
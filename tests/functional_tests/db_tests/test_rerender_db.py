@@ -0,0 +1,92 @@
+"""test_rerender_db: tests for the bulk re-render script."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.datastore import db_models
+from app.services.blog import blog_handler, markdown_parser, oembed
+from scripts import rerender_db
+
+pytestmark = pytest.mark.anyio
+
+MEDIA_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.mark.usefixtures("clean_db")
+async def test_rerender_updates_stale_rows_only(
+    db_session: AsyncSession,
+    session_maker: async_sessionmaker[AsyncSession],
+    basic_blog_post: db_models.BlogPost,
+) -> None:
+    """Test that rows rendered by an older renderer are re-rendered, and the rest skipped."""
+    comments = [
+        await blog_handler.generate_comment(
+            blog_handler.CommentInputPreview(bp_id=basic_blog_post.id, content=f"# Comment {i}")
+        )
+        for i in range(5)
+    ]
+    db_session.add_all(comments)
+    await db_session.commit()
+    assert basic_blog_post.renderer_version == markdown_parser.RENDERER_VERSION
+    expected_html = (basic_blog_post.html_content, comments[0].html_content)
+    stale_ids = [comment.id for comment in comments[:3]]
+    await db_session.execute(
+        update(db_models.BlogPostComment)
+        .where(db_models.BlogPostComment.id.in_(stale_ids))
+        .values(html_content="stale", renderer_version=None)
+    )
+    await db_session.execute(
+        update(db_models.BlogPost)
+        .where(db_models.BlogPost.id == basic_blog_post.id)
+        .values(html_content="stale", renderer_version="old")
+    )
+    await db_session.commit()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        counts = await rerender_db.rerender(
+            session_maker=session_maker, executor=executor, workers=2, batch_size=2
+        )
+        assert counts == {"blog posts": 1, "comments": 3}
+        # Everything is now current, so there's nothing left to re-render
+        assert await rerender_db.rerender(session_maker=session_maker, executor=executor) == {
+            "blog posts": 0,
+            "comments": 0,
+        }
+    for row in [basic_blog_post, *comments]:
+        await db_session.refresh(row)
+        assert row.renderer_version == markdown_parser.RENDERER_VERSION
+    assert (basic_blog_post.html_content, comments[0].html_content) == expected_html
+
+
+@pytest.mark.usefixtures("clean_db")
+async def test_rerender_skips_rows_with_unresolved_media(
+    db_session: AsyncSession,
+    session_maker: async_sessionmaker[AsyncSession],
+    basic_blog_post: db_models.BlogPost,
+    mocker: MockerFixture,
+) -> None:
+    """Test that rows whose media can't be resolved aren't stamped, and the script's DB is used."""
+    comment = await blog_handler.generate_comment(
+        blog_handler.CommentInputPreview(bp_id=basic_blog_post.id, content=MEDIA_URL)
+    )
+    db_session.add(comment)
+    await db_session.commit()
+    await db_session.execute(
+        update(db_models.BlogPostComment)
+        .where(db_models.BlogPostComment.id == comment.id)
+        .values(html_content="stale", renderer_version=None)
+    )
+    await db_session.commit()
+    get_session_maker = mocker.patch.object(oembed.database, "get_session_maker")
+    mocker.patch.object(oembed, "fetch", return_value=None)  # <-- The provider is down
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        counts = await rerender_db.rerender(session_maker=session_maker, executor=executor)
+    assert counts == {"blog posts": 0, "comments": 0}
+    await db_session.refresh(comment)
+    assert (comment.html_content, comment.renderer_version) == ("stale", None)
+    get_session_maker.assert_not_called()
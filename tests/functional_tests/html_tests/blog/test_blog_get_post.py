@@ -1,10 +1,14 @@
 """test_blog_get_post: Test the GET blog post page."""
 
+import re
+
+import httpx
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from app.datastore import db_models
+from app.services.general import page_cache
 
 BP_NOT_FOUND = "Blog post not found"
 ERROR_404 = "404 Error"
@@ -27,6 +31,9 @@ def test_get_basic_blog_post_succeeds(
         bp.title,
         str(bp.views),
         str(bp.likes),
+        # Meta descriptions, computed when the post was saved
+        'content="1 min read | This is a test blog post."',
+        'property="og:description"\n    content="1 min read | This is a test blog post."',
     )
     for string in expected_strings:
         assert string in response.text
@@ -40,6 +47,44 @@ def test_get_basic_blog_post_succeeds(
         assert string not in response.text
 
 
+def test_get_blog_post_as_guest_served_from_cache_with_new_nonce(
+    test_client: TestClient, basic_blog_post_module: db_models.BlogPost
+):
+    """Test that guest pages are cached, but each response gets its own CSP nonce."""
+    bp = basic_blog_post_module
+    response1 = test_client.get(f"/blog/{bp.slug}")
+    response2 = test_client.get(f"/blog/{bp.slug}")
+    assert response1.status_code == status.HTTP_200_OK
+    assert response2.status_code == status.HTTP_200_OK
+    assert len(page_cache.blog_post_pages) > 0
+    nonce1 = _get_csp_nonce(response1)
+    nonce2 = _get_csp_nonce(response2)
+    assert nonce1 != nonce2
+    assert f'nonce="{nonce2}"' in response2.text
+    assert page_cache.NONCE_PLACEHOLDER not in response2.text
+    assert response1.text.replace(nonce1, "") == response2.text.replace(nonce2, "")
+
+
+def test_get_blog_post_with_query_params_shares_cached_page(
+    test_client: TestClient, basic_blog_post_module: db_models.BlogPost
+):
+    """Test that query strings (e.g. tracking parameters) don't cache pages of their own."""
+    bp = basic_blog_post_module
+    test_client.get(f"/blog/{bp.slug}")
+    cached_pages = len(page_cache.blog_post_pages)
+    response = test_client.get(f"/blog/{bp.slug}", params={"utm_source": "newsletter"})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(page_cache.blog_post_pages) == cached_pages
+    assert "utm_source" not in response.text
+
+
+def _get_csp_nonce(response: httpx.Response) -> str:
+    """Get the CSP nonce from the response headers."""
+    match = re.search(r"'nonce-([^']+)'", response.headers["Content-Security-Policy"])
+    assert match
+    return match[1]
+
+
 @pytest.mark.usefixtures("logged_in_basic_user_module")
 def test_get_basic_blog_post_succeeds_signed_in_succeeds(
     test_client: TestClient, basic_blog_post_module: db_models.BlogPost
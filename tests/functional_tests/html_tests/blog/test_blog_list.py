@@ -5,8 +5,11 @@ from dataclasses import field
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import errors
 from app.datastore import db_models
+from app.services.blog import blog_handler
 from tests import TestCase
 from tests.functional_tests.html_tests.conftest import StrToSoup
 
@@ -251,3 +254,104 @@ def test_search_blog_posts(
     titles_from_html = [title.text for title in soup.find_all(class_="bp-title")]
     expected_titles = [f"basic_{i}" for i in test_case.expected_bp_titles]
     assert titles_from_html == expected_titles
+
+
+@pytest.mark.usefixtures("blog_posts")
+def test_scroll_blog_posts_by_cursor(test_client: TestClient, str_to_soup: StrToSoup):
+    """Test infinite scrolling through blog posts with keyset pagination."""
+    scroll_headers = {"hx-target": "blog-post-scroll"}
+    params = {"results_per_page": 2, "order_by": "title", "asc": "true", "cursor": ""}
+    response = test_client.get(BLOG_ENDPOINT, params=params, headers=scroll_headers)
+    assert response.status_code == status.HTTP_200_OK
+    soup = str_to_soup(response.text)
+    assert [title.text for title in soup.find_all(class_="bp-title")] == ["basic_1", "basic_3"]
+    loader = soup.find(id="blog-post-scroll")
+    assert loader is not None
+
+    # The loader fetches the next page, with the rest of the search form included.
+    form_params = {key: value for key, value in params.items() if key != "cursor"}
+    response = test_client.get(str(loader["hx-get"]), params=form_params, headers=scroll_headers)
+    assert response.status_code == status.HTTP_200_OK
+    soup = str_to_soup(response.text)
+    assert [title.text for title in soup.find_all(class_="bp-title")] == ["basic_4"]
+    assert soup.find(id="blog-post-scroll") is None
+
+
+async def test_get_blog_posts_by_cursor_pages_both_ways(
+    db_session: AsyncSession, blog_posts: list[db_models.BlogPost]
+):
+    """Test paging forwards and backwards with cursors."""
+    published_bp_ids = [bp.id for bp in blog_posts if bp.is_published]
+    expected_bp_ids = sorted(published_bp_ids, reverse=True)  # newest first
+    kwargs = {
+        "db": db_session,
+        "can_see_unpublished": False,
+        "order_by_field": "created_timestamp",
+        "results_per_page": 1,
+    }
+    first_page = await blog_handler.get_blog_posts_by_cursor(**kwargs, include_total=True)
+    assert [bp.id for bp in first_page.blog_posts] == expected_bp_ids[:1]
+    assert first_page.total_results == len(expected_bp_ids)
+    assert first_page.prev_cursor is None
+    assert first_page.next_cursor
+
+    second_page = await blog_handler.get_blog_posts_by_cursor(
+        **kwargs, cursor=first_page.next_cursor
+    )
+    assert [bp.id for bp in second_page.blog_posts] == expected_bp_ids[1:2]
+    assert second_page.total_results is None
+    assert second_page.prev_cursor
+    assert second_page.next_cursor
+
+    previous_page = await blog_handler.get_blog_posts_by_cursor(
+        **kwargs, cursor=second_page.prev_cursor
+    )
+    assert [bp.id for bp in previous_page.blog_posts] == expected_bp_ids[:1]
+    assert previous_page.prev_cursor is None
+    assert previous_page.next_cursor
+
+
+class InvalidCursorTestCase(TestCase):
+    """Invalid cursor test case."""
+
+    params: dict[str, str]
+
+
+INVALID_CURSOR_TEST_CASES = [
+    InvalidCursorTestCase(id="garbage", params={"cursor": "not-a-cursor"}),
+    InvalidCursorTestCase(id="invalid_order_by", params={"cursor": "", "order_by": "asdf"}),
+]
+
+
+@pytest.mark.usefixtures("blog_posts")
+@InvalidCursorTestCase.parametrize(INVALID_CURSOR_TEST_CASES)
+def test_scroll_blog_posts_invalid_cursor_fails(
+    test_client: TestClient, test_case: InvalidCursorTestCase
+):
+    """Test that invalid cursors are reported instead of erroring."""
+    response = test_client.get(BLOG_ENDPOINT, params=test_case.params)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert "Error retrieving blog posts" in response.text
+
+
+@pytest.mark.usefixtures("blog_posts")
+async def test_get_blog_posts_invalid_order_by_fails(db_session: AsyncSession):
+    """Test that listing blog posts by a field they aren't sorted by is reported as such."""
+    with pytest.raises(errors.InvalidSortFieldError):
+        await blog_handler.get_blog_posts(
+            db=db_session, can_see_unpublished=True, order_by_field="markdown_content"
+        )
+
+
+async def test_get_blog_posts_returns_list_rows(
+    db_session: AsyncSession, blog_posts: list[db_models.BlogPost]
+):
+    """Test that listed blog posts carry their tag names and comment count."""
+    paginator = await blog_handler.get_blog_posts(
+        db=db_session, can_see_unpublished=True, order_by_field="title", asc=True
+    )
+    assert [bp.title for bp in paginator.blog_posts] == [bp.title for bp in blog_posts]
+    for listed_bp, bp in zip(paginator.blog_posts, blog_posts, strict=True):
+        assert isinstance(listed_bp, blog_handler.ListedBlogPost)
+        assert listed_bp.tag_names == sorted(tag.tag for tag in bp.tags)
+        assert listed_bp.comment_count == 0
@@ -0,0 +1,212 @@
+"""test_blog_search: Test ranked, highlighted blog post search."""
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.datastore import db_models
+from app.services.blog import blog_handler
+from tests.data import models as test_models
+from tests.functional_tests.html_tests.conftest import StrToSoup
+
+BLOG_ENDPOINT = "/blog"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _clean_db_fixture(clean_db_module: None, anyio_backend: str) -> None:
+    """Clean the database after the module."""
+
+
+@pytest.fixture(name="search_blog_posts", scope="module")
+async def search_blog_posts_fixture(
+    db_session_module: AsyncSession,
+) -> list[db_models.BlogPost]:
+    """Return blog posts mentioning "pytest" in their title, tags or content, oldest first."""
+    blog_post_inputs = [
+        test_models.basic_blog_post(title="Pytest tips", content="Some tips."),
+        test_models.basic_blog_post(title="Testing tools", tags=["pytest"], content="Tools."),
+        test_models.basic_blog_post(
+            title="Web apps",
+            content="Web apps are tested with pytest, so check that 1 < 2 & 3 > 2 in every test run.",
+        ),
+        test_models.basic_blog_post(title="Unrelated", content="Nothing to see here."),
+    ]
+    blog_posts = []
+    for bp_input in blog_post_inputs:
+        response = await blog_handler.save_blog_post(db=db_session_module, data=bp_input)
+        assert response.blog_post
+        blog_posts.append(response.blog_post)
+    await blog_handler.blog_post_index_rebuilds.wait()  # <-- Of the search suggestions
+    return blog_posts
+
+
+async def test_search_orders_by_relevance(
+    db_session: AsyncSession, search_blog_posts: list[db_models.BlogPost]
+):
+    """Test that title matches outrank tag matches, which outrank content matches."""
+    paginator = await blog_handler.get_blog_posts(
+        db=db_session,
+        can_see_unpublished=False,
+        search="pytest",
+        order_by_field=blog_handler.RELEVANCE,
+    )
+    assert [bp.title for bp in paginator.blog_posts] == [bp.title for bp in search_blog_posts[:3]]
+    relevances = [bp.relevance or 0 for bp in paginator.blog_posts]
+    assert relevances == sorted(relevances, reverse=True)
+    # Newest first, by default
+    paginator = await blog_handler.get_blog_posts(
+        db=db_session, can_see_unpublished=False, search="pytest"
+    )
+    assert [bp.title for bp in paginator.blog_posts] == [
+        bp.title for bp in search_blog_posts[2::-1]
+    ]
+
+
+async def test_search_by_relevance_pages_by_cursor(
+    db_session: AsyncSession, search_blog_posts: list[db_models.BlogPost]
+):
+    """Test keyset pagination through search results ordered by relevance."""
+    kwargs = {
+        "db": db_session,
+        "can_see_unpublished": False,
+        "search": "pytest",
+        "order_by_field": blog_handler.RELEVANCE,
+        "results_per_page": 2,
+    }
+    first_page = await blog_handler.get_blog_posts_by_cursor(**kwargs)
+    assert first_page.next_cursor
+    second_page = await blog_handler.get_blog_posts_by_cursor(
+        **kwargs, cursor=first_page.next_cursor
+    )
+    titles = [bp.title for bp in first_page.blog_posts + second_page.blog_posts]
+    assert titles == [bp.title for bp in search_blog_posts[:3]]
+
+
+async def test_search_snippets_highlight_terms(
+    db_session: AsyncSession, search_blog_posts: list[db_models.BlogPost]
+):
+    """Test that snippets of the content highlight the search terms, escaping the rest."""
+    paginator = await blog_handler.get_blog_posts(
+        db=db_session, can_see_unpublished=False, search="pytest", results_per_page=1
+    )
+    assert [bp.title for bp in paginator.blog_posts] == [search_blog_posts[2].title]
+    assert paginator.blog_posts[0].snippet == (
+        "apps are tested with <mark>pytest</mark>, so check that 1 &lt; 2 &amp; 3 &gt; 2 in every test"
+    )
+    paginator = await blog_handler.get_blog_posts(db=db_session, can_see_unpublished=False)
+    assert all(bp.snippet is None for bp in paginator.blog_posts)
+
+
+@pytest.mark.usefixtures("search_blog_posts")
+@pytest.mark.parametrize("search", ["pytest's", '"pytest" -foo', "pytest & (", "!:*"])
+def test_search_with_punctuation_succeeds(
+    test_client: TestClient, str_to_soup: StrToSoup, search: str
+):
+    """Test that searches aren't parsed as tsquery syntax (which would fail)."""
+    response = test_client.get(BLOG_ENDPOINT, params={"search": search, "order_by": "relevance"})
+    assert response.status_code == status.HTTP_200_OK
+    if search == "!:*":
+        assert "No results for query" in response.text
+        return
+    soup = str_to_soup(response.text)
+    assert len(soup.find_all(class_="bp-title")) == 3
+    assert soup.find(class_="search-snippet") is not None
+
+
+@pytest.mark.usefixtures("search_blog_posts")
+@pytest.mark.parametrize("params", [{}, {"cursor": ""}], ids=["page", "cursor"])
+def test_search_without_results_suggests_corrections(
+    test_client: TestClient, str_to_soup: StrToSoup, params: dict[str, str]
+):
+    """Test that misspelled searches without results suggest corrected searches."""
+    response = test_client.get(BLOG_ENDPOINT, params={"search": "pytset tpis", **params})
+    assert response.status_code == status.HTTP_200_OK
+    assert "No results for query" in response.text
+    soup = str_to_soup(response.text)
+    suggestions = [a.text.strip() for a in soup.find_all(class_="search-suggestion")]
+    assert suggestions[0] == "pytest tips"
+    suggested = test_client.get(BLOG_ENDPOINT, params={"search": suggestions[0], **params})
+    assert len(str_to_soup(suggested.text).find_all(class_="bp-title")) == 1
+
+
+async def test_suggestions_skip_unpublished_posts(
+    db_session: AsyncSession, search_blog_posts: list[db_models.BlogPost]
+):
+    """Test that words only found in unpublished posts aren't suggested."""
+    assert search_blog_posts
+    paginator = await blog_handler.get_blog_posts(
+        db=db_session, can_see_unpublished=True, search="Unrelatde"
+    )
+    assert paginator.suggestions == ["unrelated"]
+    response = await blog_handler.save_blog_post(
+        db=db_session,
+        data=test_models.basic_blog_post(title="Draft", content="Zymurgy.", is_published=False),
+    )
+    assert response.blog_post
+    paginator = await blog_handler.get_blog_posts(
+        db=db_session, can_see_unpublished=False, search="zymurgyy"
+    )
+    assert paginator.total_results == 0
+    assert paginator.suggestions == []
+
+
+@pytest.mark.usefixtures("search_blog_posts")
+def test_search_completions(test_client: TestClient, str_to_soup: StrToSoup):
+    """Test that partly typed searches complete published titles and tags."""
+    response = test_client.get(f"{BLOG_ENDPOINT}/search/suggest", params={"search": "pyt"})
+    assert response.status_code == status.HTTP_200_OK
+    soup = str_to_soup(response.text)
+    links = {
+        a.find("span").text.strip(): a["href"] for a in soup.find_all(class_="search-completion")
+    }
+    assert links["Pytest tips"].endswith(f"{BLOG_ENDPOINT}/pytest-tips")
+    assert f"{BLOG_ENDPOINT}?tags=pytest" in links["pytest"]
+    # Later words of titles, too
+    response = test_client.get(f"{BLOG_ENDPOINT}/search/suggest", params={"search": "TOOLS"})
+    assert "Testing tools" in response.text
+    response = test_client.get(f"{BLOG_ENDPOINT}/search/suggest", params={"search": ""})
+    assert str_to_soup(response.text).find(class_="search-completion") is None
+
+
+async def test_tag_facets(db_session: AsyncSession, search_blog_posts: list[db_models.BlogPost]):
+    """Test that tags are counted for the posts matching a search, and cached without one."""
+    assert search_blog_posts
+    facets = await blog_handler.get_tag_facets(db=db_session, can_see_unpublished=False)
+    assert facets == [blog_handler.TagFacet(tag="pytest", count=1)]
+    cached = await blog_handler.get_tag_facets(db=db_session, can_see_unpublished=False)
+    assert cached is facets
+    facets = await blog_handler.get_tag_facets(
+        db=db_session, can_see_unpublished=False, search="unrelated"
+    )
+    assert facets == []
+    # Saving a post invalidates the cached counts
+    response = await blog_handler.save_blog_post(
+        db=db_session,
+        data=test_models.basic_blog_post(title="Faceted", tags=["pytest", "web"]),
+    )
+    assert response.blog_post
+    facets = await blog_handler.get_tag_facets(db=db_session, can_see_unpublished=False)
+    assert facets == [
+        blog_handler.TagFacet(tag="pytest", count=2),
+        blog_handler.TagFacet(tag="web", count=1),
+    ]
+
+
+@pytest.mark.usefixtures("search_blog_posts")
+def test_tag_facets_toggle_tags(test_client: TestClient, str_to_soup: StrToSoup):
+    """Test that tag facets are listed with counts, linking to add or remove their tag."""
+    response = test_client.get(BLOG_ENDPOINT, params={"search": "tools", "tags": "pytest"})
+    assert response.status_code == status.HTTP_200_OK
+    soup = str_to_soup(response.text)
+    facets = soup.find_all(class_="tag-facet")
+    assert [facet.find(class_="tag-facet-count").text for facet in facets] == ["1"]
+    assert facets[0]["aria-pressed"] == "true"
+    assert "tags=&" in facets[0]["href"]  # <-- Clicking a selected tag removes it
+    # Swapped into the form (out of band) when searching from the form
+    response = test_client.get(
+        BLOG_ENDPOINT, params={"search": "tools"}, headers={"hx-target": "blog-post-list"}
+    )
+    soup = str_to_soup(response.text)
+    assert soup.find(id="tag-facets")["hx-swap-oob"] == "true"
+    assert soup.find(class_="tag-facet")["aria-pressed"] == "false"
@@ -5,6 +5,7 @@ import re
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.datastore import db_models
 from tests import TestCase
@@ -153,6 +154,39 @@ def test_post_new_comment_as_guest(
         assert string in response.text
 
 
+def test_post_new_comment_invalidates_cached_page(
+    test_client: TestClient, basic_blog_post: db_models.BlogPost
+):
+    """Test that posting a comment drops the cached guest page for the blog post."""
+    bp = basic_blog_post
+    response = test_client.get(f"/blog/{bp.slug}")
+    assert "Comments (0)" in response.text
+
+    data = {CHECK_ME: BLANK, NOT_ROBOT: TRUE, NAME: PERRIN, CONTENT: BASIC_CONTENT_MD}
+    response = test_client.post(f"/blog/{bp.id}/comment", data=data)
+    assert response.status_code == status.HTTP_200_OK
+
+    test_client.cookies.clear()  # View the page as a different guest
+    response = test_client.get(f"/blog/{bp.slug}")
+    assert "Comments (1)" in response.text
+    assert BASIC_CONTENT_HTML in response.text
+
+
+def test_post_new_comment_renders_only_the_new_comment(
+    test_client: TestClient, advanced_blog_post: db_models.BlogPost
+):
+    """Test that posting a comment returns the form and new comment, not every comment."""
+    bp = advanced_blog_post
+    existing_comment = bp.comments[0]
+    data = {CHECK_ME: BLANK, NOT_ROBOT: TRUE, NAME: PERRIN, CONTENT: BASIC_CONTENT_MD}
+    response = test_client.post(f"/blog/{bp.id}/comment", data=data)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'hx-swap-oob="beforeend:#comments-list"' in response.text
+    assert BASIC_CONTENT_HTML in response.text
+    assert f"Comments ({len(bp.comments) + 1})" in response.text
+    assert existing_comment.html_content not in response.text
+
+
 def test_comment_as_basic_user(
     test_client: TestClient,
     basic_blog_post: db_models.BlogPost,
@@ -312,6 +346,33 @@ def test_guest_can_delete_their_own_comment(
     assert "Comment deleted" in response.text
 
 
+async def test_comment_stats_follow_new_and_deleted_comments(
+    test_client: TestClient, basic_blog_post: db_models.BlogPost, db_session: AsyncSession
+):
+    """Test the blog post's comment count and last activity follow its comments."""
+    bp = basic_blog_post
+    assert bp.comment_count == 0
+    assert bp.last_activity is None
+    data = {CHECK_ME: BLANK, NOT_ROBOT: TRUE, NAME: PERRIN, CONTENT: BASIC_CONTENT_MD}
+    comment_ids = []
+    for _ in range(2):
+        response = test_client.post(f"/blog/{bp.id}/comment", data=data)
+        assert response.status_code == status.HTTP_200_OK
+        match = re.search(r"/blog/comment/(\d+)/edit", response.text)
+        assert match
+        comment_ids.append(match[1])
+
+    await db_session.refresh(bp, attribute_names=["comment_count", "last_activity", "comments"])
+    assert bp.comment_count == 2
+    assert bp.last_activity == bp.comments[-1].created_timestamp
+
+    response = test_client.delete(f"/blog/comment/{comment_ids[-1]}")
+    assert response.status_code == status.HTTP_200_OK
+    await db_session.refresh(bp, attribute_names=["comment_count", "last_activity", "comments"])
+    assert bp.comment_count == 1
+    assert bp.last_activity == bp.comments[0].created_timestamp
+
+
 @pytest.mark.usefixtures("logged_in_basic_user")
 def test_basic_user_can_delete_their_own_comment(
     test_client: TestClient,
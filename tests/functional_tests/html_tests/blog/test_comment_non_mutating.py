@@ -3,8 +3,10 @@
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.datastore import db_models
+from app.services.blog import blog_handler
 from tests import TestCase
 
 PREVIEW = "&mdash;(preview)"
@@ -28,6 +30,67 @@ def test_get_comment(
     assert comment.html_content in response.text
 
 
+async def test_get_bp_comments_pages_back_from_newest(
+    db_session: AsyncSession, advanced_blog_post_with_user_module: db_models.BlogPost
+):
+    """Test that comment pages start at the newest comment and page backwards."""
+    bp = advanced_blog_post_with_user_module
+    oldest_comment, newest_comment = bp.comments
+    newest_page = await blog_handler.get_bp_comments(db=db_session, bp_id=bp.id, limit=1)
+    assert [comment.id for comment in newest_page.comments] == [newest_comment.id]
+    assert newest_page.earlier_cursor
+
+    earlier_page = await blog_handler.get_bp_comments(
+        db=db_session, bp_id=bp.id, before=newest_page.earlier_cursor, limit=1
+    )
+    assert [comment.id for comment in earlier_page.comments] == [oldest_comment.id]
+    assert earlier_page.earlier_cursor is None
+
+    all_comments = await blog_handler.get_bp_comments(db=db_session, bp_id=bp.id)
+    assert [comment.id for comment in all_comments.comments] == [
+        oldest_comment.id,
+        newest_comment.id,
+    ]
+    assert all_comments.earlier_cursor is None
+
+
+def test_get_comments_page(
+    test_client: TestClient, advanced_blog_post_with_user_module: db_models.BlogPost
+):
+    """Test loading a page of earlier comments."""
+    bp = advanced_blog_post_with_user_module
+    oldest_comment, newest_comment = bp.comments
+    response = test_client.get(f"/blog/{bp.id}/comments")
+    assert response.status_code == status.HTTP_200_OK
+    assert oldest_comment.html_content in response.text
+    assert newest_comment.html_content in response.text
+    assert "Load earlier comments" not in response.text
+
+
+def test_get_comments_page_of_unpublished_blog_post_as_guest_fails(
+    test_client: TestClient, unpublished_blog_post_module: db_models.BlogPost
+):
+    """Test that comments of unpublished blog posts can't be loaded by guests."""
+    response = test_client.get(f"/blog/{unpublished_blog_post_module.id}/comments")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "Blog post not found" in response.text
+
+
+def test_get_comments_page_of_missing_blog_post_fails(test_client: TestClient):
+    """Test that comments of blog posts that don't exist can't be loaded."""
+    response = test_client.get("/blog/999999/comments")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.usefixtures("logged_in_admin_user_module")
+def test_get_comments_page_of_unpublished_blog_post_as_admin(
+    test_client: TestClient, unpublished_blog_post_module: db_models.BlogPost
+):
+    """Test that admins can load comments of unpublished blog posts."""
+    response = test_client.get(f"/blog/{unpublished_blog_post_module.id}/comments")
+    assert response.status_code == status.HTTP_200_OK
+
+
 def test_get_comment_not_found(test_client: TestClient):
     """Test that a user receives a 404 error when a comment is not found."""
     response = test_client.get("/blog/comment/999999")
@@ -3,8 +3,10 @@
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.datastore import db_models
+from app.services.blog import view_counter
 from tests.functional_tests.html_tests.conftest import StrToSoup
 
 
@@ -65,3 +67,26 @@ def test_view_blog_post(test_client: TestClient, basic_blog_post: db_models.Blog
     response = test_client.get(f"/blog/{basic_blog_post.id}/view")
     assert response.status_code == status.HTTP_200_OK
     assert response.text == "1"
+
+
+async def test_view_blog_post_flushes_views_to_db(
+    test_client: TestClient, basic_blog_post: db_models.BlogPost, db_session: AsyncSession
+):
+    """Test that buffered views are written to the database on flush."""
+    response = test_client.get(f"/blog/{basic_blog_post.id}/view")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == "1"
+    await db_session.refresh(basic_blog_post)
+    assert basic_blog_post.views == 0
+    assert view_counter.blog_post_views.pending_total == 1
+
+    assert await view_counter.blog_post_views.flush(db_session) == 1
+    await db_session.refresh(basic_blog_post)
+    assert basic_blog_post.views == 1
+    assert view_counter.blog_post_views.pending_total == 0
+
+
+def test_view_missing_blog_post_fails(test_client: TestClient):
+    """Test viewing a blog post that doesn't exist."""
+    response = test_client.get("/blog/999999/view")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
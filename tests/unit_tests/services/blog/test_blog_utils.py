@@ -102,6 +102,21 @@ def test_strip_markdown() -> None:
     assert blog_utils.strip_markdown(EXAMPLE_MD) == EXPECTED_MD
 
 
+def test_get_excerpt_and_meta_description() -> None:
+    """Test that the excerpt and meta description are plain text, the excerpt shortened."""
+    assert blog_utils.get_excerpt("# Title\n\nSome [link](https://x.com).") == "Title. Some link."
+    excerpt = blog_utils.get_excerpt(EXAMPLE_MD * 3)
+    assert len(excerpt) <= blog_utils.EXCERPT_WIDTH
+    assert excerpt.endswith("...")
+    assert blog_utils.get_meta_description(EXAMPLE_MD, read_mins=3) == f"3 min read | {EXPECTED_MD}"
+
+
+def test_count_words() -> None:
+    """Test that words are counted in the markdown stripped of its syntax."""
+    assert blog_utils.count_words(EXAMPLE_MD) == len(EXPECTED_MD.split())
+    assert blog_utils.calc_read_mins(PYTEST_TIPS_BP_MD, 4, word_count=0) < 34
+
+
 EXPECTED_INTRODUCTION = """\
 <picture><img alt="Pytest logo" class="rounded-lg" loading="lazy" src="http://localhost:8000/static/media/local/blog/pytest-logo.png" title="Pytest logo" width="600" height="278"></picture>
 
@@ -0,0 +1,78 @@
+"""test_highlight_cache: unit tests for the highlight_cache service."""
+
+from markdown.extensions import codehilite, fenced_code
+
+from app.services.blog import highlight_cache, markdown_parser
+from tests import TestCase
+
+
+class TestHighlight(TestCase):
+    """Test case for highlighting a code block."""
+
+    code: str
+    options: dict
+    shebang: bool = True
+
+
+HIGHLIGHT_TEST_CASES = [
+    TestHighlight(id="python", code="def f():\n    return 1\n", options={"lang": "python"}),
+    TestHighlight(id="guessed_language", code="<p>Hello</p>", options={}),
+    TestHighlight(id="shebang", code="#!python\nx = 1", options={}),
+    TestHighlight(id="shebang_ignored", code="#!python\nx = 1", options={}, shebang=False),
+    TestHighlight(
+        id="formatter_options",
+        code="a = 1\nb = 2\nc = 3",
+        options={"lang": "python", "hl_lines": [2], "linenums": True, "css_class": "highlight"},
+    ),
+]
+
+
+@TestHighlight.parametrize(HIGHLIGHT_TEST_CASES)
+def test_cached_highlighting_matches_code_hilite(test_case: TestHighlight) -> None:
+    """Test that cached highlighting gives the same HTML as uncached highlighting."""
+    highlight_cache.code_cache.clear()
+    uncached = highlight_cache.CachedCodeHilite(test_case.code, **test_case.options)
+    expected = super(highlight_cache.CachedCodeHilite, uncached).hilite(shebang=test_case.shebang)
+    for _ in range(2):
+        html = highlight_cache.CachedCodeHilite(test_case.code, **test_case.options).hilite(
+            shebang=test_case.shebang
+        )
+        assert html == expected
+    assert (highlight_cache.code_cache.hits, highlight_cache.code_cache.misses) == (1, 1)
+
+
+def test_cache_key_includes_language_and_options() -> None:
+    """Test that the same code with another language or options is highlighted again."""
+    highlight_cache.code_cache.clear()
+    for options in ({"lang": "python"}, {"lang": "bash"}, {"lang": "python", "hl_lines": [1]}):
+        highlight_cache.CachedCodeHilite("x = 1", **options).hilite()
+    assert (highlight_cache.code_cache.hits, len(highlight_cache.code_cache)) == (0, 3)
+
+
+def test_prose_edit_skips_highlighting() -> None:
+    """Test that re-rendering a post after a prose edit highlights none of its code."""
+    fenced_blocks = "\n\n".join(f"```python\nprint({i})\n```" for i in range(30))
+    indented_blocks = "\n\n".join(f"Block {i}:\n\n    :::python\n    print({i})" for i in range(10))
+    code_blocks = f"{fenced_blocks}\n\n{indented_blocks}"
+    highlight_cache.code_cache.clear()
+    markdown_parser.render_markdown(f"# Post\n\nSome prose.\n\n{code_blocks}")
+    assert highlight_cache.code_cache.misses == 40
+    markdown_parser.render_markdown(f"# Post\n\nSome edited prose.\n\n{code_blocks}")
+    assert (highlight_cache.code_cache.hits, highlight_cache.code_cache.misses) == (40, 40)
+
+
+def test_markdown_library_is_left_unpatched() -> None:
+    """Test that the cached highlighting doesn't patch Python-Markdown's own processors."""
+    assert codehilite.CodeHilite is not highlight_cache.CachedCodeHilite
+    assert fenced_code.CodeHilite is not highlight_cache.CachedCodeHilite
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Test that the cache evicts the least recently used code blocks."""
+    cache = highlight_cache.HighlightCache(max_entries=2)
+    cache.put("a", "<a>")
+    cache.put("b", "<b>")
+    assert cache.get("a") == "<a>"  # "b" is now least recently used
+    cache.put("c", "<c>")
+    assert cache.get("b") is None
+    assert len(cache) == 2
@@ -0,0 +1,170 @@
+"""test_html_rewriter: golden output tests of the single pass HTML rewriters."""
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+from markdown import Markdown
+
+from app.services.blog import html_rewriter, markdown_parser
+from scripts.benchmark_rendering import soup_update_html, soup_update_toc
+from tests import TEST_EXAMPLE_BLOGS_PATH, TestCase
+
+EXAMPLE_BLOG_POST_PATHS = sorted(TEST_EXAMPLE_BLOGS_PATH.glob("*.md"))
+
+
+class TestSerialization(TestCase):
+    """Test case for HTML which must serialize the same as BeautifulSoup serializes it."""
+
+    html: str
+
+
+SERIALIZATION_TEST_CASES = [
+    TestSerialization(id="empty", html=""),
+    TestSerialization(id="attributes_sorted", html='<a title="t" href="x" class="c">x</a>'),
+    TestSerialization(id="attribute_quotes", html="<a title='a\"b' alt=\"a'b\" rel='\"&quot;'>"),
+    TestSerialization(id="attribute_escapes", html='<a href="?a=1&amp;b=<2>">x</a>'),
+    TestSerialization(id="valueless_attributes", html="<video controls muted>"),
+    TestSerialization(id="duplicate_attributes", html='<p id="a" id="b">'),
+    TestSerialization(id="multi_valued_attributes", html='<p class=" a  b " id=" c ">'),
+    TestSerialization(id="empty_class", html='<p class="">x</p><b class>y</b>'),
+    TestSerialization(id="entities", html="<p>&ldquo;&amp;&lt;&gt;&foo; &copy &#8617; &#x41;</p>"),
+    TestSerialization(id="control_charref", html="<p>&#1;</p>"),
+    TestSerialization(id="bare_brackets", html="a < b > c"),
+    TestSerialization(id="whitespace_collapsed", html="<div>\n\n  </div> \t <b> </b>"),
+    TestSerialization(id="whitespace_in_pre", html="<pre>  \n  </pre><textarea>  </textarea>"),
+    TestSerialization(id="void_elements", html="<br><br/><img src=x></br><hr>"),
+    TestSerialization(id="void_end_tag_in_text", html="<br>a </br> b"),
+    TestSerialization(id="self_closing_non_void", html="<div/><p/>x"),
+    TestSerialization(id="stray_end_tags", html="</p>a</span><div>b</em></div>"),
+    TestSerialization(id="misnested_tags", html="<div><span><b>x</div>y</span>"),
+    TestSerialization(id="unclosed_tags", html="<div><p>x<ul><li>y"),
+    TestSerialization(id="comments", html="<!-- a --><!----><!--  -->"),
+    TestSerialization(id="raw_text", html="<script>a<b && c</script><style> p > a {} </style>"),
+    TestSerialization(id="declarations", html="<!DOCTYPE html><![CDATA[x]]><?pi x?>"),
+]
+
+
+@TestSerialization.parametrize(SERIALIZATION_TEST_CASES)
+def test_rewriter_serializes_like_beautiful_soup(test_case: TestSerialization) -> None:
+    """Test that rewriting without updates gives the same HTML as BeautifulSoup."""
+    expected = str(BeautifulSoup(test_case.html, "html.parser"))
+    assert html_rewriter.HTMLRewriter().rewrite(test_case.html) == expected
+
+
+class TestUpdateHTML(TestCase):
+    """Test case for updating blog HTML content."""
+
+    html: str
+    expected: str
+    update_headers: bool = True
+
+
+UPDATE_HTML_TEST_CASES = [
+    TestUpdateHTML(
+        id="links",
+        html='<a href="https://example.com">a</a><a href="#b">b</a>',
+        expected=(
+            '<a href="https://example.com" rel="noopener noreferrer" target="_blank">a</a>'
+            '<a href="#b">b</a>'
+        ),
+    ),
+    TestUpdateHTML(
+        id="headers",
+        html='<h2 id="1-intro">1 Intro</h2><h3 id="more">More</h3>',
+        expected=(
+            '<h2 id="blog-1-intro" x-intersect="highlightTocElement(\'blog-1-intro\')">'
+            '1 Intro</h2><h3 id="more" x-intersect="highlightTocElement(\'more\')">More</h3>'
+        ),
+    ),
+    TestUpdateHTML(
+        id="headers_not_updated",
+        html='<h2 id="1-intro">1 Intro</h2>',
+        expected='<h2 id="1-intro">1 Intro</h2>',
+        update_headers=False,
+    ),
+    TestUpdateHTML(
+        id="code_blocks",
+        html='<div class="highlight"><pre><span></span><code>a</code></pre></div>',
+        expected=(
+            '<div class="highlight not-prose"><pre tabindex="0"><span></span><code>a</code>'
+            "</pre></div>"
+        ),
+    ),
+    TestUpdateHTML(
+        id="images",
+        html='<p><img alt="a" src="a.png"/>Caption</p><img src="b.svg"/>',
+        expected=(
+            '<p class="text-center"><img alt="a" class="rounded-lg mx-auto" loading="lazy"'
+            ' src="a.png"/>Caption</p><img class="rounded-lg mx-auto w-4/5 max-sm:w-full"'
+            ' loading="lazy" src="b.svg"/>'
+        ),
+    ),
+    TestUpdateHTML(
+        id="pictures_and_media",
+        html=(
+            '<p><img src="a.png"/><picture><img src="b.png"/></picture></p>'
+            '<div><span class="media-element"></span></div>'
+        ),
+        expected=(
+            '<p class="text-center text-center"><img class="rounded-lg mx-auto" loading="lazy"'
+            ' src="a.png"/><picture><img class="rounded-lg mx-auto" loading="lazy" src="b.png"/>'
+            '</picture></p><div class="text-center"><span class="media-element"></span></div>'
+        ),
+    ),
+    TestUpdateHTML(
+        id="videos",
+        html='<video controls><source src="a.mp4" type="video/mp4"/></video><source src="b.mp4"/>',
+        expected=(
+            '<video class="lazy" controls=""><source data-src="a.mp4" type="video/mp4"/></video>'
+            '<source src="b.mp4"/>'
+        ),
+    ),
+    TestUpdateHTML(
+        id="video_class_after_media_classes",
+        html='<video><span class="media-element"></span></video>',
+        expected='<video class="text-center lazy"><span class="media-element"></span></video>',
+    ),
+]
+
+
+@TestUpdateHTML.parametrize(UPDATE_HTML_TEST_CASES)
+def test_update_html(test_case: TestUpdateHTML) -> None:
+    """Test that blog HTML content is updated as expected, and as BeautifulSoup updated it."""
+    actual = markdown_parser.update_html(test_case.html, update_headers=test_case.update_headers)
+    assert actual == test_case.expected
+    assert actual == soup_update_html(test_case.html, update_headers=test_case.update_headers)
+
+
+def test_update_toc() -> None:
+    """Test that the table of contents is updated as expected."""
+    md = Markdown(extensions=markdown_parser.get_extensions())
+    md.convert("# 1 Intro\n\n## Sub\n\n# Next")
+    toc_item = '<li class="flex flex-col gap-3">'
+    toc_link = (
+        '<a @click="tocOpen = false; allowTocClose = false;" class="link px-2 py-1 rounded-lg"'
+    )
+    expected = (
+        '<nav class="not-prose" id="toc">\n<ul class="flex flex-col gap-3">'
+        f'{toc_item}{toc_link} href="#">Title</a></li>\n'
+        f'{toc_item}{toc_link} href="#blog-1-intro">1 Intro</a>'
+        '<ul class="flex flex-col gap-3 ml-6">\n'
+        f'{toc_item}{toc_link} href="#sub">Sub</a></li>\n</ul>\n</li>\n'
+        f'{toc_item}{toc_link} href="#next">Next</a></li>\n'
+        f'{toc_item}{toc_link} href="#about-the-author">About the author</a></li>'
+        f'{toc_item}{toc_link} href="#comments">Comments</a></li></ul>\n</nav>\n'
+    )
+    assert markdown_parser.update_toc(md.toc) == expected  # ty: ignore[unresolved-attribute]
+    assert not markdown_parser.update_toc("<ul><li>No TOC</li></ul>")
+
+
+@pytest.mark.parametrize("path", EXAMPLE_BLOG_POST_PATHS, ids=lambda path: path.stem)
+def test_post_processing_matches_beautiful_soup_for_blog_posts(path: Path) -> None:
+    """Test that example blog posts are post-processed exactly as BeautifulSoup did."""
+    md = Markdown(extensions=markdown_parser.get_extensions())
+    html = md.convert(path.read_text(encoding="utf-8"))
+    toc: str = md.toc  # ty: ignore[unresolved-attribute]
+    for update_headers in (True, False):
+        expected = soup_update_html(html, update_headers=update_headers)
+        assert markdown_parser.update_html(html, update_headers=update_headers) == expected
+    assert markdown_parser.update_toc(toc) == soup_update_toc(toc)
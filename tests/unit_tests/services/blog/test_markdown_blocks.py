@@ -0,0 +1,98 @@
+"""test_markdown_blocks: differential tests of incremental against whole markdown rendering."""
+
+import pytest
+
+from app.services.blog import markdown_blocks, markdown_parser, render_executor
+from tests import TEST_EXAMPLE_BLOGS_PATH, TestCase
+
+pytestmark = pytest.mark.anyio
+
+EXAMPLE_BLOG_POSTS = {
+    path.stem: path.read_text(encoding="utf-8")
+    for path in sorted(TEST_EXAMPLE_BLOGS_PATH.glob("*.md"))
+}
+
+
+class TestIncrementalRender(TestCase):
+    """Test case for markdown which must render the same incrementally and whole."""
+
+    markdown: str
+
+
+INCREMENTAL_RENDER_TEST_CASES = [
+    TestIncrementalRender(id="empty", markdown=""),
+    TestIncrementalRender(id="blank", markdown="\n  \n\n"),
+    TestIncrementalRender(id="paragraphs", markdown="a\n\nb\n\n---\n\nc"),
+    TestIncrementalRender(id="crlf", markdown="a\r\n\r\nb\r\n"),
+    TestIncrementalRender(id="leading_whitespace_line", markdown="   \n---\n| a | b |"),
+    TestIncrementalRender(id="blockquotes_merge", markdown="> a\n\n> b\n\npara"),
+    TestIncrementalRender(id="loose_lists", markdown="- a\n\n- b\n\npara\n\n1. x\n\n2. y\n"),
+    TestIncrementalRender(id="indented_code", markdown="para\n\n    code\n\n    more\n\nafter"),
+    TestIncrementalRender(id="tab_indented_code", markdown="a\n\n\tcode\n\nb"),
+    TestIncrementalRender(
+        id="fence_with_blank_lines", markdown="```python\na = 1\n\n\nb\n```\n\nc"
+    ),
+    TestIncrementalRender(id="unclosed_fence", markdown="```python\ncode\n\nmore"),
+    TestIncrementalRender(id="admonition", markdown="!!! note\n    hi\n\n    there\n\npara"),
+    TestIncrementalRender(id="definition_list", markdown="Term\n\n:   def\n\nnext"),
+    TestIncrementalRender(id="table", markdown="| a | b |\n|---|---|\n| 1 | 2 |\n\npara"),
+    TestIncrementalRender(id="smarty", markdown='"quoted"\n\n"another" -- dash'),
+    TestIncrementalRender(id="setext_heading", markdown="Title\n=====\n\ntext"),
+    TestIncrementalRender(id="numeric_headings", markdown="## 1 Intro\n\n## 2 More"),
+    TestIncrementalRender(id="duplicate_headings", markdown="## A\n\ntext\n\n## A\n"),
+    TestIncrementalRender(id="html_block", markdown="<div>\n\nfoo\n\n</div>\n\npara"),
+    TestIncrementalRender(id="unclosed_html", markdown="para\n\n<div>\n\n# H1"),
+    TestIncrementalRender(id="stray_end_tag", markdown="a\n\n</div>\n\n\nhttp://example.com"),
+    TestIncrementalRender(id="md_in_html", markdown='<div markdown="1">\n\n*hi*\n\n</div>\n\nb'),
+    TestIncrementalRender(id="html_in_code_span", markdown="Use `<div>` tags\n\nnext"),
+    TestIncrementalRender(id="html_in_raw_html", markdown="<div>\n`<div>`\n</div>\n\nnext"),
+    TestIncrementalRender(id="inline_html", markdown="<span>\n\nfoo\n\n</span>\n\nnext"),
+    TestIncrementalRender(id="autolink", markdown="<https://example.com> a\n\nnext"),
+    TestIncrementalRender(id="html_comment", markdown="<!-- a\n\nb -->\n\npara"),
+    TestIncrementalRender(id="reference_link", markdown="[a][id]\n\n[id]: http://example.com"),
+    TestIncrementalRender(id="footnote", markdown="a[^1]\n\n[^1]: note"),
+]
+
+
+async def assert_renders_same(markdown: str) -> None:
+    """Assert that rendering incrementally gives the same result as a whole render."""
+    for update_headers in (True, False):
+        expected = markdown_parser.render_markdown(markdown, update_headers=update_headers)
+        actual = await render_executor.markdown_to_html_incremental(
+            markdown, update_headers=update_headers
+        )
+        assert actual.content == expected.content
+        assert actual.toc == expected.toc
+
+
+@TestIncrementalRender.parametrize(INCREMENTAL_RENDER_TEST_CASES)
+async def test_incremental_render_matches_whole_render(test_case: TestIncrementalRender) -> None:
+    """Test that tricky markdown renders the same incrementally and whole."""
+    await assert_renders_same(test_case.markdown)
+
+
+@pytest.mark.parametrize("markdown", EXAMPLE_BLOG_POSTS.values(), ids=list(EXAMPLE_BLOG_POSTS))
+async def test_incremental_render_matches_whole_render_for_blog_posts(markdown: str) -> None:
+    """Test that example blog posts, and posts cut off part way through, render the same."""
+    await assert_renders_same(markdown)
+    lines = markdown.split("\n")
+    for cut in range(1, 8):
+        await assert_renders_same("\n".join(lines[: len(lines) * cut // 8]))
+
+
+async def test_incremental_render_only_renders_edited_block() -> None:
+    """Test that editing one block of a post only misses the cache for that block."""
+    markdown = EXAMPLE_BLOG_POSTS["pytest_tips_and_tricks"]
+    blocks = markdown_blocks.split_markdown_blocks(markdown)
+    assert blocks is not None
+    assert len(blocks) > 100
+    markdown_parser.render_cache.clear()
+    await render_executor.markdown_to_html_incremental(markdown)
+    misses_before_edit = markdown_parser.render_cache.misses
+
+    paragraph = next(
+        block for block in blocks[50:] if block[0].isalpha() and markdown.count(block) == 1
+    )
+    edited = markdown.replace(paragraph, f"{paragraph} Edited.")
+    await render_executor.markdown_to_html_incremental(edited)
+    assert markdown_parser.render_cache.misses == misses_before_edit + 1
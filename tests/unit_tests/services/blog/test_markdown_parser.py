@@ -0,0 +1,68 @@
+"""test_markdown_parser: unit tests for the markdown_parser service."""
+
+from pytest_mock import MockerFixture
+
+from app.services.blog import markdown_parser
+
+
+def make_html_content(size: int) -> markdown_parser.HTMLContent:
+    """Make an HTMLContent whose content is `size` bytes."""
+    return markdown_parser.HTMLContent(content="x" * size, toc="")
+
+
+def test_render_cache_counts_hits_and_misses() -> None:
+    """Test that repeat renders of the same markdown are served from the cache."""
+    cache = markdown_parser.RenderCache(max_entries=10, max_bytes=1_000_000)
+    first = cache.get_or_render(
+        "# Hello", update_headers=True, render=lambda: markdown_parser.render_markdown("# Hello")
+    )
+    second = cache.get_or_render(
+        "# Hello", update_headers=True, render=lambda: make_html_content(1)
+    )
+    assert second is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    # update_headers changes the output, so is part of the key
+    cache.get_or_render("# Hello", update_headers=False, render=lambda: make_html_content(1))
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+
+def test_render_cache_evicts_least_recently_used() -> None:
+    """Test that the cache evicts least recently used renders by entries and bytes."""
+    cache = markdown_parser.RenderCache(max_entries=2, max_bytes=100)
+    cache.put("a", make_html_content(10))
+    cache.put("b", make_html_content(10))
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", make_html_content(10))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    cache.put("d", make_html_content(95))
+    assert len(cache) == 1
+    assert cache.total_bytes == 95
+    cache.put("e", make_html_content(101))  # Too big to ever cache
+    assert cache.get("e") is None
+    assert cache.get("d") is not None
+
+
+def test_render_cache_key_includes_renderer_version(mocker: MockerFixture) -> None:
+    """Test that the cache key changes with the renderer version."""
+    key = markdown_parser.RenderCache.get_key("# Hello", update_headers=True)
+    mocker.patch.object(markdown_parser, "RENDERER_VERSION", "other")
+    assert markdown_parser.RenderCache.get_key("# Hello", update_headers=True) != key
+
+
+def test_render_markdown_resets_reused_markdown_instance() -> None:
+    """Test that reused Markdown instances don't leak state from one render to the next."""
+    markdown = "# Title\n\n## Title\n\nFootnote[^1].\n\n[^1]: The footnote."
+    first = markdown_parser.render_markdown(markdown)
+    markdown_parser.render_markdown("# Other\n\nAnother[^1].\n\n[^1]: Another footnote.")
+    assert markdown_parser.render_markdown(markdown) == first
+    assert 'id="title_1"' in first.content
+
+
+def test_render_markdown_comment_profile_has_no_toc() -> None:
+    """Test that the comment profile renders without a table of contents."""
+    html = markdown_parser.render_markdown(
+        "# Title", update_headers=False, profile=markdown_parser.MarkdownProfile.COMMENT
+    )
+    assert html.content == "<h1>Title</h1>"
+    assert not html.toc
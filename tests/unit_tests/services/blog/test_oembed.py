@@ -0,0 +1,86 @@
+"""test_oembed: unit tests for the oembed service."""
+
+import threading
+import time
+from collections.abc import Generator
+from http.server import ThreadingHTTPServer
+
+import pytest
+from micawber import Provider
+from pytest_mock import MockerFixture
+
+from app.services.blog import markdown_parser, oembed
+from scripts.oembed_fixture_server import FixtureHandler
+
+pytestmark = pytest.mark.anyio
+
+YOUTUBE_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+VIMEO_URL = "https://vimeo.com/76979871"
+YOUTUBE_RESPONSE = {
+    "type": "video",
+    "url": YOUTUBE_URL,
+    "title": "A video",
+    "html": '<iframe src="https://www.youtube.com/embed/dQw4w9WgXcQ"></iframe>',
+}
+
+
+@pytest.fixture(name="fixture_provider")
+def fixture_provider_fixture() -> Generator[Provider]:
+    """Return an oEmbed provider backed by a local fixture server."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield Provider(f"http://127.0.0.1:{server.server_port}/oembed")
+    server.shutdown()
+    server.server_close()
+
+
+def test_find_media_urls() -> None:
+    """Test that only (unique) URLs an oEmbed provider could embed are found."""
+    content = f"{YOUTUBE_URL}\n\nSee https://example.com and {VIMEO_URL}, {YOUTUBE_URL}"
+    assert oembed.find_media_urls(content) == [YOUTUBE_URL, VIMEO_URL]
+    assert oembed.select_responses({YOUTUBE_URL: YOUTUBE_RESPONSE}, VIMEO_URL) == {}
+
+
+def test_render_embeds_only_resolved_media(mocker: MockerFixture) -> None:
+    """Test that renders embed resolved media, render the rest as links and never fetch."""
+    fetch = mocker.patch.object(Provider, "fetch")
+    html = markdown_parser.render_markdown(
+        f"{YOUTUBE_URL}\n\n{VIMEO_URL}", oembeds={YOUTUBE_URL: YOUTUBE_RESPONSE}
+    ).content
+    assert YOUTUBE_RESPONSE["html"] in html
+    assert f'<a href="{VIMEO_URL}">{VIMEO_URL}</a>' in html
+    fetch.assert_not_called()
+
+
+def test_render_cache_key_includes_oembeds() -> None:
+    """Test that a render with different oEmbed responses isn't served from the cache."""
+    key = markdown_parser.RenderCache.get_key(YOUTUBE_URL, update_headers=True)
+    assert key != markdown_parser.RenderCache.get_key(
+        YOUTUBE_URL, update_headers=True, oembeds={YOUTUBE_URL: YOUTUBE_RESPONSE}
+    )
+
+
+async def test_resolve_without_media_urls_skips_database(mocker: MockerFixture) -> None:
+    """Test that content without media URLs is resolved without a database session."""
+    get_session_maker = mocker.patch.object(oembed.database, "get_session_maker")
+    assert await oembed.resolve("Just https://example.com") == {}
+    get_session_maker.assert_not_called()
+
+
+async def test_fetch_from_fixture_server(mocker: MockerFixture, fixture_provider: Provider) -> None:
+    """Test that responses are fetched from the (offline) fixture server."""
+    mocker.patch.object(oembed.oembed_providers, "provider_for_url", return_value=fixture_provider)
+    response = await oembed.fetch(YOUTUBE_URL)
+    assert response is not None
+    assert (response["url"], response["width"]) == (YOUTUBE_URL, oembed.MAX_MEDIA_WIDTH)
+    assert await oembed.fetch(f"{YOUTUBE_URL}-not-found") is None
+
+
+async def test_fetch_falls_back_after_timeout(mocker: MockerFixture) -> None:
+    """Test that a slow provider is given up on (and the URL rendered as a link)."""
+    provider = mocker.Mock()
+    provider.request.side_effect = lambda *_args, **_kwargs: time.sleep(0.5)
+    mocker.patch.object(oembed.oembed_providers, "provider_for_url", return_value=provider)
+    mocker.patch.object(oembed.settings, "oembed_timeout_secs", 0.01)
+    assert await oembed.fetch(YOUTUBE_URL) is None
@@ -0,0 +1,190 @@
+"""test_post_catalog: unit tests for the post_catalog service."""
+
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.services.blog import post_catalog
+from tests import TestCase
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def make_post(bp_id: int, *, title: str, tags: list[str], **kwargs: Any) -> dict[str, Any]:
+    """Return the list fields of a published blog post."""
+    return {
+        "id": bp_id,
+        "title": title,
+        "slug": title.lower().replace(" ", "-"),
+        "thumbnail_location": None,
+        "read_mins": bp_id % 4,
+        "html_description": f"<p>{title}</p>",
+        "created_timestamp": START + timedelta(days=bp_id),
+        "updated_timestamp": START + timedelta(days=bp_id),
+        "views": 0,
+        "likes": 0,
+        "tag_names": tags,
+        "comment_count": 0,
+    } | kwargs
+
+
+POSTS = [  # <-- In title order
+    make_post(3, title="Async Python", tags=["python", "async"], likes=5, views=30),
+    make_post(1, title="Pytest tips", tags=["python", "pytest"], likes=2, views=10),
+    make_post(4, title="Vim cheat sheet", tags=["vim"], likes=2, views=40),
+    make_post(2, title="Zen of Python", tags=["python"], likes=9, views=20),
+]
+
+
+def make_catalog() -> post_catalog.PostCatalog:
+    """Make a catalog of the test posts."""
+    catalog = post_catalog.PostCatalog()
+    catalog.build(POSTS)
+    return catalog
+
+
+def get_ids(posts: list[post_catalog.CatalogPost] | None) -> list[int]:
+    """Return the ids of catalog posts."""
+    assert posts is not None
+    return [post.id for post in posts]
+
+
+class TestGetPage(TestCase):
+    """Test case for getting a page of the catalog."""
+
+    order_by_field: str = "created_timestamp"
+    asc: bool = False
+    tags: list[str] | None = None
+    offset: int = 0
+    limit: int = 10
+    expected_ids: list[int]
+
+
+GET_PAGE_TEST_CASES = [
+    TestGetPage(id="newest_first", expected_ids=[4, 3, 2, 1]),
+    TestGetPage(id="oldest_first", asc=True, expected_ids=[1, 2, 3, 4]),
+    TestGetPage(id="by_title", order_by_field="title", asc=True, expected_ids=[3, 1, 4, 2]),
+    TestGetPage(id="ties_by_id", order_by_field="likes", expected_ids=[2, 3, 4, 1]),
+    TestGetPage(id="second_page", order_by_field="views", offset=2, limit=2, expected_ids=[2, 1]),
+    TestGetPage(id="past_the_end", offset=4, expected_ids=[]),
+    TestGetPage(id="any_of_tags", tags=["pytest", "vim"], expected_ids=[4, 1]),
+    TestGetPage(id="tags_paged", tags=["python"], offset=1, limit=1, expected_ids=[2]),
+    TestGetPage(id="unknown_tag", tags=["rust"], expected_ids=[]),
+    TestGetPage(id="empty_tags", tags=[], expected_ids=[]),
+]
+
+
+@TestGetPage.parametrize(GET_PAGE_TEST_CASES)
+def test_get_page(test_case: TestGetPage) -> None:
+    """Test that pages of posts are ordered, filtered by tags and sliced."""
+    catalog = make_catalog()
+    page = catalog.get_page(
+        order_by_field=test_case.order_by_field,
+        asc=test_case.asc,
+        tags=test_case.tags,
+        offset=test_case.offset,
+        limit=test_case.limit,
+    )
+    assert get_ids(page) == test_case.expected_ids
+
+
+def test_count() -> None:
+    """Test that posts with any of the tags are counted."""
+    catalog = make_catalog()
+    assert catalog.count() == 4
+    assert catalog.count(tags=["python"]) == 3
+    assert catalog.count(tags=["async", "vim"]) == 2
+    assert catalog.count(tags=["rust"]) == 0
+
+
+def test_get_after() -> None:
+    """Test that posts are listed after a keyset position."""
+    catalog = make_catalog()
+    first_page = catalog.get_after(order_by_field="likes", asc=False, position=None, limit=2)
+    assert get_ids(first_page) == [2, 3]
+    assert get_ids(
+        catalog.get_after(order_by_field="likes", asc=False, position=(5, 3), limit=2)
+    ) == [4, 1]
+    assert get_ids(
+        catalog.get_after(order_by_field="likes", asc=True, position=(2, 1), limit=5)
+    ) == [4, 3, 2]
+    assert get_ids(
+        catalog.get_after(
+            order_by_field="title", asc=True, tags=["python"], position=("Pytest tips", 1), limit=5
+        )
+    ) == [2]
+
+
+def test_get_after_unplaceable_position() -> None:
+    """Test that positions the catalog can't place return `None`."""
+    catalog = make_catalog()
+    assert (
+        catalog.get_after(order_by_field="title", asc=True, position=("Renamed post", 1), limit=5)
+        is None
+    )
+    assert catalog.get_after(order_by_field="views", asc=True, position=("10", 1), limit=5) is None
+
+
+def test_counts_reorder_posts() -> None:
+    """Test that changing likes or views moves posts in that ordering only."""
+    catalog = make_catalog()
+    catalog.set_counts("likes", {1: 12})
+    catalog.set_counts("views", {4: 5, 99: 1})  # <-- Unknown (e.g. unpublished) posts are skipped
+    assert get_ids(catalog.get_page(order_by_field="likes", asc=False, limit=10)) == [1, 2, 3, 4]
+    assert get_ids(catalog.get_page(order_by_field="views", asc=True, limit=10)) == [4, 1, 2, 3]
+    by_created = catalog.get_page(order_by_field="created_timestamp", asc=True, limit=10)
+    assert get_ids(by_created) == [1, 2, 3, 4]
+    assert catalog.get_page(order_by_field="likes", asc=False, limit=1)[0].likes == 12
+
+
+def test_reset() -> None:
+    """Test that a reset catalog is empty and not loaded."""
+    catalog = make_catalog()
+    assert catalog.is_loaded
+    catalog.reset()
+    assert not catalog.is_loaded
+    assert len(catalog) == 0
+
+
+def make_large_catalog() -> post_catalog.PostCatalog:
+    """Make a catalog of thousands of posts."""
+    catalog = post_catalog.PostCatalog()
+    catalog.build(
+        make_post(i, title=f"Post {i:05}", tags=[f"tag{i % 50}", f"tag{i % 7}"], views=i * 13 % 997)
+        for i in range(5000)
+    )
+    return catalog
+
+
+def test_sparse_tags() -> None:
+    """Test that posts of rarely used tags (sorted, rather than scanned for) are listed."""
+    catalog = make_large_catalog()
+    expected = sorted(
+        (i for i in range(5000) if i % 50 == 49), key=lambda i: (i * 13 % 997, i), reverse=True
+    )
+    page = catalog.get_page(order_by_field="views", asc=False, tags=["tag49"], offset=5, limit=10)
+    assert get_ids(page) == expected[5:15]
+    after = catalog.get_after(
+        order_by_field="views",
+        asc=False,
+        tags=["tag49"],
+        position=(page[-1].views, page[-1].id),
+        limit=10,
+    )
+    assert get_ids(after) == expected[15:25]
+
+
+def test_get_page_is_fast() -> None:
+    """Test that filtering, sorting and paging thousands of posts takes microseconds."""
+    catalog = make_large_catalog()
+    start = time.perf_counter()
+    for _ in range(100):
+        assert catalog.get_page(order_by_field="views", asc=False, offset=40, limit=20)
+        assert catalog.get_page(
+            order_by_field="title", asc=True, tags=["tag3", "tag4"], offset=40, limit=20
+        )
+        assert catalog.get_page(
+            order_by_field="likes", asc=False, tags=["tag49"], offset=40, limit=20
+        )
+        assert catalog.count(tags=["tag3", "tag4"])
+    assert (time.perf_counter() - start) / 100 < 0.0005
@@ -0,0 +1,112 @@
+"""test_render_executor: unit tests for the render_executor service."""
+
+import os
+import threading
+from collections.abc import Generator
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app import errors
+from app.services.blog import markdown_parser, render_executor
+from tests import TEST_EXAMPLE_BLOGS_PATH
+
+pytestmark = pytest.mark.anyio
+
+PYTEST_TIPS_BP_MD = (TEST_EXAMPLE_BLOGS_PATH / "pytest_tips_and_tricks.md").read_text()
+RELEASE = threading.Event()
+
+
+def wait_for_release() -> bool:
+    """Block the render worker until `RELEASE` is set."""
+    return RELEASE.wait(timeout=5)
+
+
+def kill_worker() -> None:
+    """Exit the render worker's process, breaking its process pool."""
+    os._exit(1)
+
+
+@pytest.fixture(name="thread_renderer")
+def thread_renderer_fixture() -> Generator[render_executor.RenderExecutor]:
+    """Return a single worker, thread backed, render executor."""
+    RELEASE.clear()
+    renderer = render_executor.RenderExecutor(
+        max_workers=1, max_pending=1, timeout_secs=0.2, use_processes=False
+    )
+    yield renderer
+    RELEASE.set()
+    renderer.shutdown()
+
+
+@pytest.mark.parametrize("use_processes", [True, False], ids=["processes", "threads"])
+async def test_render_matches_inline_render(*, use_processes: bool) -> None:
+    """Test that rendering in the pool matches rendering inline."""
+    renderer = render_executor.RenderExecutor(
+        max_workers=1, max_pending=1, timeout_secs=30, use_processes=use_processes
+    )
+    try:
+        html = await renderer.run(markdown_parser.markdown_to_html, PYTEST_TIPS_BP_MD)
+        comment_html = await renderer.run(markdown_parser.comment_to_html, "# Hi <script>")
+    finally:
+        renderer.shutdown()
+    assert html == markdown_parser.markdown_to_html(PYTEST_TIPS_BP_MD)
+    assert comment_html == markdown_parser.comment_to_html("# Hi <script>")
+    assert renderer.pending == 0
+
+
+async def test_render_rejected_when_queue_full(
+    thread_renderer: render_executor.RenderExecutor,
+) -> None:
+    """Test that renders beyond `max_pending` are rejected rather than queued."""
+    with pytest.raises(errors.RenderTimeoutError):
+        await thread_renderer.run(wait_for_release)
+    # The timed out render is still running, so still counts as pending
+    assert thread_renderer.pending == 1
+    with pytest.raises(errors.RenderQueueFullError):
+        await thread_renderer.run(markdown_parser.comment_to_html, "Hello")
+    RELEASE.set()
+
+
+async def test_broken_process_pool_is_restarted() -> None:
+    """Test that a process pool broken by a dying worker is replaced by a new process pool."""
+    renderer = render_executor.RenderExecutor(
+        max_workers=1, max_pending=1, timeout_secs=30, max_pool_restarts=2
+    )
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await renderer.run(
+                kill_worker
+            )  # <-- Breaks the pool, then its replacement when retried
+        assert renderer.uses_processes
+        assert renderer.pool_restarts == 2
+        assert await renderer.run(markdown_parser.comment_to_html, "Hi") == "<p>Hi</p>"
+        assert renderer.pool_restarts == 0
+    finally:
+        renderer.shutdown()
+    assert renderer.pending == 0
+
+
+async def test_repeatedly_broken_process_pool_falls_back_to_threads() -> None:
+    """Test that renders fall back to threads once process pools keep breaking."""
+    renderer = render_executor.RenderExecutor(
+        max_workers=1, max_pending=1, timeout_secs=30, max_pool_restarts=1
+    )
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await renderer.run(kill_worker)
+        assert not renderer.uses_processes
+        assert await renderer.run(markdown_parser.comment_to_html, "Hi") == "<p>Hi</p>"
+    finally:
+        renderer.shutdown()
+
+
+async def test_incremental_render_matches_whole_render() -> None:
+    """Test that rendering block by block in the pool matches a whole render."""
+    markdown_parser.render_cache.clear()
+    html = await render_executor.markdown_to_html_incremental(PYTEST_TIPS_BP_MD)
+    assert html == markdown_parser.render_markdown(PYTEST_TIPS_BP_MD)
+    # Only the last block changed, so only it is re-rendered
+    misses = markdown_parser.render_cache.misses
+    await render_executor.markdown_to_html_incremental(f"{PYTEST_TIPS_BP_MD}\nMore.\n")
+    assert markdown_parser.render_cache.misses == misses + 1
@@ -0,0 +1,144 @@
+"""test_search_completions: unit tests for the search_completions service."""
+
+import time
+
+from app.services.blog import search_completions
+from app.services.blog.search_completions import Completion, CompletionKind, IndexedPost
+from tests import TestCase
+
+SERIES_NAMES = {1: "Python testing", 2: "Unused series"}
+POSTS = {
+    1: IndexedPost(title="Pytest tips", slug="pytest-tips", tags=("pytest", "python"), series_id=1),
+    2: IndexedPost(title="Python tricks", slug="python-tricks", tags=("python",), series_id=1),
+    3: IndexedPost(title="Vim cheat sheet", slug="vim-cheat-sheet", tags=("vim",), series_id=None),
+}
+
+
+def make_index() -> search_completions.CompletionIndex:
+    """Make a completion index of the test posts and series."""
+    index = search_completions.CompletionIndex()
+    index.build(posts=POSTS.items(), series_names=SERIES_NAMES)
+    return index
+
+
+def post(title: str, slug: str) -> Completion:
+    """Return a blog post completion."""
+    return Completion(CompletionKind.POST, title, slug)
+
+
+def tag(name: str) -> Completion:
+    """Return a tag completion."""
+    return Completion(CompletionKind.TAG, name, name)
+
+
+def series(name: str) -> Completion:
+    """Return a series completion."""
+    return Completion(CompletionKind.SERIES, name, name)
+
+
+class TestComplete(TestCase):
+    """Test case for completing a search."""
+
+    search: str
+    expected: list[Completion]
+
+
+COMPLETE_TEST_CASES = [
+    TestComplete(
+        id="start_of_labels",
+        search="py",
+        expected=[
+            post("Pytest tips", "pytest-tips"),
+            post("Python tricks", "python-tricks"),
+            series("Python testing"),
+            tag("pytest"),
+            tag("python"),
+        ],
+    ),
+    TestComplete(
+        id="later_words_after_starts",
+        search="T",
+        expected=[
+            post("Pytest tips", "pytest-tips"),
+            post("Python tricks", "python-tricks"),
+            series("Python testing"),
+        ],
+    ),
+    TestComplete(
+        id="case_and_spaces_ignored",
+        search="  VIM   cheat ",
+        expected=[post("Vim cheat sheet", "vim-cheat-sheet")],
+    ),
+    TestComplete(id="series_without_posts", search="unused", expected=[]),
+    TestComplete(id="no_match", search="rust", expected=[]),
+    TestComplete(id="empty", search=" ", expected=[]),
+]
+
+
+@TestComplete.parametrize(COMPLETE_TEST_CASES)
+def test_complete(test_case: TestComplete) -> None:
+    """Test that titles, series names and tags are completed."""
+    assert make_index().complete(test_case.search) == test_case.expected
+
+
+def test_update_post() -> None:
+    """Test that updating a post replaces its completions and unpublishing removes them."""
+    index = make_index()
+    index.update_post(
+        1,
+        IndexedPost(title="Pytest tricks", slug="pytest-tricks", tags=("testing",), series_id=None),
+    )
+    assert index.complete("pytest") == [post("Pytest tricks", "pytest-tricks")]
+    assert index.complete("testing") == [tag("testing"), series("Python testing")]
+    index.update_post(2, None)
+    assert index.complete("python") == []  # <-- The series and tag have no more published posts
+    index.update_post(2, POSTS[2])
+    assert index.complete("python") == [
+        post("Python tricks", "python-tricks"),
+        series("Python testing"),
+        tag("python"),
+    ]
+
+
+def test_update_series() -> None:
+    """Test that renaming or deleting a series updates its completion."""
+    index = make_index()
+    index.update_series(1, "Testing Python")
+    assert index.complete("testing") == [series("Testing Python")]
+    index.update_series(1, None)
+    assert index.complete("testing") == []
+    index.update_series(1, "Python testing")  # <-- Its posts were moved out when it was deleted
+    assert index.complete("python t") == [post("Python tricks", "python-tricks")]
+
+
+def test_reset() -> None:
+    """Test that a reset index has no completions."""
+    index = make_index()
+    index.reset()
+    assert len(index) == 0
+    assert index.complete("p") == []
+
+
+def test_complete_is_fast() -> None:
+    """Test that completions take well under a millisecond with thousands of posts."""
+    index = search_completions.CompletionIndex()
+    index.build(
+        posts=(
+            (
+                i,
+                IndexedPost(
+                    title=f"Post {i} about topic {i % 97}",
+                    slug=f"post-{i}",
+                    tags=(f"tag{i % 50}",),
+                    series_id=None,
+                ),
+            )
+            for i in range(5000)
+        ),
+        series_names={},
+    )
+    start = time.perf_counter()
+    for search in ("p", "post 12", "topic", "tag4", "about topic 9"):
+        for _ in range(100):
+            assert index.complete(search)
+    assert (time.perf_counter() - start) / 500 < 0.0005
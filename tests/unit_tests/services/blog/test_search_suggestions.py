@@ -0,0 +1,97 @@
+"""test_search_suggestions: unit tests for the search_suggestions service."""
+
+import time
+
+from app.services.blog import search_suggestions
+from tests import TEST_EXAMPLE_BLOGS_PATH, TestCase
+
+VOCABULARY = {
+    "pytest": 3,
+    "python": 5,
+    "testing": 2,
+    "tips": 1,
+    "tip": 4,
+    "the": 9,
+    "fastapi": 2,
+    "configuration": 1,
+}
+
+
+def make_index() -> search_suggestions.SuggestionIndex:
+    """Make a suggestion index of the test vocabulary."""
+    index = search_suggestions.SuggestionIndex()
+    index.build(VOCABULARY)
+    return index
+
+
+class TestSuggest(TestCase):
+    """Test case for suggesting corrected searches."""
+
+    search: str
+    expected: list[str]
+
+
+SUGGEST_TEST_CASES = [
+    TestSuggest(id="transposition", search="pyhton", expected=["python"]),
+    TestSuggest(id="deletion", search="pytst", expected=["pytest"]),
+    TestSuggest(id="insertion", search="fastappi", expected=["fastapi"]),
+    TestSuggest(id="two_edits", search="pyteset", expected=["pytest"]),
+    TestSuggest(id="past_prefix", search="configuratoin", expected=["configuration"]),
+    TestSuggest(id="case_insensitive", search="PYTHON", expected=[]),
+    TestSuggest(id="known_words", search="python tips", expected=[]),
+    TestSuggest(id="unknown_word", search="kubernetes", expected=[]),
+    TestSuggest(id="short_word", search="ab", expected=[]),
+    TestSuggest(id="same_length_first", search="tisp", expected=["tips", "tip"]),
+    TestSuggest(
+        id="several_words_and_punctuation",
+        search='"pyhton" tpis & testnig!',
+        expected=['"python" tips & testing!'],
+    ),
+]
+
+
+@TestSuggest.parametrize(SUGGEST_TEST_CASES)
+def test_suggest(test_case: TestSuggest) -> None:
+    """Test that misspelled words in searches are corrected."""
+    assert make_index().suggest(test_case.search) == test_case.expected
+
+
+def test_build_replaces_vocabulary() -> None:
+    """Test that rebuilding the index forgets words that are gone."""
+    index = make_index()
+    index.build({"pytest": 1})
+    assert "pytest" in index
+    assert "python" not in index
+    assert index.suggest("pyhton") == []
+
+
+def test_build_skips_non_words() -> None:
+    """Test that numbers, identifiers and overly long words aren't indexed."""
+    index = search_suggestions.SuggestionIndex()
+    index.build({"42": 1, "snake_case": 1, "a" * 31: 1, "Word": 1})
+    assert len(index) == 1
+    assert "word" in index
+
+
+def test_get_edit_distance() -> None:
+    """Test the optimal string alignment distance."""
+    assert search_suggestions.get_edit_distance("kitten", "sitting") == 3
+    assert search_suggestions.get_edit_distance("abc", "acb") == 1
+    assert search_suggestions.get_edit_distance("", "ab") == 2
+    assert search_suggestions.get_edit_distance("same", "same") == 0
+
+
+def test_suggest_is_fast() -> None:
+    """Test that suggestions for a real vocabulary take well under a few milliseconds."""
+    words = {
+        word
+        for path in TEST_EXAMPLE_BLOGS_PATH.glob("*.md")
+        for word in search_suggestions.WORD_RE.findall(path.read_text().lower())
+    }
+    index = search_suggestions.SuggestionIndex()
+    index.build(dict.fromkeys(words, 1))
+    typos = [word[1] + word[0] + word[2:] for word in sorted(words) if len(word) > 3]
+    start = time.perf_counter()
+    for typo in typos:
+        index.suggest(typo)
+    assert (time.perf_counter() - start) / len(typos) < 0.001
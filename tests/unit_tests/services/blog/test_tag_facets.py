@@ -0,0 +1,75 @@
+"""test_tag_facets: unit tests for caching the blog list's tag facets."""
+
+import time
+from collections.abc import Iterator
+
+import pytest
+import sqlalchemy.exc
+from pytest_mock import MockerFixture
+
+from app.services.blog import blog_handler
+from app.settings import settings
+
+pytestmark = pytest.mark.anyio
+
+FACETS = [blog_handler.TagFacet(tag="python", count=2)]
+RECOUNTED_FACETS = [blog_handler.TagFacet(tag="python", count=3)]
+DB_DOWN = sqlalchemy.exc.OperationalError("SELECT", {}, ConnectionRefusedError())
+
+
+@pytest.fixture(autouse=True)
+def _clear_tag_facets() -> Iterator[None]:
+    """Start and end each test without cached tag facets."""
+    blog_handler._unfiltered_tag_facets.clear()  # noqa: SLF001 (private-member-access)
+    yield
+    blog_handler._unfiltered_tag_facets.clear()  # noqa: SLF001 (private-member-access)
+
+
+def cache_facets(*, age_secs: float = 0, stale: bool = False) -> None:
+    """Cache the tag facets, counted `age_secs` ago."""
+    cached = blog_handler.CachedTagFacets.counted(FACETS)
+    cached.stale_at -= age_secs
+    cached.expires_at -= age_secs
+    if stale:
+        cached.stale_at = 0
+    blog_handler._unfiltered_tag_facets[False] = cached  # noqa: SLF001 (private-member-access)
+
+
+async def get_facets(mocker: MockerFixture) -> list[blog_handler.TagFacet]:
+    """Get the tag facets without a search, with a mock session."""
+    return await blog_handler.get_tag_facets(db=mocker.AsyncMock(), can_see_unpublished=False)
+
+
+async def test_fresh_facets_are_served_from_cache(mocker: MockerFixture) -> None:
+    """Test that fresh cached tag facets are served without counting them."""
+    count = mocker.patch.object(blog_handler, "_count_tag_facets", return_value=RECOUNTED_FACETS)
+    cache_facets()
+    assert await get_facets(mocker) == FACETS
+    count.assert_not_called()
+
+
+async def test_stale_facets_are_recounted(mocker: MockerFixture) -> None:
+    """Test that stale tag facets (e.g. after a blog post was saved) are recounted."""
+    mocker.patch.object(blog_handler, "_count_tag_facets", return_value=RECOUNTED_FACETS)
+    cache_facets(stale=True)
+    assert await get_facets(mocker) == RECOUNTED_FACETS
+    assert await get_facets(mocker) == RECOUNTED_FACETS
+
+
+async def test_stale_facets_are_served_when_recounting_fails(mocker: MockerFixture) -> None:
+    """Test that stale tag facets are served if they can't be recounted, and retried later."""
+    count = mocker.patch.object(blog_handler, "_count_tag_facets", side_effect=DB_DOWN)
+    cache_facets(stale=True)
+    assert await get_facets(mocker) == FACETS
+    assert await get_facets(mocker) == FACETS
+    assert count.call_count == 1  # <-- Not recounted again until the retry delay passes
+    cached = blog_handler._unfiltered_tag_facets[False]  # noqa: SLF001 (private-member-access)
+    assert cached.stale_at > time.monotonic()
+
+
+async def test_expired_facets_are_not_served(mocker: MockerFixture) -> None:
+    """Test that tag facets past their hard TTL aren't served when recounting fails."""
+    mocker.patch.object(blog_handler, "_count_tag_facets", side_effect=DB_DOWN)
+    cache_facets(age_secs=settings.page_cache_hard_ttl_secs + 1)
+    with pytest.raises(sqlalchemy.exc.OperationalError):
+        await get_facets(mocker)
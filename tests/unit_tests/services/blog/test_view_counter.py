@@ -0,0 +1,50 @@
+"""test_view_counter: unit tests for the view_counter service."""
+
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services.blog import view_counter
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_first_views_select_once(mocker: MockerFixture) -> None:
+    """Test that a blog post's count is selected once, however many requests first see it."""
+    release = asyncio.Event()
+
+    async def select_views(**_kwargs: object) -> int:
+        await release.wait()
+        return 7
+
+    select = mocker.patch.object(view_counter, "_select_bp_views", side_effect=select_views)
+    counter = view_counter.ViewCounter(flush_interval_secs=60, max_pending=10)
+    tasks = [asyncio.create_task(counter.get_views(db=mocker.AsyncMock(), bp_id=1))]
+    tasks.append(asyncio.create_task(counter.record_view(db=mocker.AsyncMock(), bp_id=1)))
+    await asyncio.sleep(0)
+    counter.set_known({1: 9})  # <-- A flush wrote a newer count meanwhile
+    release.set()
+    assert sorted(await asyncio.gather(*tasks)) == [9, 10]
+    assert select.call_count == 1
+    assert await counter.get_views(db=mocker.AsyncMock(), bp_id=1) == 10
+
+
+async def test_max_pending_views_are_flushed_in_the_background(mocker: MockerFixture) -> None:
+    """Test that reaching `max_pending` wakes the flush task, rather than flushing inline."""
+    mocker.patch.object(view_counter, "_select_bp_views", return_value=0)
+    counter = view_counter.ViewCounter(flush_interval_secs=60, max_pending=2)
+    flushed = asyncio.Event()
+    flush = mocker.patch.object(
+        counter, "flush_with_new_session", side_effect=lambda _session_maker: flushed.set()
+    )
+    session_maker = mocker.Mock()
+    task = asyncio.create_task(counter.run(session_maker))
+    await asyncio.sleep(0)
+    await counter.record_view(db=mocker.AsyncMock(), bp_id=1)
+    await asyncio.sleep(0)
+    flush.assert_not_called()
+    await counter.record_view(db=mocker.AsyncMock(), bp_id=1)
+    flush.assert_not_called()  # <-- Not by the request
+    await asyncio.wait_for(flushed.wait(), timeout=5)
+    await counter.stop(task, session_maker)
@@ -0,0 +1,51 @@
+"""test_coalesced_task: unit tests for the coalesced_task service."""
+
+import asyncio
+
+import pytest
+
+from app.services.general.coalesced_task import CoalescedTask
+
+pytestmark = pytest.mark.anyio
+
+
+class Job:
+    """A job that counts its runs, and fails if told to."""
+
+    def __init__(self, *, fail: bool = False) -> None:
+        self.fail = fail
+        self.runs = 0
+
+    async def __call__(self) -> None:
+        """Run, yielding to the event loop first."""
+        await asyncio.sleep(0)
+        self.runs += 1
+        if self.fail:
+            raise LookupError
+
+
+async def test_requests_during_a_run_queue_one_more() -> None:
+    """Test that a burst of requests runs the job once, plus once for those made meanwhile."""
+    job = Job()
+    task = CoalescedTask("test", job)
+    task.request()
+    task.request()  # <-- Before the run starts, so covered by it
+    await asyncio.sleep(0)
+    for _ in range(3):
+        task.request()  # <-- During the run, so queued as one more
+    assert task.is_pending
+    await task.wait()
+    assert job.runs == 2
+    assert not task.is_pending
+
+
+async def test_errors_are_logged(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that a failing job is logged, and run again when next requested."""
+    job = Job(fail=True)
+    task = CoalescedTask("test", job)
+    task.request()
+    await task.wait()
+    assert "Error running test" in caplog.text
+    task.request()
+    await task.wait()
+    assert job.runs == 2
@@ -0,0 +1,64 @@
+"""test_page_cache: unit tests for the page_cache service."""
+
+import time
+
+from pytest_mock import MockerFixture
+
+from app.services.general import page_cache
+
+
+def make_cache() -> page_cache.PageCache:
+    """Make a page cache with a page in it."""
+    cache = page_cache.PageCache(soft_ttl_seconds=10, hard_ttl_seconds=100, retry_seconds=5)
+    cache.set("/blog/post", html="<p>Post</p>", bp_id=1)
+    return cache
+
+
+def test_stale_pages_are_served_until_the_hard_ttl(mocker: MockerFixture) -> None:
+    """Test that pages past their soft TTL are served stale, and dropped past their hard TTL."""
+    cache = make_cache()
+    now = time.monotonic()
+    page = cache.get("/blog/post")
+    assert page is not None
+    assert not page.is_stale
+    mocker.patch.object(page_cache.time, "monotonic", return_value=now + 50)
+    assert cache.get("/blog/post") is page
+    assert page.is_stale
+    mocker.patch.object(page_cache.time, "monotonic", return_value=now + 150)
+    assert cache.get("/blog/post") is None
+    assert len(cache) == 0
+
+
+def test_one_refresh_of_a_stale_page_at_a_time(mocker: MockerFixture) -> None:
+    """Test that stale pages are refreshed by one caller, and retried if not replaced."""
+    cache = make_cache()
+    now = time.monotonic()
+    page = cache.get("/blog/post")
+    assert page is not None
+    assert not cache.claim_refresh(page)  # <-- Fresh
+    mocker.patch.object(page_cache.time, "monotonic", return_value=now + 50)
+    assert cache.claim_refresh(page)
+    assert not cache.claim_refresh(page)  # <-- Already refreshing
+    cache.end_refresh(page)  # <-- Failed, so it isn't replaced
+    assert not cache.claim_refresh(page)
+    mocker.patch.object(page_cache.time, "monotonic", return_value=now + 56)
+    assert cache.claim_refresh(page)  # <-- Retried after `retry_seconds`
+
+
+def test_pages_are_invalidated_by_the_posts_they_show() -> None:
+    """Test that pages are dropped when blog posts they link to (e.g. in a series) are."""
+    cache = make_cache()
+    cache.set("/blog/series-post", html="<p>Series post</p>", bp_id=2, shown_bp_ids=[2, 3])
+    cache.invalidate(3)
+    assert cache.get("/blog/series-post") is None
+    assert cache.get("/blog/post") is not None
+    cache.invalidate(2)  # <-- Already dropped, and unindexed
+    assert len(cache) == 1
+
+
+def test_invalidated_pages_are_dropped_even_if_stale(mocker: MockerFixture) -> None:
+    """Test that invalidated pages aren't served stale."""
+    cache = make_cache()
+    mocker.patch.object(page_cache.time, "monotonic", return_value=time.monotonic() + 50)
+    cache.invalidate(1)
+    assert cache.get("/blog/post") is None
@@ -0,0 +1,84 @@
+"""test_single_flight: unit tests for the single_flight service."""
+
+import asyncio
+
+import pytest
+
+from app.services.general.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+class Loader:
+    """A load that counts its runs and waits to be released."""
+
+    def __init__(self, result: str = "loaded") -> None:
+        self.result = result
+        self.runs = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        """Load, once released."""
+        self.runs += 1
+        await self.release.wait()
+        return self.result
+
+
+async def test_concurrent_callers_share_a_load() -> None:
+    """Test that concurrent callers for a key await one load, and are counted."""
+    flight: SingleFlight[str, str] = SingleFlight("test")
+    loader = Loader()
+    tasks = [asyncio.create_task(flight.do("key", loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert len(flight) == 1
+    loader.release.set()
+    assert await asyncio.gather(*tasks) == ["loaded"] * 5
+    assert loader.runs == 1
+    assert (flight.loads, flight.collapsed) == (1, 4)
+    assert len(flight) == 0
+
+
+async def test_keys_and_later_calls_load_separately() -> None:
+    """Test that other keys, and calls after a load finishes, run their own loads."""
+    flight: SingleFlight[str, str] = SingleFlight("test")
+    first, second = Loader("first"), Loader("second")
+    first.release.set()
+    second.release.set()
+    results = await asyncio.gather(flight.do("a", first), flight.do("b", second))
+    assert results == ["first", "second"]
+    assert await flight.do("a", first) == "first"
+    assert first.runs == 2
+    assert (flight.loads, flight.collapsed) == (3, 0)
+
+
+async def test_errors_are_shared() -> None:
+    """Test that callers awaiting a failed load get its error."""
+    flight: SingleFlight[str, str] = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def fail() -> str:
+        await release.wait()
+        raise LookupError
+
+    tasks = [asyncio.create_task(flight.do("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, LookupError) for result in results)
+    assert (flight.loads, flight.collapsed) == (1, 2)
+
+
+async def test_cancelled_load_is_retried_by_waiters() -> None:
+    """Test that callers awaiting a cancelled load run it themselves."""
+    flight: SingleFlight[str, str] = SingleFlight("test")
+    loader = Loader()
+    leader = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    loader.release.set()
+    assert await waiter == "loaded"
+    assert leader.cancelled()
+    assert loader.runs == 2